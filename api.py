@@ -1,33 +1,162 @@
 # api.py
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from asyncio import ensure_future
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, ConfigDict, ValidationError, model_validator
+from csv import reader as csv_reader
+from json import dumps, loads
+from typing import List
 from joblib import load
-from pandas import DataFrame
-from numpy import append
-from os import path
-app = FastAPI()
+from logging import getLogger
+from pandas import notna
+from numpy import allclose, isfinite
+from os import path, environ
+from time import perf_counter, perf_counter_ns
+from src.metrics import CONTENT_TYPE, SIZE_BUCKETS, MetricsMiddleware, MetricsRegistry, paused
+from src.micro_batching import MicroBatcher
+from src.model_bundle import ModelBundle
+from src.model_registry import ModelWatcher, current_version
+from src.prediction_cache import MISSING, PredictionCache
+from src.preprocessing import CATEGORICAL_FEATURES, NUMERIC_FEATURES
+from src.orbit_index import OrbitIndex
+from src.name_index import NameIndex
+
+# Taken when a worker imports the app, the reference point of the startup timings
+PROCESS_START = perf_counter()
+logger = getLogger('uvicorn.error')
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """
+    Load and warm the artifacts in the background while the server starts accepting connections.
+
+    Requests that need the artifacts are answered with 503 until start_up finishes; /ready reports the progress.
+    """
+    # Keep a reference so the loading task is not garbage collected while it runs
+    app.state.loading = ensure_future(run_in_threadpool(start_up))
+    yield
+    if watcher is not None:
+        watcher.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Define the path to the artifacts and model
 BASE_DIR = path.dirname(path.abspath(__file__))
 ARTIFACTS_PATH = path.join(BASE_DIR, 'artifacts')
-MODEL_PATH = path.join(ARTIFACTS_PATH, 'ran_for_model.joblib')
-SCALER_PATH = path.join(ARTIFACTS_PATH, 'scaler.joblib')
-STATUS_MAPPING_PATH = path.join(ARTIFACTS_PATH, 'status_mapping.joblib')
+CATALOG_PATH = path.join(ARTIFACTS_PATH, 'combined_df.joblib')
+
+# Feature columns in the order the scaler and model were fit on
+FEATURES = NUMERIC_FEATURES + CATEGORICAL_FEATURES
+MAX_BATCH_SIZE = 10000
+# Rows scored per vectorized call while streaming
+STREAM_BATCH_SIZE = int(environ.get('PREDICT_STREAM_BATCH_SIZE', 1000))
+# Longer streamed lines are answered with an error row instead of being buffered
+STREAM_MAX_LINE_BYTES = int(environ.get('PREDICT_STREAM_MAX_LINE_BYTES', 64 * 1024))
+# Largest batch scored with the flat forest; sklearn's compiled traversal is faster above it
+FLAT_FOREST_MAX_ROWS = int(environ.get('FLAT_FOREST_MAX_ROWS', 128))
+# Memory-map the flat forest read-only so uvicorn workers share its pages
+MODEL_MMAP = environ.get('MODEL_MMAP', '1') == '1'
+# Serve every batch from the flat forest and never load the pickled sklearn model
+FLAT_FOREST_ONLY = environ.get('FLAT_FOREST_ONLY', '0') == '1'
+
+# Published model versions; the current one is served and new ones are swapped in as they appear
+MODELS_PATH = path.join(ARTIFACTS_PATH, 'models')
+MODEL_WATCH_INTERVAL_SECONDS = float(environ.get('MODEL_WATCH_INTERVAL_SECONDS', 5))
 
-# Load the model and preprocessing objects
-model = load(MODEL_PATH)
-scaler = load(SCALER_PATH)
-status_mapping = load(STATUS_MAPPING_PATH)
-status_mapping_inv = {v: k for k, v in status_mapping.items()}
+# Latency under which a prediction request counts as fast when reporting time to first fast request
+FAST_REQUEST_MS = float(environ.get('FAST_REQUEST_MS', 50))
+PREDICTION_ROUTES = {'/predict', '/predict/batch', '/predict/stream'}
 
-# Load label encoders
-label_encoders = {
-    'object_type': load(path.join(ARTIFACTS_PATH, 'object_type_label_encoder.joblib'))
-}
+# Micro-batching of concurrent /predict requests: larger batches and waits trade latency for throughput
+MICRO_BATCHING = environ.get('PREDICT_MICRO_BATCHING', '1') == '1'
+MICRO_BATCH_MAX_SIZE = int(environ.get('PREDICT_MICRO_BATCH_MAX_SIZE', 64))
+MICRO_BATCH_MAX_WAIT_MS = float(environ.get('PREDICT_MICRO_BATCH_MAX_WAIT_MS', 2.0))
+
+# Prediction cache: 0 entries disables it; decimals quantize numeric features in the key
+PREDICTION_CACHE_SIZE = int(environ.get('PREDICTION_CACHE_SIZE', 10000))
+PREDICTION_CACHE_TTL_SECONDS = float(environ['PREDICTION_CACHE_TTL_SECONDS']) \
+    if 'PREDICTION_CACHE_TTL_SECONDS' in environ else None
+PREDICTION_CACHE_DECIMALS = int(environ['PREDICTION_CACHE_DECIMALS']) \
+    if 'PREDICTION_CACHE_DECIMALS' in environ else None
+
+# Service metrics, exported in the Prometheus text format on /metrics
+metrics = MetricsRegistry()
+STAGE_SECONDS = metrics.histogram(
+    'prediction_stage_seconds', 'Time spent in each stage of scoring a prediction.', label_names=['stage'])
+BATCH_ROWS = metrics.histogram(
+    'prediction_batch_rows', 'Rows scored per model call.', SIZE_BUCKETS, ['source'])
+# Stage series bound once, so timing a stage skips the label lookup. 'validate' times /predict bodies,
+# 'validate_batch' whole /predict/batch bodies and 'validate_stream' each streamed row
+STAGES = {stage: STAGE_SECONDS.labels(stage) for stage in
+          ['validate', 'validate_batch', 'validate_stream', 'cache', 'micro_batch', 'encode', 'scale', 'predict',
+           'serialize']}
+# Stage a PredictionRequest's validation time is recorded under; None while validating the items of a batch, which
+# is timed as a whole, or the warm-up probes, which are not requests
+validation_stage = ContextVar('validation_stage', default='validate')
+MODEL_LOAD_SECONDS = metrics.gauge(
+    'model_load_seconds', 'Time taken to load each artifact at startup.', ['artifact'])
+STARTUP_SECONDS = metrics.gauge(
+    'startup_seconds', 'Seconds from importing the app to each startup milestone.', ['milestone'])
+
+
+def load_timed(artifact, loader, *args, **kwargs):
+    """
+    Call an artifact loader and record how long it took.
+
+    Args:
+        artifact (str): The artifact name used as the model_load_seconds label.
+        loader (callable): The loading function.
+        *args: Positional arguments passed to the loader.
+        **kwargs: Keyword arguments passed to the loader.
+
+    Returns:
+        Any: What the loader returned.
+    """
+    start = perf_counter_ns()
+    loaded = loader(*args, **kwargs)
+    MODEL_LOAD_SECONDS.set((perf_counter_ns() - start) / 1e9, artifact)
+    return loaded
+
+
+# Loaded and warmed in the background by start_up; predictions are served once bundle is set, and the catalog
+# endpoints once the indexes are built, which may fail on its own
+bundle = None
+catalog = orbit_index = name_index = None
+watcher = None
+startup = {'state': 'loading', 'error': None, 'seconds_to_ready': None, 'seconds_to_first_fast_request': None,
+           'indexes': 'loading', 'indexes_error': None}
+
+
+@contextmanager
+def validated_as(stage):
+    """
+    Record the validation time of the PredictionRequests built inside the context under another stage.
+
+    Args:
+        stage (str): The STAGES key, or None to not record it.
+
+    Yields:
+        None
+    """
+    token = validation_stage.set(stage)
+    try:
+        yield
+    finally:
+        validation_stage.reset(token)
 
 
 class PredictionRequest(BaseModel):
     """Model to define the request body for prediction"""
+    # NaN and Infinity are valid JSON to the parser but not model inputs; they fail validation like any bad value
+    model_config = ConfigDict(allow_inf_nan=False)
+
     total_mass: float
     span: float
     period_mins: float
@@ -36,56 +165,868 @@ class PredictionRequest(BaseModel):
     inclination: float
     object_type: str
 
+    @model_validator(mode='wrap')
+    @classmethod
+    def time_validation(cls, data, handler):
+        stage = validation_stage.get()
+        if stage is None:
+            return handler(data)
+        start = perf_counter_ns()
+        validated = handler(data)
+        STAGES[stage].observe_since(start)
+        return validated
+
+
+class BatchPredictionRequest(BaseModel):
+    """Model to define the request body for batch prediction"""
+    items: List[PredictionRequest]
+
+    @model_validator(mode='wrap')
+    @classmethod
+    def time_validation(cls, data, handler):
+        start = perf_counter_ns()
+        with validated_as(None):
+            validated = handler(data)
+        STAGES['validate_batch'].observe_since(start)
+        return validated
+
 
-def encode_features(data, label_encoders):
+def forest_for(model_bundle, n_rows):
     """
-    Encode categorical features using label encoders.
+    Pick the forest implementation for a batch size.
 
     Args:
-        data (pd.DataFrame): DataFrame containing the input features.
-        label_encoders (dict): Dictionary of label encoders for categorical features.
+        model_bundle (ModelBundle): The artifacts serving the request.
+        n_rows (int): The number of rows to be scored.
 
     Returns:
-        pd.DataFrame: DataFrame with encoded categorical features.
+        object: The flat forest for small batches (or any batch without the sklearn model) when it is available,
+            otherwise the sklearn model.
     """
-    for col, le in label_encoders.items():
-        if data[col].values[0] not in le.classes_:
-            # Handle unseen labels by adding them to the encoder
-            le.classes_ = append(le.classes_, data[col].values[0])
-        data[col] = le.transform(data[col])
-    return data
+    if model_bundle.flat_model is not None and (model_bundle.model is None or n_rows <= FLAT_FOREST_MAX_ROWS):
+        return model_bundle.flat_model
+    return model_bundle.model
 
 
-@app.post("/predict")
-def predict(data: PredictionRequest):
+def predict_matrix(X, model_bundle):
     """
-    Predict the status of a satellite based on input features.
+    Scale a preprocessed feature matrix in place and score it with one predict_proba call.
+
+    Args:
+        X (numpy.ndarray): Imputed and encoded float32 matrix, columns in FEATURES order.
+        model_bundle (ModelBundle): The artifacts to score with.
+
+    Returns:
+        tuple: The predicted status labels and the probability of each prediction.
+    """
+    pipeline = model_bundle.pipeline
+    start = perf_counter_ns()
+    pipeline.scale_in_place(X)
+    start = STAGES['scale'].observe_since(start)
+    proba = pipeline.predict_proba(X, forest_for(model_bundle, len(X)))
+    STAGES['predict'].observe_since(start)
+    best = proba.argmax(axis=1)
+    return pipeline.labels.take(best).tolist(), proba[range(len(best)), best]
+
+
+def score_items(items, source='micro_batch', model_bundle=None):
+    """
+    Score a list of prediction requests and return their status labels.
+
+    Args:
+        items (list[PredictionRequest]): The requests to score.
+        source (str, optional): The caller, used as the prediction_batch_rows label. Default is 'micro_batch'.
+        model_bundle (ModelBundle, optional): The artifacts to score with. Default is None (the current bundle).
+
+    Returns:
+        list[tuple]: The predicted status label and its probability for each request, in order.
+    """
+    model_bundle = model_bundle or bundle
+    BATCH_ROWS.observe(len(items), source)
+    start = perf_counter_ns()
+    X = model_bundle.preprocessor.transform_items(items)
+    STAGES['encode'].observe_since(start)
+    labels, probabilities = predict_matrix(X, model_bundle)
+    return list(zip(labels, probabilities.tolist()))
+
+
+def score_micro_batch(items, model_bundle):
+    """
+    Score a micro-batch with the artifacts its requests were submitted under.
+
+    Args:
+        items (list[PredictionRequest]): The requests to score.
+        model_bundle (ModelBundle): The bundle that was current when the requests arrived.
+
+    Returns:
+        list[tuple]: The predicted status label and its probability for each request, in order.
+    """
+    return score_items(items, 'micro_batch', model_bundle)
+
+
+batcher = MicroBatcher(score_micro_batch, MICRO_BATCH_MAX_SIZE,
+                       MICRO_BATCH_MAX_WAIT_MS) if MICRO_BATCHING else None
+prediction_cache = PredictionCache(NUMERIC_FEATURES, CATEGORICAL_FEATURES, PREDICTION_CACHE_SIZE,
+                                   PREDICTION_CACHE_TTL_SECONDS, PREDICTION_CACHE_DECIMALS)
+
+
+def collect_service_stats():
+    """
+    Export the prediction cache and micro-batcher counters as metrics.
+
+    Returns:
+        list[tuple]: (name, type, documentation, value) for each exported value.
+    """
+    cache = prediction_cache.stats()
+    stats = [
+        ('prediction_cache_hits_total', 'counter', 'Prediction cache hits.', cache['hits']),
+        ('prediction_cache_misses_total', 'counter', 'Prediction cache misses.', cache['misses']),
+        ('prediction_cache_hit_ratio', 'gauge', 'Share of cache lookups that hit.', cache['hit_rate']),
+        ('prediction_cache_entries', 'gauge', 'Predictions held in the cache.', cache['size']),
+        ('prediction_cache_evictions_total', 'counter', 'Least recently used entries evicted.', cache['evictions'])
+    ]
+    if watcher is not None:
+        reloads = watcher.stats()
+        stats += [
+            ('model_reloads_total', 'counter', 'Model versions swapped in without a restart.', reloads['reloads']),
+            ('model_reload_failures_total', 'counter', 'Model versions that failed to load or validate.',
+             reloads['failures'])
+        ]
+        if reloads['last_reload_seconds'] is not None:
+            stats.append(('model_last_reload_seconds', 'gauge', 'Time taken by the last model reload.',
+                          reloads['last_reload_seconds']))
+    if batcher is not None:
+        batching = batcher.stats()
+        stats += [
+            ('micro_batch_requests_total', 'counter', 'Requests scored by the micro-batcher.', batching['requests']),
+            ('micro_batch_batches_total', 'counter', 'Batches scored by the micro-batcher.', batching['batches']),
+            ('micro_batch_queued', 'gauge', 'Requests waiting for the micro-batcher.', batching['queued'])
+        ]
+    return stats
+
+
+metrics.add_collector(collect_service_stats)
+
+
+def json_response(content):
+    """
+    Serialize a response body, timing it as the serialize stage.
+
+    Args:
+        content (dict): The JSON-safe response body.
+
+    Returns:
+        Response: The serialized JSON response.
+    """
+    start = perf_counter_ns()
+    body = dumps(content, ensure_ascii=False, allow_nan=False, separators=(',', ':'))
+    STAGES['serialize'].observe_since(start)
+    return Response(body, media_type='application/json')
+
+
+def score_stream_rows(rows, model_bundle=None):
+    """
+    Score one batch of streamed rows and render the NDJSON output lines.
+
+    Rows that fail validation produce an error line in their place instead of failing the batch.
+
+    Args:
+        rows (list[dict]): Raw rows parsed from the request body.
+        model_bundle (ModelBundle, optional): The artifacts to score with. Default is None (the current bundle).
+
+    Returns:
+        bytes: One NDJSON line per row, in input order.
+    """
+    items, lines = [], []
+    with validated_as('validate_stream'):
+        for row in rows:
+            if isinstance(row, dict) and '_error' in row:
+                lines.append({"error": row['_error']})
+                continue
+            try:
+                items.append(PredictionRequest(**row))
+                lines.append(None)
+            except ValidationError as e:
+                lines.append({"error": e.errors(include_url=False, include_context=False, include_input=False)})
+            except TypeError as e:
+                lines.append({"error": str(e)})
+    scored = iter(score_items(items, 'stream', model_bundle)) if items else iter(())
+    out = []
+    for row, line in zip(rows, lines):
+        if line is None:
+            label, p = next(scored)
+            line = {"prediction": label, "probability": p}
+        if isinstance(row, dict) and 'object_id' in row:
+            line = {"object_id": row['object_id'], **line}
+        out.append(dumps(line))
+    return ('\n'.join(out) + '\n').encode()
+
+
+def stream_batch_error(rows, error):
+    """
+    Render an error line for every row of a streamed batch that could not be scored.
+
+    Args:
+        rows (list[dict]): Raw rows parsed from the request body.
+        error (Exception): The scoring error.
+
+    Returns:
+        bytes: One NDJSON error line per row, in input order.
+    """
+    out = []
+    for row in rows:
+        line = {"error": f"Scoring failed: {error}"}
+        if isinstance(row, dict) and 'object_id' in row:
+            line = {"object_id": row['object_id'], **line}
+        out.append(dumps(line))
+    return ('\n'.join(out) + '\n').encode()
+
+
+async def iter_lines(chunks, max_line_bytes=None):
+    """
+    Split a stream of body chunks into lines.
+
+    Only the chunks of the current line are kept, so splitting is linear in the body size. A line longer than
+    max_line_bytes is dropped as it arrives and reported as None.
+
+    Args:
+        chunks (AsyncIterator[bytes]): The request body chunks.
+        max_line_bytes (int, optional): The longest line kept. Default is None (STREAM_MAX_LINE_BYTES).
+
+    Yields:
+        bytes: Each non-empty line, or None for a line that was too long.
+    """
+    max_line_bytes = max_line_bytes or STREAM_MAX_LINE_BYTES
+    pending, pending_bytes, too_long = [], 0, False
+    async for chunk in chunks:
+        *ends, rest = chunk.split(b'\n')
+        for part in ends:
+            if too_long or pending_bytes + len(part) > max_line_bytes:
+                yield None
+            else:
+                line = b''.join(pending) + part
+                if line.strip():
+                    yield line
+            pending, pending_bytes, too_long = [], 0, False
+        if not too_long:
+            pending.append(rest)
+            pending_bytes += len(rest)
+            if pending_bytes > max_line_bytes:
+                pending, pending_bytes, too_long = [], 0, True
+    if too_long:
+        yield None
+    else:
+        line = b''.join(pending)
+        if line.strip():
+            yield line
+
+
+async def iter_rows(chunks, csv=False):
+    """
+    Parse a streamed NDJSON or CSV body into rows.
+
+    Args:
+        chunks (AsyncIterator[bytes]): The request body chunks.
+        csv (bool, optional): Whether the body is CSV with a header line. Default is False (NDJSON).
+
+    Yields:
+        dict: Each parsed row, or {"_error": ...} for a line that could not be decoded or parsed.
+    """
+    header = None
+    async for raw in iter_lines(chunks):
+        if raw is None:
+            yield {"_error": f"Line longer than {STREAM_MAX_LINE_BYTES} bytes"}
+            continue
+        try:
+            line = raw.decode()
+        except UnicodeDecodeError as e:
+            yield {"_error": f"Line is not valid UTF-8: {e}"}
+            continue
+        if csv:
+            values = next(csv_reader([line]))
+            if header is None:
+                header = [v.strip() for v in values]
+                continue
+            yield dict(zip(header, values))
+        else:
+            try:
+                yield loads(line)
+            except ValueError as e:
+                yield {"_error": str(e)}
+
+
+class BodyStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that leaves the ASGI receive channel to the request body.
+
+    Under ASGI spec versions before 2.4 StreamingResponse listens for the client disconnecting while it sends, which
+    competes with request.stream() for incoming messages and stalls a response generated from the body it is still
+    reading. A disconnect still ends the response here, as request.stream() raises ClientDisconnect.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+
+def to_records(df):
+    """
+    Convert a DataFrame to a list of JSON-safe records.
+
+    Args:
+        df (pd.DataFrame): The DataFrame to convert.
+
+    Returns:
+        list[dict]: One dictionary per row, with missing values as None.
+    """
+    return df.astype(object).where(notna(df), None).to_dict(orient='records')
+
+
+def predict_one(data, model_bundle=None):
+    """
+    Predict the status of a single satellite without batching.
 
     Args:
         data (PredictionRequest): Input data for prediction.
+        model_bundle (ModelBundle, optional): The artifacts to score with. Default is None (the current bundle).
 
     Returns:
-        dict: Dictionary containing the predicted status.
+        tuple: The predicted status label and its probability.
     """
+    model_bundle = model_bundle or bundle
     try:
-        # Convert request data to DataFrame
-        input_data = DataFrame([data.dict()])
+        BATCH_ROWS.observe(1, 'single')
+
+        pipeline = model_bundle.pipeline
 
-        # Encode categorical features
-        input_data = encode_features(input_data, label_encoders)
+        # Impute and encode the features straight from the request
+        start = perf_counter_ns()
+        X = pipeline.preprocessor.transform_items([data])
+        start = STAGES['encode'].observe_since(start)
 
         # Scale the features
-        input_data_scaled = scaler.transform(input_data)
+        pipeline.scale_in_place(X)
+        start = STAGES['scale'].observe_since(start)
 
         # Predict using the loaded model
-        prediction = model.predict(input_data_scaled)
-        prediction_label = status_mapping_inv[prediction[0]]
+        proba = pipeline.predict_proba(X, forest_for(model_bundle, 1))[0]
+        prediction_label = str(pipeline.labels[proba.argmax()])
+        STAGES['predict'].observe_since(start)
 
-        return {"prediction": prediction_label}
+        return prediction_label, float(proba.max())
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
+def current_bundle():
+    """
+    Get the artifacts serving requests, rejecting the request until they are loaded and warm.
+
+    Returns:
+        ModelBundle: The current bundle.
+    """
+    model_bundle = bundle
+    if model_bundle is None:
+        raise HTTPException(status_code=503, detail=f"Service is {startup['state']}", headers={"Retry-After": "1"})
+    return model_bundle
+
+
+def require_indexes():
+    """
+    Reject a catalog request until the orbit and name indexes are built.
+
+    Returns:
+        None
+
+    Raises:
+        HTTPException: 503 while the indexes are loading or after building them failed.
+    """
+    if orbit_index is None or name_index is None:
+        detail = f"Catalog indexes are {startup['indexes']}"
+        if startup['indexes_error']:
+            detail = f"{detail}: {startup['indexes_error']}"
+        raise HTTPException(status_code=503, detail=detail,
+                            headers={"Retry-After": "1"} if startup['indexes'] == 'loading' else None)
+
+
+def probe_items(model_bundle):
+    """
+    Build the probe batch used to warm up and validate a bundle.
+
+    Numeric features spread from two scaler standard deviations below the training mean to two above, and every
+    object type the encoder knows is used.
+
+    Args:
+        model_bundle (ModelBundle): The bundle to probe.
+
+    Returns:
+        list[PredictionRequest]: FLAT_FOREST_MAX_ROWS + 1 requests, enough to reach both forest implementations.
+    """
+    mean, scale = model_bundle.pipeline.mean.tolist(), model_bundle.pipeline.scale.tolist()
+    classes = model_bundle.preprocessor.encoders['object_type'].classes
+    with validated_as(None):
+        return [PredictionRequest(**{col: max(0.0, mean[j] + scale[j] * ((i + j) % 5 - 2)) for j, col in
+                                     enumerate(NUMERIC_FEATURES)}, object_type=classes[i % len(classes)])
+                for i in range(FLAT_FOREST_MAX_ROWS + 1)]
+
+
+def warm_up(model_bundle, items):
+    """
+    Run warm-up requests through every scoring path before the bundle serves traffic.
+
+    Faults in the memory-mapped forest pages, then validates, encodes, scales, scores and serializes a single row,
+    a batch the flat forest scores and, when the sklearn model is loaded, a batch large enough to go to it. None of
+    it is recorded in the service metrics, which only describe real requests.
+
+    Args:
+        model_bundle (ModelBundle): The bundle to warm.
+        items (list[PredictionRequest]): The probe batch.
+
+    Returns:
+        None
+    """
+    model_bundle.touch()
+    with paused():
+        predict_one(items[0], model_bundle)
+        sizes = [1, FLAT_FOREST_MAX_ROWS] + ([FLAT_FOREST_MAX_ROWS + 1] if model_bundle.model is not None else [])
+        for size in sizes:
+            scored = score_items(items[:size], 'warmup', model_bundle)
+        json_response({"predictions": [{"prediction": label, "probability": p} for label, p in scored]})
+
+
+def validate_bundle(model_bundle, items):
+    """
+    Check a bundle on the probe batch before it serves traffic.
+
+    Args:
+        model_bundle (ModelBundle): The bundle to check.
+        items (list[PredictionRequest]): The probe batch.
+
+    Returns:
+        None
+
+    Raises:
+        ValueError: If the preprocessor or scaler expects other features, a forest predicts other classes than the
+            pipeline labels or returns invalid probabilities, or the flat forest and the sklearn model disagree.
+    """
+    if model_bundle.preprocessor.features != FEATURES:
+        raise ValueError(f"The preprocessor outputs {model_bundle.preprocessor.features}, "
+                         f"the service sends {FEATURES}")
+    pipeline = model_bundle.pipeline
+    if len(pipeline.mean) != len(FEATURES):
+        raise ValueError(f"The scaler expects {len(pipeline.mean)} features, the service sends {len(FEATURES)}")
+    X_scaled = pipeline.transform_items(items)
+    probabilities = []
+    for forest in (model_bundle.flat_model, model_bundle.model):
+        if forest is None:
+            continue
+        if len(forest.classes_) != len(pipeline.labels) or \
+                model_bundle.flat_model is not None and (forest.classes_ != model_bundle.flat_model.classes_).any():
+            raise ValueError(f"{type(forest).__name__} predicts other classes than the pipeline labels")
+        proba = pipeline.predict_proba(X_scaled, forest)
+        if proba.shape != (len(items), len(forest.classes_)) or not isfinite(proba).all() \
+                or not allclose(proba.sum(axis=1), 1.0):
+            raise ValueError(f"{type(forest).__name__} returned invalid probabilities on the probe batch")
+        probabilities.append(proba)
+    if len(probabilities) == 2 and not allclose(*probabilities):
+        raise ValueError("The flat forest and the sklearn model disagree on the probe batch")
+
+
+def prepare_bundle(dirpath, published=False):
+    """
+    Load a bundle, verify it against its manifest, validate it and warm it up.
+
+    Args:
+        dirpath (str): The version directory, or the legacy artifacts directory without a manifest.
+        published (bool, optional): Whether dirpath is a published version, which must have a manifest that
+            matches its files. Default is False (verified only when it has a manifest).
+
+    Returns:
+        ModelBundle: The bundle, ready to serve.
+
+    Raises:
+        ValueError: If a published version has no manifest, or a manifest does not match the files.
+    """
+    model_bundle = ModelBundle.load(dirpath, MODEL_MMAP, FLAT_FOREST_ONLY, published)
+    for artifact, seconds in model_bundle.load_seconds.items():
+        MODEL_LOAD_SECONDS.set(seconds, artifact)
+    items = probe_items(model_bundle)
+    validate_bundle(model_bundle, items)
+    warm_up(model_bundle, items)
+    return model_bundle
+
+
+def reload_bundle(dirpath):
+    """
+    Prepare a published version and swap it in.
+
+    Requests already holding the previous bundle finish on it; the swap is a single reference assignment, so every
+    later request sees the new bundle. When startup failed to load a model, the first version swapped in makes the
+    service ready.
+
+    Args:
+        dirpath (str): The version directory.
+
+    Returns:
+        None
+    """
+    global bundle
+    model_bundle = prepare_bundle(dirpath, published=True)
+    previous, bundle = bundle, model_bundle
+    logger.info("Swapped model %s for %s", previous.version if previous else None, model_bundle.version)
+    if startup['state'] != 'ready':
+        startup['state'] = 'ready'
+        startup['error'] = None
+        ready = startup['seconds_to_ready'] = perf_counter() - PROCESS_START
+        STARTUP_SECONDS.set(ready, 'ready')
+
+
+def log_reload_error(error):
+    """Log a model version that failed to load or validate; the previous version keeps serving."""
+    logger.error("Reloading the model failed, still serving %s: %s", bundle.version if bundle else None, error)
+
+
+def start_up():
+    """
+    Load and warm up the artifacts and mark predictions ready, then build the catalog indexes.
+
+    The current version published under MODELS_PATH is served when there is one, otherwise the artifacts directory
+    itself. Runs in a worker thread started by lifespan. Predictions are served as soon as the model is warm, and
+    new versions are watched for even when it failed to load, so publishing a good version recovers the service
+    without a restart. The orbit and name indexes are built afterwards, and a missing or broken catalog only takes
+    the /orbits and /search endpoints down. Failures are logged and reported on /ready instead of stopping the
+    server.
+
+    Returns:
+        None
+    """
+    global bundle, catalog, orbit_index, name_index, watcher
+    version = None
+    try:
+        version = current_version(MODELS_PATH)
+        bundle = prepare_bundle(path.join(MODELS_PATH, version), published=True) if version else \
+            prepare_bundle(ARTIFACTS_PATH)
+        startup['state'] = 'ready'
+        ready = startup['seconds_to_ready'] = perf_counter() - PROCESS_START
+        STARTUP_SECONDS.set(ready, 'ready')
+        logger.info("Model %s loaded and warm, ready %.2f s after import", bundle.version, ready)
+    except Exception as e:
+        startup['state'] = 'failed'
+        startup['error'] = str(e)
+        logger.exception("Loading the model artifacts failed")
+    # A version that failed is not retried until another one is published
+    watcher = ModelWatcher(MODELS_PATH, reload_bundle, version, MODEL_WATCH_INTERVAL_SECONDS)
+    if MODEL_WATCH_INTERVAL_SECONDS > 0:
+        watcher.start(on_error=log_reload_error)
+
+    try:
+        # Build the orbital-regime and name indexes over the merged catalog
+        catalog = load_timed('catalog', load, CATALOG_PATH)
+        orbit_index = load_timed('orbit_index', OrbitIndex, catalog)
+        name_index = load_timed('name_index', NameIndex, catalog)
+        startup['indexes'] = 'ready'
+    except Exception as e:
+        startup['indexes'] = 'failed'
+        startup['indexes_error'] = str(e)
+        logger.exception("Building the catalog indexes failed; /orbits and /search are unavailable")
+
+
+def track_first_fast_request(method, route, status, seconds):
+    """
+    Log the time from importing the app to the first prediction request answered within FAST_REQUEST_MS.
+
+    Args:
+        method (str): The HTTP method.
+        route (str): The route template.
+        status (int): The response status code.
+        seconds (float): The request latency.
+
+    Returns:
+        None
+    """
+    if startup['seconds_to_first_fast_request'] is not None or status != 200 or route not in PREDICTION_ROUTES \
+            or seconds * 1000 > FAST_REQUEST_MS:
+        return
+    elapsed = startup['seconds_to_first_fast_request'] = perf_counter() - PROCESS_START
+    STARTUP_SECONDS.set(elapsed, 'first_fast_request')
+    logger.info("First fast request (%s %s in %.1f ms) served %.2f s after import",
+                method, route, seconds * 1000, elapsed)
+
+
+app.add_middleware(
+    MetricsMiddleware,
+    requests=metrics.counter('http_requests_total', 'HTTP requests served.', ['method', 'route', 'status']),
+    latency=metrics.histogram('http_request_duration_seconds', 'End-to-end HTTP request latency.',
+                              label_names=['method', 'route']),
+    observer=track_first_fast_request)
+
+
+@app.exception_handler(RequestValidationError)
+async def request_validation_error(request, exc):
+    """
+    Answer an invalid request body with 422, like FastAPI does, but with non-finite inputs quoted.
+
+    The errors echo each rejected input, and NaN or Infinity would otherwise make the error body itself invalid JSON.
+
+    Args:
+        request (Request): The request.
+        exc (RequestValidationError): The validation errors.
+
+    Returns:
+        JSONResponse: The 422 response.
+    """
+    detail = jsonable_encoder(exc.errors(), custom_encoder={float: lambda v: v if isfinite(v) else str(v)})
+    return JSONResponse(status_code=422, content={'detail': detail})
+
+
+@app.get("/ready")
+def ready():
+    """
+    Report whether the model artifacts are loaded and warm, and the state of the catalog indexes.
+
+    Readiness only depends on the model: the catalog endpoints answer 503 on their own while the indexes are
+    unavailable.
+
+    Returns:
+        JSONResponse: 200 with the model version once ready, otherwise 503 with the startup state and any error;
+            both with the index state and any index error.
+    """
+    indexes = {"indexes": startup['indexes'], "indexes_error": startup['indexes_error']}
+    if bundle is None:
+        return JSONResponse(status_code=503, content={"status": startup['state'], "error": startup['error'],
+                                                      **indexes},
+                            headers={"Retry-After": "1"})
+    return {"status": "ready", "version": bundle.version, "seconds_to_ready": startup['seconds_to_ready'],
+            "seconds_to_first_fast_request": startup['seconds_to_first_fast_request'], **indexes}
+
+
+@app.post("/predict")
+async def predict(data: PredictionRequest):
+    """
+    Predict the status of a satellite based on input features.
+
+    Repeated requests are answered from the prediction cache. Other concurrent requests are scored together by the
+    micro-batcher unless PREDICT_MICRO_BATCHING is disabled.
+
+    Args:
+        data (PredictionRequest): Input data for prediction.
+
+    Returns:
+        dict: Dictionary containing the predicted status.
+    """
+    model_bundle = current_bundle()
+    start = perf_counter_ns()
+    prediction_cache.validate(model_bundle.version)
+    key = prediction_cache.key(data)
+    result = prediction_cache.get(key)
+    STAGES['cache'].observe_since(start)
+    if result is MISSING:
+        if batcher is None:
+            result = await run_in_threadpool(predict_one, data, model_bundle)
+        else:
+            try:
+                start = perf_counter_ns()
+                # Scored with the bundle the request arrived under, even when a new version is swapped in meanwhile
+                result = await batcher.submit(data, model_bundle)
+                STAGES['micro_batch'].observe_since(start)
+            except Exception as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        # Do not cache a result of the previous model under a version swapped in meanwhile
+        if bundle is model_bundle:
+            prediction_cache.put(key, result)
+    return json_response({"prediction": result[0]})
+
+
+@app.get("/stats/batching")
+def batching_stats():
+    """
+    Report micro-batching configuration and counters.
+
+    Returns:
+        dict: The batcher statistics, or {"enabled": False} when micro-batching is off.
+    """
+    if batcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **batcher.stats()}
+
+
+@app.get("/model")
+def model_info():
+    """
+    Report the model version being served and the hot-reload history.
+
+    Returns:
+        dict: The current version, whether new versions are watched for, and reload counters and timings.
+    """
+    model_bundle = current_bundle()
+    return {"version": model_bundle.version, "watching": MODEL_WATCH_INTERVAL_SECONDS > 0,
+            **{k: v for k, v in (watcher.stats() if watcher else {}).items() if k != 'version'}}
+
+
+@app.get("/stats/cache")
+def cache_stats():
+    """
+    Report prediction cache configuration and counters.
+
+    Returns:
+        dict: The prediction cache statistics.
+    """
+    return prediction_cache.stats()
+
+
+@app.post("/predict/batch")
+def predict_batch(data: BatchPredictionRequest):
+    """
+    Predict the status of many satellites in one vectorized call.
+
+    Args:
+        data (BatchPredictionRequest): Input data for prediction, one item per object.
+
+    Returns:
+        dict: Dictionary containing the predicted status and its probability for each item, in input order.
+    """
+    model_bundle = current_bundle()
+    if len(data.items) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413, detail=f"Batch size exceeds {MAX_BATCH_SIZE} items")
+    if not data.items:
+        return {"predictions": []}
+    start = perf_counter_ns()
+    prediction_cache.validate(model_bundle.version)
+    keys = [prediction_cache.key(item) for item in data.items]
+    results = [prediction_cache.get(key) for key in keys]
+    misses = [i for i, result in enumerate(results) if result is MISSING]
+    STAGES['cache'].observe_since(start)
+    if misses:
+        try:
+            scored = score_items([data.items[i] for i in misses], 'batch', model_bundle)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        cacheable = bundle is model_bundle
+        for i, result in zip(misses, scored):
+            results[i] = result
+            if cacheable:
+                prediction_cache.put(keys[i], result)
+    return json_response({"predictions": [{"prediction": label, "probability": p} for label, p in results]})
+
+
+@app.post("/predict/stream")
+async def predict_stream(request: Request):
+    """
+    Score an NDJSON or CSV stream of objects and stream NDJSON predictions back.
+
+    Rows are read as they arrive and scored in vectorized batches of STREAM_BATCH_SIZE. The next part of the body
+    is only read once the previous batch has been sent, so neither side holds the full catalog in memory and a slow
+    reader slows the upload down. Send CSV with a text/csv content type; anything else is read as NDJSON.
+
+    Args:
+        request (Request): The incoming request with a streamed body.
+
+    Returns:
+        StreamingResponse: NDJSON lines with the prediction and probability (or an error) for each row, in input order.
+    """
+    model_bundle = current_bundle()
+    csv = 'csv' in request.headers.get('content-type', '')
+
+    async def score(rows):
+        # A batch that fails to score answers its rows with errors; the rest of the stream is still scored
+        try:
+            return await run_in_threadpool(score_stream_rows, rows, model_bundle)
+        except Exception as e:
+            logger.exception("Scoring a streamed batch of %d rows failed", len(rows))
+            return stream_batch_error(rows, e)
+
+    async def generate():
+        rows = []
+        async for row in iter_rows(request.stream(), csv):
+            rows.append(row)
+            if len(rows) >= STREAM_BATCH_SIZE:
+                yield await score(rows)
+                rows = []
+        if rows:
+            yield await score(rows)
+
+    return BodyStreamingResponse(generate(), media_type='application/x-ndjson')
+
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """
+    Export request, stage latency, batch size, cache and model load metrics.
+
+    Returns:
+        Response: The metrics in the Prometheus text exposition format.
+    """
+    return Response(metrics.render(), media_type=CONTENT_TYPE)
+
+
+@app.get("/orbits/band")
+def orbits_band(altitude_min: float, altitude_max: float, inclination: float = None,
+                inclination_tolerance: float = 1.0, limit: int = 1000):
+    """
+    List objects whose perigee-apogee band crosses an altitude range.
+
+    Args:
+        altitude_min (float): Lower bound of the altitude range in kilometers.
+        altitude_max (float): Upper bound of the altitude range in kilometers.
+        inclination (float, optional): Center of the inclination window in degrees. Default is None (any inclination).
+        inclination_tolerance (float, optional): Half-width of the inclination window in degrees. Default is 1.0.
+        limit (int, optional): Maximum number of objects to return. Default is 1000.
+
+    Returns:
+        dict: Dictionary containing the number of matches and the matching objects.
+    """
+    require_indexes()
+    if altitude_min > altitude_max:
+        raise HTTPException(
+            status_code=400, detail="altitude_min must not exceed altitude_max")
+    inclination_min = inclination_max = None
+    if inclination is not None:
+        inclination_min = inclination - inclination_tolerance
+        inclination_max = inclination + inclination_tolerance
+    matches = orbit_index.band_query(
+        altitude_min, altitude_max, inclination_min, inclination_max)
+    return {"count": len(matches), "objects": to_records(matches.head(limit))}
+
+
+@app.get("/orbits/nearest")
+def orbits_nearest(perigee_km: float, apogee_km: float, inclination: float, k: int = 10):
+    """
+    List the k objects with the closest orbits to the given orbital elements.
+
+    Args:
+        perigee_km (float): Perigee of the reference orbit in kilometers.
+        apogee_km (float): Apogee of the reference orbit in kilometers.
+        inclination (float): Inclination of the reference orbit in degrees.
+        k (int, optional): Number of neighbors to return. Default is 10.
+
+    Returns:
+        dict: Dictionary containing the nearest objects.
+    """
+    require_indexes()
+    if k < 1:
+        raise HTTPException(status_code=400, detail="k must be positive")
+    neighbors = orbit_index.nearest(perigee_km, apogee_km, inclination, k)
+    return {"objects": to_records(neighbors)}
+
+
+@app.get("/search/autocomplete")
+def search_autocomplete(q: str, limit: int = 10):
+    """
+    Autocomplete a partial object name, designation, catalog number or alternate name.
+
+    Args:
+        q (str): The partial query.
+        limit (int, optional): Maximum number of hits to return. Default is 10.
+
+    Returns:
+        dict: Dictionary containing the ranked hits.
+    """
+    require_indexes()
+    if limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be positive")
+    return {"hits": name_index.search(q, limit)}
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -1,24 +1,22 @@
 # app.py
-from joblib import load
 import streamlit as st
-from os import path
+from os import environ, path
+from types import SimpleNamespace
+from plotly.io import from_json
 import add_path
-import requests
+from requests import Session
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from src.annual_launches_by_sat_type import get_launch_count_by_sat_class_plot
 from src.annual_launches_by_country import get_annual_launches_by_org_plot
 from src.sat_growth_over_time import get_sat_growth_over_time_plot, get_starlink_vs_all_other_sats_plot
-from src.local import ARTIFACTS_PATH
+from src.figure_cache import figure_cache_key, get_figure_json
+from src.local import ARTIFACTS_PATH, MODELS_PATH
+from src.model_registry import current_version
 
 st.set_page_config(page_title="Artificial Space Objects Dashboard")
 
 
-@st.cache_data
-def load_data(filepath):
-    """Load data from a joblib file."""
-    with open(filepath, 'rb') as f:
-        return load(f)
-
-
 # Dictionary to store filenames and their corresponding human-readable names
 filenames = {
     'launch_decay_orbit_over_time': 'Satellite Growth Over Time',
@@ -27,10 +25,6 @@ filenames = {
     'launch_count_by_sat_class': 'Annual Number of Launches by Satellite Type'
 }
 
-# Load data for each visualization
-data = {key: load_data(path.join(ARTIFACTS_PATH, f"{key}.joblib"))
-        for key in filenames.keys()}
-
 # Dictionary to map visualization names to their corresponding functions
 plot_functions = {
     "Satellite Growth Over Time": get_sat_growth_over_time_plot,
@@ -52,9 +46,84 @@ status_mapping = {
 }
 
 
+API_URL = environ.get('API_URL', 'https://aso-status-prediction-api.onrender.com')
+# 'remote' calls the prediction API; 'local' scores in process with the published model, without any network
+PREDICTION_BACKEND = environ.get('PREDICTION_BACKEND', 'remote')
+API_CONNECT_TIMEOUT_SECONDS = float(environ.get('API_CONNECT_TIMEOUT_SECONDS', 5))
+# Generous, as a sleeping Render instance takes a while to answer its first request
+API_READ_TIMEOUT_SECONDS = float(environ.get('API_READ_TIMEOUT_SECONDS', 60))
+API_RETRIES = int(environ.get('API_RETRIES', 2))
+API_POOL_SIZE = int(environ.get('API_POOL_SIZE', 10))
+
+
+@st.cache_resource
+def get_session():
+    """
+    Create the HTTP session shared by every user of the app.
+
+    The session keeps connections to the API alive, so only the first request pays for DNS and the TLS handshake.
+    Failed connections and 502, 503 and 504 responses, which the API returns while it starts, are retried with
+    exponential backoff; both endpoints called are idempotent.
+
+    Returns:
+        requests.Session: The pooled session.
+    """
+    session = Session()
+    retry = Retry(total=API_RETRIES, backoff_factor=0.5, status_forcelist=(502, 503, 504),
+                  allowed_methods=frozenset({'GET', 'POST'}), raise_on_status=False)
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=1, pool_maxsize=API_POOL_SIZE)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+@st.cache_resource(max_entries=1)
+def load_local_bundle(dirpath, published):
+    """
+    Load the model bundle for in-process predictions once per directory.
+
+    A published version is verified against its manifest like the API verifies it, so a corrupt or partly copied
+    version is refused rather than scored with.
+
+    Args:
+        dirpath (str): The published version directory, or the artifacts directory when nothing is published; a
+            newly published version is a new directory and replaces the cached bundle.
+        published (bool): Whether dirpath is a published version.
+
+    Returns:
+        ModelBundle: The bundle, with the flat forest only when there is one, otherwise the sklearn model.
+    """
+    from src.model_bundle import ModelBundle
+
+    return ModelBundle.load(dirpath, flat_only=True, published=published)
+
+
+def get_local_prediction(payload):
+    """
+    Predict in process with the current published model, answering like the prediction API.
+
+    Args:
+        payload (dict): Dictionary containing the input features.
+
+    Returns:
+        dict: Dictionary containing the predicted status, or the error detail when the model cannot be loaded.
+    """
+    version = current_version(MODELS_PATH)
+    try:
+        model_bundle = load_local_bundle(path.join(MODELS_PATH, version) if version else ARTIFACTS_PATH,
+                                         version is not None)
+    except (OSError, ValueError) as e:
+        return {'detail': f"The model could not be loaded: {e}"}
+    forest = model_bundle.flat_model if model_bundle.flat_model is not None else model_bundle.model
+    if forest is None:
+        return {'detail': "The model artifacts have neither a flat forest nor a sklearn model to predict with"}
+    labels, _ = model_bundle.pipeline.predict_items([SimpleNamespace(**payload)], forest)
+    return {'prediction': labels[0]}
+
+
 def get_prediction(payload):
     """
-    Call the prediction API with the given payload.
+    Predict the status for the given payload with the configured backend.
 
     Args:
         payload (dict): Dictionary containing the input features.
@@ -62,11 +131,30 @@ def get_prediction(payload):
     Returns:
         dict: API response containing the prediction.
     """
-    url = 'https://aso-status-prediction-api.onrender.com/predict'
-    response = requests.post(url, json=payload)
+    if PREDICTION_BACKEND == 'local':
+        return get_local_prediction(payload)
+    url = f'{API_URL}/predict'
+    response = get_session().post(url, json=payload, timeout=(API_CONNECT_TIMEOUT_SECONDS, API_READ_TIMEOUT_SECONDS))
     return response.json()
 
 
+def get_search_hits(query, limit=10):
+    """
+    Call the autocomplete API with a partial object name or designation.
+
+    Args:
+        query (str): The partial name, designation or catalog number.
+        limit (int, optional): Maximum number of hits to return. Default is 10.
+
+    Returns:
+        list[dict]: The ranked hits returned by the API.
+    """
+    url = f'{API_URL}/search/autocomplete'
+    response = get_session().get(url, params={'q': query, 'limit': limit},
+                                 timeout=(API_CONNECT_TIMEOUT_SECONDS, API_READ_TIMEOUT_SECONDS))
+    return response.json().get('hits', [])
+
+
 def render_home():
     """Render the home page with an introduction and overview."""
     st.title("Artificial Space Objects Dashboard")
@@ -102,6 +190,7 @@ def render_home():
     ### How to Use the App
     - **Home:** This page provides an overview of the ASO Dashboard.
     - **Prediction Form:** Use this form to input satellite characteristics and predict their status.
+    - **Catalog Search:** Look up objects by partial name, designation, catalog number or alternate name.
     - **Visualizations:** Explore various visualizations to understand trends and patterns in ASO data.
 
     ### Access the App
@@ -149,11 +238,33 @@ def render_prediction_form():
                 "object_type": object_type
             }
             prediction = get_prediction(payload)
+            if 'prediction' not in prediction and 'detail' in prediction:
+                st.error(f"Prediction failed: {prediction['detail']}")
+                return
             prediction_str = status_mapping.get(
                 prediction.get('prediction'), 'Unknown')
             st.success(f"Prediction: {prediction_str}")
 
 
+def render_search():
+    """Render the catalog search page with a search box and the matching objects."""
+    st.header("Catalog Search")
+    query = st.text_input(
+        "Search objects", help="Enter part of an object name, international designation, catalog number or alternate name.")
+    if query:
+        hits = get_search_hits(query, limit=25)
+        if hits:
+            st.dataframe(hits, use_container_width=True)
+        else:
+            st.info("No matching objects found.")
+
+
+@st.cache_resource(max_entries=32)
+def load_figure(cache_key, artifact_path, _plot_func):
+    """Load a cached figure once per cache key; the key changes whenever the artifact does."""
+    return from_json(get_figure_json(artifact_path, _plot_func))
+
+
 def render_visualizations():
     """Render the visualizations page for user to select and display different visualizations."""
     st.header("Visualizations")
@@ -163,18 +274,22 @@ def render_visualizations():
         plot_func = plot_functions[viz_choice]
         filename = list(filenames.keys())[
             list(filenames.values()).index(viz_choice)]
-        fig = plot_func(display_data=data[filename])
+        artifact_path = path.join(ARTIFACTS_PATH, f"{filename}.joblib")
+        fig = load_figure(figure_cache_key(
+            artifact_path, plot_func), artifact_path, plot_func)
         st.plotly_chart(fig)
 
 
 if __name__ == "__main__":
     # Sidebar navigation
     page = st.sidebar.radio(
-        "Go to", ["Home", "Prediction Form", "Visualizations"])
+        "Go to", ["Home", "Prediction Form", "Catalog Search", "Visualizations"])
 
     if page == "Home":
         render_home()
     elif page == "Prediction Form":
         render_prediction_form()
+    elif page == "Catalog Search":
+        render_search()
     elif page == "Visualizations":
         render_visualizations()
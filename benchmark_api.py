@@ -0,0 +1,409 @@
+# benchmark_api.py
+from argparse import ArgumentParser
+from asyncio import Semaphore, create_task, gather, run, sleep
+from contextlib import AsyncExitStack
+from json import dump, dumps, load as json_load
+from os import path
+from subprocess import Popen
+from sys import executable
+from time import perf_counter, sleep as blocking_sleep
+from httpx import ASGITransport, AsyncClient, HTTPError, get
+from joblib import load
+from numpy import clip, percentile
+from numpy.random import default_rng
+from pandas import read_csv
+from src.local import ARTIFACTS_PATH, DATA_PATH
+from src.model_bundle import load_preprocessor
+from src.preprocessing import CATEGORICAL_FEATURES, NUMERIC_FEATURES
+
+FEATURES = NUMERIC_FEATURES + CATEGORICAL_FEATURES
+ENDPOINTS = {'predict': '/predict', 'batch': '/predict/batch', 'stream': '/predict/stream'}
+
+
+def sample_features(n, seed=0, data_path=DATA_PATH, artifacts_path=ARTIFACTS_PATH):
+    """
+    Sample request payloads from the distribution the model was trained on.
+
+    Whole rows are drawn from the training CSV so the features keep their joint distribution. Without the CSV,
+    numeric features are drawn from normal distributions with the fitted scaler's means and scales and object types
+    uniformly from the preprocessor's classes.
+
+    Args:
+        n (int): The number of payloads.
+        seed (int, optional): Seed of the random generator. Default is 0.
+        data_path (str, optional): Directory holding combined_df.csv. Default is DATA_PATH.
+        artifacts_path (str, optional): Directory holding the scaler and preprocessor. Default is ARTIFACTS_PATH.
+
+    Returns:
+        list[dict]: One feature dictionary per payload.
+    """
+    csv_path = path.join(data_path, 'combined_df.csv')
+    if path.exists(csv_path):
+        data = read_csv(csv_path, usecols=FEATURES, low_memory=False).dropna()
+        data = data.sample(n, replace=True, random_state=seed)
+        data[NUMERIC_FEATURES] = data[NUMERIC_FEATURES].astype(float)
+        data['object_type'] = data['object_type'].astype(str)
+        return data.to_dict(orient='records')
+
+    rng = default_rng(seed)
+    scaler = load(path.join(artifacts_path, 'scaler.joblib'))
+    classes = load_preprocessor(artifacts_path).encoders['object_type'].classes
+    columns = [FEATURES.index(col) for col in NUMERIC_FEATURES]
+    numeric = clip(rng.normal(scaler.mean_[columns], scaler.scale_[columns], (n, len(columns))), 0, None)
+    object_types = rng.choice(classes, n)
+    return [dict(zip(NUMERIC_FEATURES, row), object_type=str(object_type))
+            for row, object_type in zip(numeric.tolist(), object_types)]
+
+
+def parse_mix(mix):
+    """
+    Parse an endpoint mix such as 'predict=0.9,batch=0.1'.
+
+    Args:
+        mix (str): Comma-separated endpoint=weight pairs.
+
+    Returns:
+        dict: Endpoint names mapped to weights normalized to sum to one.
+    """
+    weights = {}
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint '{name}', expected one of {list(ENDPOINTS)}")
+        weights[name.strip()] = float(weight or 1)
+    total = sum(weights.values())
+    return {name: weight / total for name, weight in weights.items()}
+
+
+def plan_requests(pool, mix, n_requests, batch_size, seed=0):
+    """
+    Draw the sequence of requests a run sends.
+
+    Args:
+        pool (list[dict]): Payloads to draw from; a small pool repeats payloads and exercises the prediction cache.
+        mix (dict): Endpoint names mapped to weights.
+        n_requests (int): The number of requests.
+        batch_size (int): Objects per batch or stream request.
+        seed (int, optional): Seed of the random generator. Default is 0.
+
+    Returns:
+        list[tuple]: (endpoint name, number of objects, request keyword arguments) for each request.
+    """
+    rng = default_rng(seed)
+    kinds = rng.choice(list(mix), n_requests, p=list(mix.values()))
+    plan = []
+    for kind in kinds:
+        if kind == 'predict':
+            plan.append((kind, 1, {'json': pool[rng.integers(len(pool))]}))
+            continue
+        items = [pool[i] for i in rng.integers(len(pool), size=batch_size)]
+        if kind == 'batch':
+            plan.append((kind, batch_size, {'json': {'items': items}}))
+        else:
+            body = ''.join(dumps(item) + '\n' for item in items).encode()
+            plan.append((kind, batch_size, {'content': body, 'headers': {'content-type': 'application/x-ndjson'}}))
+    return plan
+
+
+async def send(client, kind, kwargs, scheduled=None):
+    """
+    Send one request and time it.
+
+    Args:
+        client (httpx.AsyncClient): The client.
+        kind (str): The endpoint name.
+        kwargs (dict): Keyword arguments of the request.
+        scheduled (float, optional): perf_counter time the request was due to be sent in an open-loop run; latency
+            is measured from it so queueing in the harness is not hidden. Default is None (measure from sending).
+
+    Returns:
+        tuple: Latency in seconds and whether the request succeeded.
+    """
+    start = perf_counter() if scheduled is None else scheduled
+    try:
+        response = await client.post(ENDPOINTS[kind], **kwargs)
+        ok = response.status_code == 200
+    except HTTPError:
+        ok = False
+    return perf_counter() - start, ok
+
+
+async def run_load(client, plan, concurrency, rate=None, seed=0):
+    """
+    Drive the service with a request plan.
+
+    Without a rate the run is closed-loop: concurrency workers each send their next request as soon as the previous
+    one returns, which measures peak throughput. With a rate the run is open-loop: requests arrive as a Poisson
+    process at that rate, at most concurrency of them in flight, which measures latency at a given load.
+
+    Args:
+        client (httpx.AsyncClient): The client.
+        plan (list[tuple]): The requests from plan_requests.
+        concurrency (int): The number of requests in flight at most.
+        rate (float, optional): Arrival rate in requests per second. Default is None (closed loop).
+        seed (int, optional): Seed of the arrival times. Default is 0.
+
+    Returns:
+        tuple: The (endpoint name, objects, latency, ok) result of each request and the elapsed seconds.
+    """
+    results = []
+    start = perf_counter()
+    if rate is None:
+        requests = iter(plan)
+
+        async def worker():
+            for kind, rows, kwargs in requests:
+                latency, ok = await send(client, kind, kwargs)
+                results.append((kind, rows, latency, ok))
+
+        await gather(*(worker() for _ in range(concurrency)))
+    else:
+        slots = Semaphore(concurrency)
+        arrivals = start + default_rng(seed).exponential(1 / rate, len(plan)).cumsum()
+
+        async def scheduled_send(kind, rows, kwargs, scheduled):
+            async with slots:
+                latency, ok = await send(client, kind, kwargs, scheduled)
+            results.append((kind, rows, latency, ok))
+
+        tasks = []
+        for (kind, rows, kwargs), scheduled in zip(plan, arrivals):
+            await sleep(max(0.0, scheduled - perf_counter()))
+            tasks.append(create_task(scheduled_send(kind, rows, kwargs, scheduled)))
+        await gather(*tasks)
+    return results, perf_counter() - start
+
+
+def summarize(results, elapsed):
+    """
+    Summarize request results into throughput and latency percentiles.
+
+    Args:
+        results (list[tuple]): (endpoint name, objects, latency, ok) per request.
+        elapsed (float): Wall time of the run in seconds.
+
+    Returns:
+        dict: Overall and per-endpoint request counts, errors, throughput and latency percentiles in milliseconds.
+    """
+    def stats(subset):
+        latencies = [latency * 1000 for _, _, latency, ok in subset if ok]
+        summary = {
+            'requests': len(subset),
+            'errors': sum(1 for *_, ok in subset if not ok),
+            'throughput_rps': len(subset) / elapsed,
+            'objects_per_second': sum(rows for _, rows, _, _ in subset) / elapsed
+        }
+        if latencies:
+            p50, p95, p99 = percentile(latencies, [50, 95, 99]).tolist()
+            summary['latency_ms'] = {'mean': sum(latencies) / len(latencies), 'p50': p50, 'p95': p95, 'p99': p99,
+                                     'max': max(latencies)}
+        return summary
+
+    kinds = sorted({kind for kind, *_ in results})
+    return {'elapsed_seconds': elapsed, **stats(results),
+            'endpoints': {kind: stats([r for r in results if r[0] == kind]) for kind in kinds}}
+
+
+def compare(report, baseline, tolerance):
+    """
+    Find throughput and p99 latency regressions against a baseline report.
+
+    Args:
+        report (dict): The current report.
+        baseline (dict): A report from an earlier run with the same settings.
+        tolerance (float): Allowed relative slowdown, e.g. 0.2 for 20%.
+
+    Returns:
+        list[str]: One message per regression; empty when there is none.
+    """
+    regressions = []
+    baseline_runs = {(run['concurrency'], run['rate']): run for run in baseline['runs']}
+    for run in report['runs']:
+        base = baseline_runs.get((run['concurrency'], run['rate']))
+        if base is None:
+            continue
+        for kind, current in run['endpoints'].items():
+            previous = base['endpoints'].get(kind)
+            if previous is None:
+                continue
+            name = f"{kind} at concurrency {run['concurrency']}" + (f", rate {run['rate']}" if run['rate'] else '')
+            if current['throughput_rps'] < previous['throughput_rps'] * (1 - tolerance):
+                regressions.append(f"{name}: throughput {current['throughput_rps']:.1f} req/s "
+                                   f"< baseline {previous['throughput_rps']:.1f} req/s")
+            if 'latency_ms' in current and 'latency_ms' in previous and \
+                    current['latency_ms']['p99'] > previous['latency_ms']['p99'] * (1 + tolerance):
+                regressions.append(f"{name}: p99 {current['latency_ms']['p99']:.2f} ms "
+                                   f"> baseline {previous['latency_ms']['p99']:.2f} ms")
+    return regressions
+
+
+def is_ready(response):
+    """
+    Read a /ready response.
+
+    Args:
+        response (httpx.Response): The response.
+
+    Returns:
+        bool: Whether the service is ready; False while it is still loading.
+
+    Raises:
+        RuntimeError: If the service failed to load its model, which it does not retry until a new version is
+            published.
+    """
+    if response.status_code == 200:
+        return True
+    content = response.json()
+    if content.get('status') == 'failed':
+        raise RuntimeError(f"Service failed to load its model: {content.get('error')}")
+    return False
+
+
+def start_server(port, workers):
+    """
+    Start api.py under uvicorn on localhost and wait until it reports ready.
+
+    Args:
+        port (int): The port to listen on.
+        workers (int): The number of uvicorn worker processes.
+
+    Returns:
+        subprocess.Popen: The server process.
+
+    Raises:
+        RuntimeError: If the server exits or fails to load its model.
+        TimeoutError: If the server is not ready within 300 seconds.
+    """
+    server = Popen([executable, '-m', 'uvicorn', 'api:app', '--host', '127.0.0.1', '--port', str(port),
+                    '--workers', str(workers), '--log-level', 'warning'])
+    deadline = perf_counter() + 300
+    while perf_counter() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with code {server.returncode}")
+        try:
+            if is_ready(get(f'http://127.0.0.1:{port}/ready', timeout=1)):
+                return server
+        except HTTPError:
+            pass
+        except RuntimeError:
+            server.terminate()
+            raise
+        blocking_sleep(0.5)
+    server.terminate()
+    raise TimeoutError("Server did not start within 300 seconds")
+
+
+async def wait_until_ready(client, timeout=300):
+    """
+    Poll /ready until the service has loaded and warmed its model.
+
+    Args:
+        client (httpx.AsyncClient): The client.
+        timeout (float, optional): Seconds to wait at most. Default is 300.
+
+    Returns:
+        None
+
+    Raises:
+        RuntimeError: If the service failed to load its model.
+        TimeoutError: If the service is still loading after timeout seconds.
+    """
+    deadline = perf_counter() + timeout
+    while not is_ready(await client.get('/ready')):
+        if perf_counter() > deadline:
+            raise TimeoutError(f"Service was not ready within {timeout} seconds")
+        await sleep(0.2)
+
+
+async def benchmark(args):
+    """
+    Run the benchmark for every concurrency level.
+
+    Args:
+        args (argparse.Namespace): The parsed command-line arguments.
+
+    Returns:
+        dict: The report with the settings and one summary per concurrency level.
+    """
+    mix = parse_mix(args.mix)
+    pool = sample_features(args.pool_size, args.seed)
+    runs = []
+    async with AsyncExitStack() as stack:
+        if args.url:
+            client = AsyncClient(base_url=args.url, timeout=args.timeout)
+        else:
+            # Imported here so running against a URL does not load the model into this process
+            from api import app
+            # The ASGI transport does not send lifespan events, so run the app's startup here
+            await stack.enter_async_context(app.router.lifespan_context(app))
+            client = AsyncClient(transport=ASGITransport(app=app), base_url='http://benchmark', timeout=args.timeout)
+        await stack.enter_async_context(client)
+        await wait_until_ready(client)
+        await run_load(client, plan_requests(pool, mix, args.warmup, args.batch_size, args.seed + 1),
+                       max(args.concurrency))
+        for concurrency in args.concurrency:
+            plan = plan_requests(pool, mix, args.requests, args.batch_size, args.seed + concurrency)
+            results, elapsed = await run_load(client, plan, concurrency, args.rate, args.seed)
+            runs.append({'concurrency': concurrency, 'rate': args.rate, **summarize(results, elapsed)})
+    return {
+        'target': args.url or 'in-process',
+        'mix': mix,
+        'requests_per_run': args.requests,
+        'batch_size': args.batch_size,
+        'pool_size': args.pool_size,
+        'runs': runs
+    }
+
+
+def main():
+    """Parse arguments, run the benchmark and write the JSON report."""
+    parser = ArgumentParser(description="Benchmark the prediction API under concurrent load.")
+    parser.add_argument('--url', help="base URL of a running service; default runs api.py in-process")
+    parser.add_argument('--serve', action='store_true', help="start api.py under uvicorn on localhost first")
+    parser.add_argument('--port', type=int, default=8765, help="port used with --serve")
+    parser.add_argument('--workers', type=int, default=1, help="uvicorn workers used with --serve")
+    parser.add_argument('--concurrency', default='1,8,32',
+                        help="comma-separated concurrency levels, one run each")
+    parser.add_argument('--rate', type=float, help="open-loop arrival rate in requests per second")
+    parser.add_argument('--requests', type=int, default=2000, help="requests per run")
+    parser.add_argument('--warmup', type=int, default=200, help="unrecorded requests sent before the runs")
+    parser.add_argument('--mix', default='predict=0.9,batch=0.1',
+                        help="endpoint weights, e.g. predict=0.8,batch=0.1,stream=0.1")
+    parser.add_argument('--batch-size', type=int, default=100, help="objects per batch or stream request")
+    parser.add_argument('--pool-size', type=int, default=10000,
+                        help="distinct payloads sampled; smaller pools repeat requests more often")
+    parser.add_argument('--seed', type=int, default=0, help="random seed")
+    parser.add_argument('--timeout', type=float, default=60.0, help="request timeout in seconds")
+    parser.add_argument('--output', help="file the JSON report is written to; default prints it")
+    parser.add_argument('--baseline', help="earlier JSON report to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="allowed relative throughput drop or p99 increase against the baseline")
+    args = parser.parse_args()
+    args.concurrency = [int(c) for c in args.concurrency.split(',')]
+
+    server = None
+    if args.serve:
+        server = start_server(args.port, args.workers)
+        args.url = f'http://127.0.0.1:{args.port}'
+    try:
+        report = run(benchmark(args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            report['regressions'] = compare(report, json_load(f), args.tolerance)
+        exit_code = 1 if report['regressions'] else 0
+    if args.output:
+        with open(args.output, 'w') as f:
+            dump(report, f, indent=2)
+    else:
+        print(dumps(report, indent=2))
+    return exit_code
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -1,130 +1,617 @@
 # model_creation.py
-from src.local import ARTIFACTS_PATH, DATA_PATH
-from joblib import dump
-from sklearn.metrics import accuracy_score, confusion_matrix, classification_report
+from src.catalog_delta import SNAPSHOT_FILE, CatalogSnapshot
+from src.feature_store import FeatureStore, feature_key
+from src.forest_compaction import COMPACTION_OBJECTIVES, compact_forest, first_trees
+from src.local import ARTIFACTS_PATH, DATA_PATH, FEATURE_STORE_PATH, MODELS_PATH
+from src.model_bundle import BUNDLE_FILES
+from src.io_utils import write_atomic
+from src.model_registry import publish_version
+from src.pipeline import PIPELINE_FILE, InferencePipeline
+from src.preprocessing import CATEGORICAL_FEATURES, PREPROCESSOR_FILE, FeaturePreprocessor
+from src.profiling import REPORT_FILE, StageProfiler, cv_fit_times, max_rss_mb
+from argparse import ArgumentParser
+from joblib import cpu_count, dump, load
+from math import ceil, floor, log
+from numpy import append, concatenate, flatnonzero, load as np_load, nanmax, save, setdiff1d, unique
+from numpy.random import default_rng
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from sklearn.metrics import accuracy_score, confusion_matrix, classification_report, f1_score
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.impute import SimpleImputer
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.model_selection import train_test_split, GridSearchCV
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.preprocessing import StandardScaler
+from sklearn.model_selection import train_test_split, GridSearchCV, HalvingGridSearchCV, HalvingRandomSearchCV, \
+    ParameterGrid
 from pandas import read_csv
 from os import path
 
+SEARCH_MODES = ['grid', 'halving_grid', 'halving_random']
+CV_FOLDS = 3
+# Smallest number of trees a candidate is scored with when trees are the halving budget
+MIN_TREES = 10
+# Size of one node record in a fitted sklearn tree, without its class values
+NODE_BYTES = 64
 
-def load_and_preprocess_data(file_path, features, target):
+
+def load_and_preprocess_data(file_path, features, target, use_cache=True, profiler=None):
     """
     Load and preprocess the dataset.
 
+    Numeric features are imputed with their median and kept as float32; only categorical features are imputed with
+    their most frequent value and encoded. The prepared matrices are cached in the feature store, keyed by the CSV
+    contents and the feature and target spec, so later runs on the same data skip reading and preprocessing and
+    load them memory-mapped. The fitted preprocessor and status mapping are saved for serving.
+
     Args:
         file_path (str): The path to the CSV file containing the data.
-        features (list): List of feature column names.
+        features (list): List of feature column names, numeric features first.
         target (str): The name of the target column.
+        use_cache (bool, optional): Whether to reuse a cached matrix. Default is True.
+        profiler (StageProfiler, optional): Records the loading and preprocessing stages. Default is None.
 
     Returns:
-        tuple: A tuple containing the preprocessed feature matrix (X), target vector (y), and label encoders.
+        tuple: A tuple containing the preprocessed float32 feature matrix (X), target vector (y), feature
+            preprocessor, and status mapping.
     """
-    # Load the dataset
-    data = read_csv(file_path, low_memory=False)
+    profiler = profiler or StageProfiler(trace_memory=False)
+    numeric_features = [col for col in features if col not in CATEGORICAL_FEATURES]
+    categorical_features = [col for col in features if col in CATEGORICAL_FEATURES]
+    store = FeatureStore(FEATURE_STORE_PATH)
+    with profiler.stage('feature_cache_lookup') as record:
+        key = feature_key(file_path, numeric_features, categorical_features, target)
+        cached = store.get(key) if use_cache else None
+        record['hit'] = cached is not None
+
+    if cached is None:
+        # Load the dataset
+        with profiler.stage('read_csv') as record:
+            data = read_csv(file_path, low_memory=False)
+            record['rows'] = len(data)
+
+        # Ensure the target column has no missing values
+        data[target] = data[target].fillna(data[target].mode()[0])
+
+        # Impute and encode the features by type; both happen in one pass over a float32 matrix
+        with profiler.stage('impute_and_encode'):
+            preprocessor = FeaturePreprocessor(numeric_features, categorical_features)
+            X = preprocessor.fit_transform(data)
+
+        # Create a status mapping dynamically to include all unique statuses
+        unique_statuses = data[target].unique()
+        status_mapping = {label: idx for idx, label in enumerate(unique_statuses)}
+
+        # Map the target column using the dynamic status mapping
+        data[target] = data[target].map(status_mapping)
+
+        # Check for any NaN values in the mapped target column
+        if data[target].isnull().sum() > 0:
+            raise ValueError(
+                "The 'status' column contains NaN values after mapping.")
+
+        with profiler.stage('feature_cache_write'):
+            cached = store.put(key, X, data[target].to_numpy(), preprocessor, status_mapping)
+        print(f"Prepared features cached as {key} in {FEATURE_STORE_PATH}")
+    else:
+        print(f"Loaded cached features {key} from {FEATURE_STORE_PATH}")
+    X, y, preprocessor, status_mapping = cached
+
+    # Save the preprocessor and status mapping for later use
+    # The API may be serving these files, so they are replaced rather than overwritten
+    write_atomic(path.join(ARTIFACTS_PATH, PREPROCESSOR_FILE), preprocessor.save)
+    write_atomic(path.join(ARTIFACTS_PATH, 'status_mapping.joblib'), lambda tmp_path: dump(status_mapping, tmp_path))
+
+    return X, y, preprocessor, status_mapping
+
+
+def halving_schedule(n_candidates, min_resources, max_resources, factor):
+    """
+    List the iterations of a successive-halving search the way scikit-learn schedules them.
+
+    Args:
+        n_candidates (int): The number of parameter combinations.
+        min_resources (int): The budget each candidate gets in the first iteration.
+        max_resources (int): The largest budget a candidate can get.
+        factor (int): The factor candidates are cut by, and budgets grown by, per iteration.
+
+    Returns:
+        list[tuple]: (candidates, budget per candidate) for each iteration.
+    """
+    n_required = 1 + floor(log(n_candidates, factor))
+    n_possible = 1 + floor(log(max(max_resources // min_resources, 1), factor))
+    return [(ceil(n_candidates / factor ** i), min_resources * factor ** i)
+            for i in range(min(n_required, n_possible))]
+
+
+def halving_min_resources(search_mode, resource, n_candidates, n_classes, max_resources, factor):
+    """
+    Compute the budget every candidate starts a halving search with, the way scikit-learn resolves it.
+
+    The search is given this number rather than 'exhaust' or 'smallest', so the time estimate of
+    fit_halving_budget() schedules exactly the iterations the search runs.
+
+    Args:
+        search_mode (str): 'halving_grid' or 'halving_random'.
+        resource (str): The halving budget, 'n_samples' or 'n_estimators'.
+        n_candidates (int): The number of parameter combinations in the grid, n_estimators excluded when it is
+            the resource.
+        n_classes (int): The number of target classes.
+        max_resources (int): The largest budget a candidate can get.
+        factor (int): The halving factor.
+
+    Returns:
+        int: The min_resources to give the search.
+    """
+    if resource == 'n_estimators':
+        return MIN_TREES
+    # scikit-learn's 'smallest': two rows of every class in each fold
+    smallest = 2 * CV_FOLDS * n_classes
+    if search_mode == 'halving_random':
+        # The random search sizes its candidate count from the budget, so it has to start from the smallest one
+        return smallest
+    # scikit-learn's 'exhaust': the largest start whose last required iteration still fits max_resources
+    return max(smallest, max_resources // factor ** floor(log(n_candidates, factor)))
+
+
+def halving_candidates(search_mode, n_candidates, min_resources, max_resources):
+    """
+    Count the candidates the first iteration of a halving search scores.
 
-    # Handling missing values
-    imputer = SimpleImputer(strategy='most_frequent')
-    data[features] = imputer.fit_transform(data[features])
+    Args:
+        search_mode (str): 'halving_grid' or 'halving_random'.
+        n_candidates (int): The number of parameter combinations in the grid.
+        min_resources (int): The budget each candidate gets in the first iteration.
+        max_resources (int): The largest budget a candidate can get.
 
-    # Ensure the target column has no missing values
-    data[target] = data[target].fillna(data[target].mode()[0])
+    Returns:
+        int: The grid size, or for the random search, which samples max_resources // min_resources candidates
+            without replacement, at most that many.
+    """
+    if search_mode == 'halving_random':
+        return max(1, min(n_candidates, max_resources // min_resources))
+    return n_candidates
 
-    # Encode categorical features
-    label_encoders = {}
-    for col in features:
-        if data[col].dtype == 'object':
-            label_encoders[col] = LabelEncoder()
-            data[col] = label_encoders[col].fit_transform(data[col])
 
-    # Save the label encoders for later use
-    for col, le in label_encoders.items():
-        dump(le, path.join(ARTIFACTS_PATH,
-                           f'{col}_label_encoder.joblib'))
+def fit_halving_budget(X_train, y_train, param_grid, search_mode, resource, factor, time_limit, n_jobs):
+    """
+    Pick the largest halving budget whose estimated search time fits a time limit.
 
-    # Create a status mapping dynamically to include all unique statuses
-    unique_statuses = data[target].unique()
-    status_mapping = {label: idx for idx, label in enumerate(unique_statuses)}
+    A pilot forest is fit on a sample to estimate the seconds per tree and training row, and the search time is
+    estimated from the halving schedule: every iteration fits its candidates on CV_FOLDS folds with their budget.
+    Each budget tried is scheduled from the min_resources halving_min_resources() gives the search for it.
 
-    # Map the target column using the dynamic status mapping
-    data[target] = data[target].map(status_mapping)
+    Args:
+        X_train (numpy.ndarray): The scaled training features.
+        y_train (numpy.ndarray): The training target.
+        param_grid (dict): The parameter grid.
+        search_mode (str): 'halving_grid' or 'halving_random'.
+        resource (str): The halving budget, 'n_samples' or 'n_estimators'.
+        factor (int): The halving factor.
+        time_limit (float): The search time limit in seconds.
+        n_jobs (int): The number of fits run in parallel.
 
-    # Check for any NaN values in the mapped target column
-    if data[target].isnull().sum() > 0:
-        raise ValueError(
-            "The 'status' column contains NaN values after mapping.")
+    Returns:
+        tuple: The max_resources and min_resources to give the search.
+    """
+    pilot_rows = min(len(X_train), 2000)
+    start = perf_counter()
+    RandomForestClassifier(n_estimators=MIN_TREES, random_state=42).fit(X_train[:pilot_rows], y_train[:pilot_rows])
+    seconds_per_tree_row = (perf_counter() - start) / (MIN_TREES * pilot_rows)
+
+    fold_rows = len(X_train) * (CV_FOLDS - 1) // CV_FOLDS
+    # The search sets n_estimators itself when trees are the budget, so it is not a candidate parameter then
+    n_candidates = len(ParameterGrid({k: v for k, v in param_grid.items()
+                                      if not (resource == 'n_estimators' and k == 'n_estimators')}))
+    n_classes = len(unique(y_train))
+    mean_trees = sum(param_grid.get('n_estimators', [100])) / len(param_grid.get('n_estimators', [100]))
+
+    def min_resources_for(max_resources):
+        return halving_min_resources(search_mode, resource, n_candidates, n_classes, max_resources, factor)
+
+    def estimate(max_resources):
+        min_resources = min_resources_for(max_resources)
+        seconds = 0.0
+        for candidates, budget in halving_schedule(
+                halving_candidates(search_mode, n_candidates, min_resources, max_resources), min_resources,
+                max_resources, factor):
+            trees, rows = (budget, fold_rows) if resource == 'n_estimators' else (mean_trees, budget)
+            seconds += candidates * CV_FOLDS * trees * rows * seconds_per_tree_row
+        return seconds / n_jobs
+
+    max_resources = max(param_grid['n_estimators']) if resource == 'n_estimators' else fold_rows
+    while max_resources > factor * MIN_TREES and estimate(max_resources) > time_limit:
+        max_resources //= 2
+    return max_resources, min_resources_for(max_resources)
+
+
+def peak_rss_mb(estimator, X, y):
+    """
+    Scorer reporting the peak resident memory of the worker process that fit and scored a fold.
 
-    # Save the status mapping for later use
-    dump(status_mapping, path.join(
-        ARTIFACTS_PATH, 'status_mapping.joblib'))
+    ru_maxrss is the high-water mark over the worker's lifetime, so it covers every fit the worker ran before this
+    one as well. Only the maximum over all folds is meaningful: the peak RSS of any single worker during the search.
 
-    X = data[features]
-    y = data[target]
+    Args:
+        estimator (RandomForestClassifier): The fitted estimator (unused).
+        X (numpy.ndarray): The validation features (unused).
+        y (numpy.ndarray): The validation target (unused).
 
-    return X, y, label_encoders
+    Returns:
+        float: Peak RSS in MB of the worker process so far; NaN where the resource module is unavailable.
+    """
+    return max_rss_mb()
 
 
-def train_and_evaluate_model(X, y, param_grid):
+def estimate_fit_bytes(X_train, y_train, param_grid):
     """
-    Train and evaluate the model using GridSearchCV for hyperparameter tuning.
+    Estimate the memory one cross-validation fit needs on top of the shared training matrix.
+
+    A fit copies its fold out of the training matrix and grows n_estimators trees. The tree size is measured with a
+    pilot tree fit on a fold with the grid's least constrained depth and leaf settings; every node costs its
+    sklearn node record plus one float64 value per class.
 
     Args:
-        X (DataFrame): The feature matrix.
-        y (Series): The target vector.
+        X_train (numpy.ndarray): The training features.
+        y_train (numpy.ndarray): The training target.
+        param_grid (dict): The parameter grid.
+
+    Returns:
+        int: The estimated peak bytes of the most expensive fit in the grid.
+    """
+    fold_rows = len(X_train) * (CV_FOLDS - 1) // CV_FOLDS
+    depths = param_grid.get('max_depth', [None])
+    pilot = RandomForestClassifier(
+        n_estimators=1, max_depth=None if None in depths else max(depths),
+        min_samples_split=min(param_grid.get('min_samples_split', [2])),
+        min_samples_leaf=min(param_grid.get('min_samples_leaf', [1])), random_state=42
+    ).fit(X_train[:fold_rows], y_train[:fold_rows])
+    node_bytes = NODE_BYTES + 8 * pilot.n_classes_
+    tree_bytes = pilot.estimators_[0].tree_.node_count * node_bytes
+    fold_bytes = fold_rows * (X_train.shape[1] * X_train.dtype.itemsize + 8)
+    return fold_bytes + max(param_grid.get('n_estimators', [100])) * tree_bytes
+
+
+def make_search(rf, param_grid, X_train, y_train, search_mode, resource, factor, time_limit, n_jobs, scoring):
+    """
+    Build the hyperparameter search for a search mode.
+
+    Args:
+        rf (RandomForestClassifier): The estimator to tune.
+        param_grid (dict): The parameter grid.
+        X_train (numpy.ndarray): The scaled training features, used to size a time-limited halving budget.
+        y_train (numpy.ndarray): The training target.
+        search_mode (str): 'grid', 'halving_grid' or 'halving_random'.
+        resource (str): Halving budget, 'n_samples' or 'n_estimators'.
+        factor (int): Halving factor.
+        time_limit (float): Seconds the halving search should take at most, or None.
+        n_jobs (int): The number of concurrent fits.
+        scoring (str or dict): The scoring; a dict is only supported by the grid search and refits on f1_macro.
+
+    Returns:
+        BaseSearchCV: The unfitted search.
+    """
+    if search_mode == 'grid':
+        # Perform GridSearchCV for hyperparameter tuning
+        return GridSearchCV(
+            estimator=rf, param_grid=param_grid, cv=CV_FOLDS, n_jobs=n_jobs, verbose=2, scoring=scoring,
+            refit='f1_macro')
+
+    grid = dict(param_grid)
+    # scikit-learn's max_resources='auto': every training row
+    max_resources = len(X_train)
+    if resource == 'n_estimators':
+        # The search sets n_estimators itself, growing it for the surviving candidates
+        max_resources = max(grid.pop('n_estimators', [200]))
+    if time_limit is not None:
+        max_resources, min_resources = fit_halving_budget(
+            X_train, y_train, param_grid, search_mode, resource, factor, time_limit, n_jobs)
+    else:
+        min_resources = halving_min_resources(search_mode, resource, len(ParameterGrid(grid)), len(unique(y_train)),
+                                              max_resources, factor)
+    search_class = HalvingGridSearchCV if search_mode == 'halving_grid' else HalvingRandomSearchCV
+    grid_arg = {'param_grid': grid} if search_mode == 'halving_grid' else \
+        {'param_distributions': grid, 'n_candidates': 'exhaust'}
+    return search_class(
+        estimator=rf, **grid_arg, factor=factor, resource=resource, max_resources=max_resources,
+        min_resources=min_resources, cv=CV_FOLDS, n_jobs=n_jobs, verbose=2, scoring=scoring, random_state=42)
+
+
+def train_and_evaluate_model(X, y, param_grid, search_mode='grid', resource='n_samples', factor=3,
+                             time_limit=None, memory_budget_mb=None, compact=False, f1_tolerance=0.01,
+                             compact_objective='size', profiler=None):
+    """
+    Train and evaluate the model, tuning hyperparameters with a grid or successive-halving search.
+
+    The search refits the best configuration on the whole training set, and that estimator is the returned model.
+    The halving searches score every candidate on a small budget first and only give the best 1/factor of them a
+    factor times larger budget in each following iteration; the budget is either training rows or trees.
+
+    With a memory budget, the scaled training matrix is written once to a read-only memory map that every worker
+    process maps instead of receiving its own copy, and the number of concurrent fits is the core count or the
+    budget divided by the estimated memory of one fit, whichever is lower. A grid search then also records the
+    highest peak RSS any worker process reached during the search, and compaction fits as many trees in parallel.
+
+    With compact, the best configuration is compacted after the search: compact_forest() picks the fewest trees,
+    depth cap and min_samples_leaf whose validation macro F1 is within f1_tolerance of the full forest. Fewer trees
+    are cut from the search's model; a depth cap or leaf size is refit on the whole training set.
+
+    Args:
+        X (numpy.ndarray): The feature matrix.
+        y (numpy.ndarray): The target vector.
         param_grid (dict): The parameter grid for hyperparameter tuning.
+        search_mode (str, optional): 'grid', 'halving_grid' or 'halving_random'. Default is 'grid'.
+        resource (str, optional): Halving budget, 'n_samples' or 'n_estimators'. Default is 'n_samples'.
+        factor (int, optional): Halving factor. Default is 3.
+        time_limit (float, optional): Seconds the halving search should take at most; the budget is sized from a
+            pilot fit to fit it. Default is None (the full training set or the largest n_estimators).
+        memory_budget_mb (float, optional): Memory the concurrent fits may use together. Default is None (one fit
+            per core, each worker with its own copy of the data).
+        compact (bool, optional): Whether to compact the best forest. Default is False.
+        f1_tolerance (float, optional): Validation macro F1 compaction may lose. Default is 0.01.
+        compact_objective (str, optional): 'size' or 'latency', what compaction minimizes. Default is 'size'.
+        profiler (StageProfiler, optional): Records the scaling, search, compaction and evaluation stages; the
+            search stage also holds the time of every cross-validation fit. Default is None.
 
     Returns:
-        tuple: A tuple containing the trained model, scaler, best parameters, accuracy, confusion matrix, and classification report.
+        tuple: A tuple containing the trained model, scaler, best parameters, accuracy, macro F1, confusion matrix, classification report, and search information (time in seconds, concurrent fits and, with a memory budget, the estimated memory per fit and the peak worker RSS).
     """
-    # Splitting the dataset into training and testing sets
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42)
+    if search_mode not in SEARCH_MODES:
+        raise ValueError(f"search_mode must be one of {SEARCH_MODES}, got '{search_mode}'")
+    profiler = profiler or StageProfiler(trace_memory=False)
 
-    # Standardizing numerical features
-    scaler = StandardScaler()
-    X_train = scaler.fit_transform(X_train)
-    X_test = scaler.transform(X_test)
+    with profiler.stage('split_and_scale'):
+        # Splitting the dataset into training and testing sets
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, test_size=0.2, random_state=42)
+
+        # Standardizing numerical features
+        scaler = StandardScaler()
+        X_train = scaler.fit_transform(X_train)
+        X_test = scaler.transform(X_test)
 
     # Save the scaler for later use
-    dump(scaler, path.join(ARTIFACTS_PATH, 'scaler.joblib'))
+    write_atomic(path.join(ARTIFACTS_PATH, 'scaler.joblib'), lambda tmp_path: dump(scaler, tmp_path))
 
     # Initialize the Random Forest classifier
     rf = RandomForestClassifier(random_state=42)
 
-    # Perform GridSearchCV for hyperparameter tuning
-    grid_search = GridSearchCV(
-        estimator=rf, param_grid=param_grid, cv=3, n_jobs=-1, verbose=2, scoring='f1_macro')
-    grid_search.fit(X_train, y_train)
+    n_jobs = cpu_count()
+    search_info = {'n_jobs': n_jobs}
+    scoring = 'f1_macro'
+    X_fit = X_train
+    with TemporaryDirectory() as shared_dir:
+        if memory_budget_mb is not None:
+            # Workers map the same read-only pages instead of each holding a copy of the training matrix
+            save(path.join(shared_dir, 'X_train.npy'), X_train)
+            X_fit = np_load(path.join(shared_dir, 'X_train.npy'), mmap_mode='r')
+            fit_bytes = estimate_fit_bytes(X_fit, y_train, param_grid)
+            n_jobs = max(1, min(cpu_count(), int(memory_budget_mb * 1024 ** 2 // fit_bytes)))
+            search_info.update(n_jobs=n_jobs, fit_memory_mb=fit_bytes / 1024 ** 2)
+            print(f"Running {n_jobs} concurrent fits of about {fit_bytes / 1024 ** 2:.0f} MB each "
+                  f"within {memory_budget_mb:.0f} MB")
+            if search_mode == 'grid':
+                scoring = {'f1_macro': 'f1_macro', 'peak_rss_mb': peak_rss_mb}
+        with profiler.stage('search', search_mode=search_mode, n_jobs=n_jobs) as record:
+            search = make_search(rf, param_grid, X_fit, y_train, search_mode, resource, factor, time_limit, n_jobs,
+                                 scoring)
+            search.fit(X_fit, y_train)
+        # The search's own time includes refitting the best configuration on the whole training set
+        search_info.update(seconds=record['wall_seconds'], refit_seconds=search.refit_time_)
+        record.update(refit_seconds=search.refit_time_, cv_fits=cv_fit_times(search))
+        del X_fit
+
+    if isinstance(scoring, dict):
+        results = search.cv_results_
+        search_info['worker_peak_rss_mb'] = float(nanmax([results[f'split{k}_test_peak_rss_mb']
+                                                          for k in range(CV_FOLDS)]))
+
+    # The search already refit the best configuration on the whole training set
+    best_params = search.best_params_
+    best_rf = search.best_estimator_
+
+    if compact:
+        with profiler.stage('compaction') as record:
+            compacted, candidates = compact_forest(best_params, X_train, y_train, f1_tolerance, compact_objective,
+                                                   n_jobs=n_jobs)
+            uncompacted_f1 = f1_score(y_test, best_rf.predict(X_test), average='macro')
+            if all(compacted[k] == best_rf.get_params()[k] for k in ('max_depth', 'min_samples_leaf')):
+                best_rf = first_trees(best_rf, compacted['n_estimators'])
+            else:
+                best_rf = RandomForestClassifier(**{**best_params, **compacted}, random_state=42).fit(X_train,
+                                                                                                      y_train)
+            best_params = {**best_params, **compacted}
+        search_info['compaction'] = {'objective': compact_objective, 'f1_tolerance': f1_tolerance,
+                                     'uncompacted_macro_f1': float(uncompacted_f1),
+                                     'seconds': record['wall_seconds'], 'candidates': candidates}
+
+    with profiler.stage('evaluate', test_rows=len(y_test)):
+        # Predict on the test set
+        y_pred = best_rf.predict(X_test)
+
+        # Evaluate the model
+        accuracy = accuracy_score(y_test, y_pred)
+        macro_f1 = f1_score(y_test, y_pred, average='macro')
+        conf_matrix = confusion_matrix(y_test, y_pred)
+        class_report = classification_report(y_test, y_pred)
+
+    return best_rf, scaler, best_params, accuracy, macro_f1, conf_matrix, class_report, search_info
+
+
+def save_and_publish(model, preprocessor, scaler, status_mapping, metadata):
+    """
+    Save the trained model and its inference pipeline, then publish them as a new model version.
 
-    # Best parameters from the grid search
-    best_params = grid_search.best_params_
+    When nothing is published, the API serves ARTIFACTS_PATH itself with the forest memory-mapped, so each file is
+    written to a temporary path and renamed over the old one; overwriting a mapped file in place can crash a worker
+    with SIGBUS or hand it a half-written forest.
 
-    # Train the Random Forest classifier with the best parameters
-    best_rf = RandomForestClassifier(**best_params, random_state=42)
-    best_rf.fit(X_train, y_train)
+    Args:
+        model (RandomForestClassifier): The trained model.
+        preprocessor (FeaturePreprocessor): The fitted preprocessor.
+        scaler (StandardScaler): The fitted scaler.
+        status_mapping (dict): Status labels mapped to the class codes the model predicts.
+        metadata (dict): Training information stored in the version manifest.
 
-    # Predict on the test set
-    y_pred = best_rf.predict(X_test)
+    Returns:
+        str: The published version.
+    """
+    # Save the trained model to a file using joblib
+    model_path = path.join(ARTIFACTS_PATH, 'ran_for_model.joblib')
+    write_atomic(model_path, lambda tmp_path: dump(model, tmp_path))
+    print(f"Model saved to {model_path}")
+
+    # Fuse preprocessing, scaling, the flattened forest and the status labels into the artifact the API serves
+    pipeline_path = path.join(ARTIFACTS_PATH, PIPELINE_FILE)
+    InferencePipeline.from_artifacts(preprocessor, scaler, model, status_mapping).save(pipeline_path)
+    print(f"Inference pipeline saved to {pipeline_path}")
 
-    # Evaluate the model
-    accuracy = accuracy_score(y_test, y_pred)
-    conf_matrix = confusion_matrix(y_test, y_pred)
-    class_report = classification_report(y_test, y_pred)
+    # Publish the artifacts as a new model version; a running API swaps it in without a restart
+    version = publish_version(ARTIFACTS_PATH, BUNDLE_FILES, MODELS_PATH, metadata=metadata)
+    print(f"Model version {version} published to {MODELS_PATH}")
+    return version
 
-    return best_rf, scaler, best_params, accuracy, conf_matrix, class_report
 
+def train_incrementally(file_path, features, target, new_trees=20, replace_oldest=False, replay_ratio=1.0):
+    """
+    Update the last model with trees grown on the rows of the catalog that changed since it was trained.
+
+    The refreshed catalog is diffed against the training snapshot. A fifth of the new and changed rows is held out
+    for evaluation and left out of the new snapshot, so the next update trains on them; new_trees trees are grown with warm_start on the rest plus replay_ratio times as many unchanged
+    rows, so they do not only see the delta. With replace_oldest the same number of the oldest trees is dropped and
+    the forest keeps its size. The preprocessor, scaler and status mapping of the last full build are reused, so the
+    refresh time scales with the size of the delta rather than the catalog.
 
-def main():
-    """Main function to load data, train the model, and save the trained model."""
+    Args:
+        file_path (str): The path to the refreshed CSV.
+        features (list): List of feature column names, numeric features first.
+        target (str): The name of the target column.
+        new_trees (int, optional): Trees to grow on the delta. Default is 20.
+        replace_oldest (bool, optional): Whether to drop as many of the oldest trees. Default is False.
+        replay_ratio (float, optional): Unchanged rows sampled per delta training row. Default is 1.0.
+
+    Returns:
+        str: The published version, or None when the catalog did not change.
+
+    Raises:
+        ValueError: If the catalog has statuses the model does not know, or lost a status the forest predicts; both
+            need a full rebuild.
+    """
+    start = perf_counter()
+    snapshot_path = path.join(ARTIFACTS_PATH, SNAPSHOT_FILE)
+    snapshot = CatalogSnapshot.load(snapshot_path)
+    data = read_csv(file_path, low_memory=False)
+    delta, counts = snapshot.diff(data)
+    print(f"Catalog delta: {counts['new']} new, {counts['changed']} changed, {counts['removed']} removed rows")
+    if not delta.any():
+        print("No new or changed rows, the model is up to date")
+        return None
+
+    model = load(path.join(ARTIFACTS_PATH, 'ran_for_model.joblib'))
+    scaler = load(path.join(ARTIFACTS_PATH, 'scaler.joblib'))
+    status_mapping = load(path.join(ARTIFACTS_PATH, 'status_mapping.joblib'))
+    preprocessor = FeaturePreprocessor.load(path.join(ARTIFACTS_PATH, PREPROCESSOR_FILE))
+
+    statuses = data[target].fillna(data[target].mode()[0])
+    unknown = set(statuses) - set(status_mapping)
+    if unknown:
+        raise ValueError(f"Statuses {sorted(unknown)} are new to the model; run a full rebuild")
+    y_all = statuses.map(status_mapping).to_numpy()
+
+    rng = default_rng(snapshot.increments)
+    rows = flatnonzero(delta)
+    test_rows = rng.choice(rows, size=len(rows) // 5, replace=False)
+    train_rows = setdiff1d(rows, test_rows)
+    unchanged = flatnonzero(~delta)
+    replay = rng.choice(unchanged, size=min(len(unchanged), int(len(train_rows) * replay_ratio)), replace=False)
+    fit_rows = concatenate([train_rows, replay])
+    # The new trees have to see every class the forest predicts, or warm_start would change its classes
+    for code in setdiff1d(model.classes_, y_all[fit_rows]):
+        candidates = flatnonzero(y_all == code)
+        if not len(candidates):
+            raise ValueError(f"No rows have the status coded {code} anymore; run a full rebuild")
+        fit_rows = append(fit_rows, rng.choice(candidates))
+
+    X_fit = scaler.transform(preprocessor.transform(data.iloc[fit_rows]))
+    model.set_params(warm_start=True, n_estimators=model.n_estimators + new_trees)
+    model.fit(X_fit, y_all[fit_rows])
+    if replace_oldest:
+        model.estimators_ = model.estimators_[new_trees:]
+        model.set_params(n_estimators=len(model.estimators_))
+    model.set_params(warm_start=False)
+    update_seconds = perf_counter() - start
+
+    macro_f1 = None
+    if len(test_rows):
+        y_pred = model.predict(scaler.transform(preprocessor.transform(data.iloc[test_rows])))
+        macro_f1 = float(f1_score(y_all[test_rows], y_pred, average='macro'))
+    print(f"Grew {new_trees} trees on {len(fit_rows)} rows in {update_seconds:.1f} s; the forest has "
+          f"{len(model.estimators_)} trees. Macro F1 on held-out delta rows: {macro_f1}")
+
+    version = save_and_publish(model, preprocessor, scaler, status_mapping, {
+        'incremental': {**counts, 'fit_rows': int(len(fit_rows)), 'new_trees': new_trees,
+                        'replace_oldest': replace_oldest, 'n_estimators': len(model.estimators_),
+                        'increments_since_rebuild': snapshot.increments + 1, 'seconds': update_seconds},
+        'macro_f1_delta': macro_f1
+    })
+    CatalogSnapshot.from_data(data, snapshot.columns, snapshot.increments + 1, exclude=test_rows).save(snapshot_path)
+    return version
+
+
+def main(search_mode='grid', resource='n_samples', factor=3, time_limit=None, use_feature_cache=True,
+         memory_budget_mb=None, incremental=False, new_trees=20, replace_oldest=False, replay_ratio=1.0,
+         full_rebuild_every=7, compact=False, f1_tolerance=0.01, compact_objective='size', trace_memory=False,
+         profile_dir=None):
+    """
+    Main function to load data, train the model, and save the trained model.
+
+    With incremental, the last model is updated with train_incrementally() instead, unless there is no training
+    snapshot yet or full_rebuild_every incremental updates have run since the last full build.
+
+    Every run writes a JSON report of the wall time, CPU time and memory of its stages, and of every
+    cross-validation fit, next to the model; see StageProfiler.
+
+    Args:
+        search_mode (str, optional): 'grid', 'halving_grid' or 'halving_random'. Default is 'grid'.
+        resource (str, optional): Halving budget, 'n_samples' or 'n_estimators'. Default is 'n_samples'.
+        factor (int, optional): Halving factor. Default is 3.
+        time_limit (float, optional): Seconds the halving search should take at most. Default is None.
+        use_feature_cache (bool, optional): Whether to reuse cached prepared features. Default is True.
+        memory_budget_mb (float, optional): Memory the concurrent cross-validation fits may use together. Default
+            is None (one fit per core).
+        incremental (bool, optional): Whether to update the last model from the catalog delta. Default is False.
+        new_trees (int, optional): Trees an incremental update grows. Default is 20.
+        replace_oldest (bool, optional): Whether an incremental update drops as many of the oldest trees. Default is
+            False.
+        replay_ratio (float, optional): Unchanged rows sampled per delta training row. Default is 1.0.
+        full_rebuild_every (int, optional): Incremental updates between full rebuilds. Default is 7.
+        compact (bool, optional): Whether to compact the best forest. Default is False.
+        f1_tolerance (float, optional): Validation macro F1 compaction may lose. Default is 0.01.
+        compact_objective (str, optional): 'size' or 'latency', what compaction minimizes. Default is 'size'.
+        trace_memory (bool, optional): Whether to trace the peak allocations of every stage with tracemalloc, which
+            slows the allocation-heavy stages down and so skews their wall times. Default is False.
+        profile_dir (str, optional): Directory for per-stage cProfile dumps. Default is None (no cProfile).
+    """
     file_path = path.join(DATA_PATH, 'combined_df.csv')
     features = ['total_mass', 'span', 'period_mins', 'perigee_km', 'apogee_km',
                 'inclination', 'object_type']
     target = 'status'
-
-    X, y, label_encoders = load_and_preprocess_data(
-        file_path, features, target)
+    profiler = StageProfiler(trace_memory, profile_dir)
+    report_path = path.join(ARTIFACTS_PATH, REPORT_FILE)
+
+    if incremental:
+        snapshot_path = path.join(ARTIFACTS_PATH, SNAPSHOT_FILE)
+        if not path.exists(snapshot_path):
+            print("No training snapshot, running a full rebuild")
+        elif CatalogSnapshot.load(snapshot_path).increments >= full_rebuild_every:
+            print(f"{full_rebuild_every} incremental updates since the last full build, running a full rebuild")
+        else:
+            with profiler.stage('incremental_update'):
+                version = train_incrementally(file_path, features, target, new_trees, replace_oldest, replay_ratio)
+            profiler.write_report(report_path, mode='incremental', version=version)
+            print(f"Training report written to {report_path}")
+            return
+
+    X, y, preprocessor, status_mapping = load_and_preprocess_data(
+        file_path, features, target, use_feature_cache, profiler)
 
     # Define the reduced parameter grid for hyperparameter tuning
     param_grid = {
@@ -135,18 +622,73 @@ def main():
         'class_weight': [None, 'balanced']
     }
 
-    best_rf, scaler, best_params, accuracy, conf_matrix, class_report = train_and_evaluate_model(
-        X, y, param_grid)
-
-    # Save the trained model to a file using joblib
-    model_path = path.join(ARTIFACTS_PATH, 'ran_for_model.joblib')
-    dump(best_rf, model_path)
-    print(f"Model saved to {model_path}")
+    best_rf, scaler, best_params, accuracy, macro_f1, conf_matrix, class_report, search_info = \
+        train_and_evaluate_model(X, y, param_grid, search_mode, resource, factor, time_limit, memory_budget_mb,
+                                 compact, f1_tolerance, compact_objective, profiler)
+
+    with profiler.stage('save_and_publish'):
+        version = save_and_publish(best_rf, preprocessor, scaler, status_mapping,
+                                   {'best_params': best_params, 'accuracy': float(accuracy),
+                                    'macro_f1': float(macro_f1), 'search_mode': search_mode, 'search': search_info,
+                                    'stage_seconds': profiler.summary()})
+    with profiler.stage('catalog_snapshot'):
+        # Snapshot the catalog the model was trained on, so the next incremental update trains on what changed since
+        CatalogSnapshot.from_data(read_csv(file_path, low_memory=False), features + [target]).save(
+            path.join(ARTIFACTS_PATH, SNAPSHOT_FILE))
+    profiler.write_report(report_path, mode='full', version=version, best_params=best_params,
+                          accuracy=float(accuracy), macro_f1=float(macro_f1), search=search_info)
     print(f"Best Parameters: {best_params}")
+    print(f"Search ({search_mode}, {search_info['n_jobs']} concurrent fits) took {search_info['seconds']:.1f} s")
+    if 'worker_peak_rss_mb' in search_info:
+        print(f"Peak worker RSS during the search: {search_info['worker_peak_rss_mb']:.0f} MB")
+    if 'compaction' in search_info:
+        compaction = search_info['compaction']
+        print(f"Compaction ({compaction['objective']}, macro F1 tolerance {compaction['f1_tolerance']}) took "
+              f"{compaction['seconds']:.1f} s:")
+        for c in compaction['candidates']:
+            print(f"{'*' if c['picked'] else ' '} trees={c['n_trees']:<4} max_depth={str(c['max_depth']):<5} "
+                  f"min_samples_leaf={c['min_samples_leaf']:<3} {c['size_bytes'] / 1024 ** 2:7.2f} MB "
+                  f"{c['latency_ms']:6.2f} ms/row {c['batch_ms']:7.1f} ms/1000 rows macro F1 {c['macro_f1']:.4f}"
+                  f"{'' if c['eligible'] else ' (outside tolerance)'}")
+        print(f"Macro F1 before compaction: {compaction['uncompacted_macro_f1']}")
+    for record in profiler.stages:
+        print(f"Stage {record['name']}: {record['wall_seconds']:.2f} s wall, {record['cpu_seconds']:.2f} s CPU, "
+              f"peak RSS {record['max_rss_mb']:.0f} MB")
+    print(f"Training report written to {report_path}")
     print(f"Accuracy: {accuracy}")
+    print(f"Macro F1: {macro_f1}")
     print(f"Confusion Matrix:\n{conf_matrix}")
     print(f"Classification Report:\n{class_report}")
 
 
 if __name__ == '__main__':
-    main()
+    parser = ArgumentParser(description="Train the status prediction model.")
+    parser.add_argument('--search', choices=SEARCH_MODES, default='grid', help="hyperparameter search strategy")
+    parser.add_argument('--resource', choices=['n_samples', 'n_estimators'], default='n_samples',
+                        help="budget the halving searches grow for surviving candidates")
+    parser.add_argument('--factor', type=int, default=3, help="halving factor")
+    parser.add_argument('--time-limit', type=float, help="seconds the halving search should take at most")
+    parser.add_argument('--no-feature-cache', action='store_true', help="rebuild the cached prepared features")
+    parser.add_argument('--memory-budget-mb', type=float,
+                        help="share the training matrix as a memory map and cap concurrent fits to this budget")
+    parser.add_argument('--incremental', action='store_true',
+                        help="update the last model with trees grown on new and changed catalog rows")
+    parser.add_argument('--new-trees', type=int, default=20, help="trees an incremental update grows")
+    parser.add_argument('--replace-oldest', action='store_true',
+                        help="drop as many of the oldest trees, keeping the forest size")
+    parser.add_argument('--replay-ratio', type=float, default=1.0,
+                        help="unchanged rows replayed per delta training row")
+    parser.add_argument('--full-rebuild-every', type=int, default=7,
+                        help="incremental updates between full rebuilds")
+    parser.add_argument('--compact', action='store_true',
+                        help="shrink the best forest to the fewest trees, depth and leaves within the F1 tolerance")
+    parser.add_argument('--f1-tolerance', type=float, default=0.01, help="validation macro F1 compaction may lose")
+    parser.add_argument('--compact-objective', choices=COMPACTION_OBJECTIVES, default='size',
+                        help="minimize the forest's size or its single-row latency")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="trace the peak allocations of every stage; slows allocation-heavy stages down")
+    parser.add_argument('--profile-dir', help="dump cProfile statistics of every stage to this directory")
+    args = parser.parse_args()
+    main(args.search, args.resource, args.factor, args.time_limit, not args.no_feature_cache, args.memory_budget_mb,
+         args.incremental, args.new_trees, args.replace_oldest, args.replay_ratio, args.full_rebuild_every,
+         args.compact, args.f1_tolerance, args.compact_objective, args.trace_memory, args.profile_dir)
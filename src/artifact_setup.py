@@ -4,6 +4,7 @@ from src.data_ingestion import tsv_to_csv, csv_to_df_dict
 from src.sat_growth_over_time import get_launch_decay_orbit_over_time, get_starlink_vs_other_launches
 from src.annual_launches_by_country import get_annual_launches_by_country
 from src.annual_launches_by_sat_type import get_launch_count_by_sat_class
+from src.figure_cache import precompute_figures
 from src.local import ARTIFACTS_PATH, DATA_PATH
 from src.constants import ALL_COL_RENAME_DICTS
 
@@ -41,7 +42,7 @@ def get_data():
 
 def make_artifacts():
     """
-    Generate and save data artifacts using joblib.
+    Generate and save data artifacts using joblib, then prerender their figures.
 
     Returns:
         None
@@ -49,3 +50,4 @@ def make_artifacts():
     data = get_data()
     for key, value in data.items():
         generate_data_artifacts(f"{ARTIFACTS_PATH}{key}.joblib", value)
+    precompute_figures()
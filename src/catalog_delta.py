@@ -0,0 +1,137 @@
+# catalog_delta.py
+from joblib import dump, load
+from numpy import asarray, ones
+from pandas import Index, util
+
+SNAPSHOT_FILE = 'training_snapshot.joblib'
+ID_COLUMN = 'object_id'
+
+
+def row_keys(data, id_column=ID_COLUMN):
+    """
+    Identify catalog rows across refreshes.
+
+    Args:
+        data (DataFrame): The catalog.
+        id_column (str, optional): The object identifier column. Default is ID_COLUMN.
+
+    Returns:
+        numpy.ndarray: One key per row; repeated identifiers are told apart by their occurrence number.
+    """
+    ids = data[id_column].astype(str)
+    return asarray(ids + '#' + data.groupby(id_column).cumcount().astype(str), dtype=str)
+
+
+def row_hashes(data, columns):
+    """
+    Hash the training columns of every catalog row.
+
+    Numeric columns are hashed at the float32 precision the model is trained on. read_csv does not parse floats
+    round-trip exactly, so a catalog rewritten by the merge would otherwise show unchanged rows as changed.
+
+    Args:
+        data (DataFrame): The catalog, as read from the CSV.
+        columns (list[str]): The feature and target columns.
+
+    Returns:
+        numpy.ndarray: One uint64 hash per row.
+    """
+    values = data[columns].copy()
+    numeric = values.select_dtypes('number').columns
+    values[numeric] = values[numeric].astype('float32')
+    return util.hash_pandas_object(values, index=False).to_numpy()
+
+
+class CatalogSnapshot:
+    """
+    Row hashes of the catalog the current model was trained on.
+
+    Comparing a refreshed catalog against the snapshot finds the objects that
+    are new or whose features or status changed, which is all an incremental
+    update has to train on. The snapshot also counts the incremental updates
+    since the last full rebuild.
+    """
+
+    def __init__(self, keys, hashes, columns, increments=0):
+        """
+        Initialize the snapshot.
+
+        Args:
+            keys (numpy.ndarray): The row keys.
+            hashes (numpy.ndarray): The row hashes, aligned with keys.
+            columns (list[str]): The hashed columns.
+            increments (int, optional): Incremental updates since the last full rebuild. Default is 0.
+        """
+        self.keys = asarray(keys, dtype=str)
+        self.hashes = asarray(hashes)
+        self.columns = list(columns)
+        self.increments = increments
+
+    @classmethod
+    def from_data(cls, data, columns, increments=0, exclude=None):
+        """
+        Snapshot a catalog.
+
+        Args:
+            data (DataFrame): The catalog, as read from the CSV.
+            columns (list[str]): The feature and target columns.
+            increments (int, optional): Incremental updates since the last full rebuild. Default is 0.
+            exclude (array-like, optional): Positions of rows the model was not trained on; they are left out, so
+                the next diff reports them as new. Default is None.
+
+        Returns:
+            CatalogSnapshot: The snapshot.
+        """
+        keys = row_keys(data)
+        hashes = row_hashes(data, columns)
+        if exclude is not None and len(exclude):
+            kept = ones(len(keys), dtype=bool)
+            kept[exclude] = False
+            keys, hashes = keys[kept], hashes[kept]
+        return cls(keys, hashes, columns, increments)
+
+    def diff(self, data):
+        """
+        Find the rows of a refreshed catalog that are new or changed since the snapshot.
+
+        Args:
+            data (DataFrame): The refreshed catalog, as read from the CSV.
+
+        Returns:
+            tuple: A boolean mask of the delta rows and a dict counting new, changed and removed rows.
+        """
+        keys = row_keys(data)
+        hashes = row_hashes(data, self.columns)
+        positions = Index(self.keys).get_indexer(keys)
+        known = positions >= 0
+        changed = known & (self.hashes[positions] != hashes)
+        counts = {'new': int((~known).sum()), 'changed': int(changed.sum()),
+                  'removed': int(len(self.keys) - known.sum())}
+        return ~known | changed, counts
+
+    def save(self, filepath):
+        """
+        Save the snapshot.
+
+        Args:
+            filepath (str): The destination path.
+
+        Returns:
+            None
+        """
+        dump({'keys': self.keys, 'hashes': self.hashes, 'columns': self.columns, 'increments': self.increments},
+             filepath)
+
+    @classmethod
+    def load(cls, filepath):
+        """
+        Load a snapshot saved with save().
+
+        Args:
+            filepath (str): The saved snapshot.
+
+        Returns:
+            CatalogSnapshot: The snapshot.
+        """
+        state = load(filepath)
+        return cls(state['keys'], state['hashes'], state['columns'], state['increments'])
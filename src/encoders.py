@@ -0,0 +1,61 @@
+# encoders.py
+from numpy import arange, argsort, asarray, minimum, where
+from types import MappingProxyType
+
+
+class CategoricalEncoder:
+    """
+    Immutable category-to-code encoder for serving.
+
+    Codes are the positions of the classes, so an encoder built from a fitted
+    LabelEncoder reproduces its training codes exactly. Categories never seen in
+    training get the explicit unknown_code (one past the last class) instead of
+    being added to the encoder, which keeps lookups free of shared mutable state.
+    """
+
+    def __init__(self, classes):
+        """
+        Initialize the encoder.
+
+        Args:
+            classes (array-like): The known categories, in code order.
+        """
+        classes = asarray(classes, dtype=str)
+        order = argsort(classes, kind='stable')
+        self.classes = tuple(classes.tolist())
+        self.unknown_code = len(self.classes)
+        self._codes = MappingProxyType({c: i for i, c in enumerate(self.classes)})
+        self._sorted_classes = classes[order]
+        self._sorted_codes = arange(len(classes))[order]
+        self._sorted_classes.setflags(write=False)
+        self._sorted_codes.setflags(write=False)
+
+    def encode(self, value):
+        """
+        Encode a single category.
+
+        Args:
+            value (str): The category to encode.
+
+        Returns:
+            int: The category code, or unknown_code for unseen categories.
+        """
+        return self._codes.get(str(value), self.unknown_code)
+
+    def encode_array(self, values):
+        """
+        Encode many categories at once.
+
+        Args:
+            values (array-like): The categories to encode.
+
+        Returns:
+            numpy.ndarray: The integer codes, with unknown_code for unseen categories.
+        """
+        values = asarray(values, dtype=str)
+        if not self.classes:
+            return asarray([self.unknown_code] * len(values))
+        pos = minimum(self._sorted_classes.searchsorted(values),
+                      len(self.classes) - 1)
+        known = self._sorted_classes[pos] == values
+        return where(known, self._sorted_codes[pos], self.unknown_code)
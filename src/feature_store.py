@@ -0,0 +1,146 @@
+# feature_store.py
+from hashlib import sha256
+from json import dumps
+from os import listdir, makedirs, path, replace, utime
+from shutil import rmtree
+from joblib import dump, load
+from numpy import int8, int16, load as np_load, save as np_save
+from src.io_utils import file_digest
+from src.preprocessing import FeaturePreprocessor
+
+# Bump when the preprocessing changes, so matrices prepared by older code are not reused
+FEATURE_STORE_FORMAT = 1
+# Entries are keyed by the CSV contents, so every new data drop adds one; only the most recently used are kept
+FEATURE_STORE_MAX_ENTRIES = 3
+X_FILE = 'X.npy'
+Y_FILE = 'y.npy'
+STATE_FILE = 'state.joblib'
+
+
+def feature_key(file_path, numeric_features, categorical_features, target):
+    """
+    Key a prepared feature matrix by its source data and specification.
+
+    Args:
+        file_path (str): The source CSV.
+        numeric_features (list[str]): Numeric feature names.
+        categorical_features (list[str]): Categorical feature names.
+        target (str): The target column.
+
+    Returns:
+        str: A 16-character hex key that changes when the CSV contents, the features, the target or the store
+            format change.
+    """
+    spec = dumps({'numeric_features': list(numeric_features), 'categorical_features': list(categorical_features),
+                  'target': target, 'format': FEATURE_STORE_FORMAT, 'source': file_digest(file_path)},
+                 sort_keys=True)
+    return sha256(spec.encode()).hexdigest()[:16]
+
+
+class FeatureStore:
+    """
+    On-disk cache of prepared training matrices.
+
+    Each entry is a directory named by its feature_key holding X as float32,
+    y as int8 (int16 past 127 classes) and the fitted preprocessor and status
+    mapping. Entries are written to a temporary directory and renamed into
+    place, so a crashed run never leaves a partial entry behind. They are
+    loaded memory-mapped read-only, which skips reading and preprocessing
+    the CSV; splitting and scaling the matrix still copy it into memory.
+    Only the max_entries most recently used entries are kept.
+    """
+
+    def __init__(self, store_path, max_entries=FEATURE_STORE_MAX_ENTRIES):
+        """
+        Initialize the store.
+
+        Args:
+            store_path (str): The directory holding the entries.
+            max_entries (int, optional): How many entries to keep. Default is FEATURE_STORE_MAX_ENTRIES.
+        """
+        self.store_path = store_path
+        self.max_entries = max_entries
+
+    def entry_path(self, key):
+        return path.join(self.store_path, key)
+
+    def get(self, key):
+        """
+        Load a prepared matrix.
+
+        Args:
+            key (str): The feature_key of the entry.
+
+        Returns:
+            tuple: The memory-mapped X and y, the preprocessor and the status mapping, or None when the entry is
+                missing.
+        """
+        entry = self.entry_path(key)
+        if not path.isdir(entry):
+            return None
+        # The modification time orders entries for pruning, so a hit marks the entry as recently used
+        utime(entry)
+        X = np_load(path.join(entry, X_FILE), mmap_mode='r', allow_pickle=False)
+        y = np_load(path.join(entry, Y_FILE), mmap_mode='r', allow_pickle=False)
+        state = load(path.join(entry, STATE_FILE))
+        return X, y, FeaturePreprocessor.from_dict(state['preprocessor']), state['status_mapping']
+
+    def put(self, key, X, y, preprocessor, status_mapping):
+        """
+        Store a prepared matrix.
+
+        Args:
+            key (str): The feature_key of the entry.
+            X (numpy.ndarray): The preprocessed feature matrix.
+            y (array-like): The status codes.
+            preprocessor (FeaturePreprocessor): The fitted preprocessor.
+            status_mapping (dict): Status labels mapped to their codes.
+
+        Returns:
+            tuple: The stored entry, loaded memory-mapped as get() returns it.
+        """
+        tmp_dir = path.join(self.store_path, f'.{key}.tmp')
+        rmtree(tmp_dir, ignore_errors=True)
+        makedirs(tmp_dir)
+        y_dtype = int8 if len(status_mapping) <= 127 else int16
+        np_save(path.join(tmp_dir, X_FILE), X.astype('float32'), allow_pickle=False)
+        np_save(path.join(tmp_dir, Y_FILE), y.astype(y_dtype), allow_pickle=False)
+        dump({'preprocessor': preprocessor.to_dict(), 'status_mapping': status_mapping},
+             path.join(tmp_dir, STATE_FILE))
+        entry = self.entry_path(key)
+        rmtree(entry, ignore_errors=True)
+        replace(tmp_dir, entry)
+        self.prune(keep=key)
+        return self.get(key)
+
+    def keys(self):
+        """
+        List the stored entries.
+
+        Returns:
+            list[str]: The entry keys, most recently used first.
+        """
+        if not path.isdir(self.store_path):
+            return []
+        keys = [name for name in listdir(self.store_path)
+                if not name.startswith('.') and path.isdir(self.entry_path(name))]
+        return sorted(keys, key=lambda name: path.getmtime(self.entry_path(name)), reverse=True)
+
+    def prune(self, keep=None):
+        """
+        Delete all but the max_entries most recently used entries.
+
+        Args:
+            keep (str, optional): A key that is never deleted, such as the entry just written. Default is None.
+
+        Returns:
+            list[str]: The deleted keys.
+        """
+        keys = self.keys()
+        if keep in keys:
+            keys.remove(keep)
+            keys.insert(0, keep)
+        stale = keys[self.max_entries:]
+        for key in stale:
+            rmtree(self.entry_path(key), ignore_errors=True)
+        return stale
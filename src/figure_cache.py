@@ -0,0 +1,169 @@
+# figure_cache.py
+from collections import OrderedDict
+from hashlib import sha256
+from inspect import getsource
+from json import dumps
+from os import listdir, makedirs, path, remove, stat
+from joblib import load
+from plotly import __version__ as plotly_version
+from src import helpers
+from src.sat_growth_over_time import get_sat_growth_over_time_plot, get_starlink_vs_all_other_sats_plot
+from src.annual_launches_by_country import get_annual_launches_by_org_plot
+from src.annual_launches_by_sat_type import get_launch_count_by_sat_class_plot
+from src.local import ARTIFACTS_PATH, FIGURES_PATH
+from src.io_utils import file_digest, write_atomic
+
+# Plot function used to render each data artifact
+FIGURE_FUNCTIONS = {
+    'launch_decay_orbit_over_time': get_sat_growth_over_time_plot,
+    'starlink_vs_other_launches': get_starlink_vs_all_other_sats_plot,
+    'annual_launches_by_country': get_annual_launches_by_org_plot,
+    'launch_count_by_sat_class': get_launch_count_by_sat_class_plot
+}
+
+# Serialized figures by cache key, artifact hashes by path and code fingerprints by plot function; each keeps its
+# most recently used entries only
+_figures = OrderedDict()
+_artifact_hashes = OrderedDict()
+_code_fingerprints = OrderedDict()
+MAX_FIGURES = 32
+MAX_ARTIFACT_HASHES = 64
+MAX_CODE_FINGERPRINTS = 64
+
+
+def _remember(cache, key, value, max_entries):
+    """
+    Store a value in one of the in-memory caches, evicting its least recently used entries beyond max_entries.
+
+    Args:
+        cache (OrderedDict): The cache.
+        key (Hashable): The key.
+        value (Any): The value.
+        max_entries (int): The number of entries the cache keeps.
+
+    Returns:
+        Any: The value.
+    """
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > max_entries:
+        cache.popitem(last=False)
+    return value
+
+
+def artifact_hash(filepath):
+    """
+    Compute the SHA-256 hash of an artifact file, reusing the last hash while the file is unchanged.
+
+    Args:
+        filepath (str): The path to the artifact file.
+
+    Returns:
+        str: The hex digest of the file contents.
+    """
+    file_stat = stat(filepath)
+    memo_key = path.abspath(filepath)
+    signature = (file_stat.st_mtime_ns, file_stat.st_size)
+    memo = _artifact_hashes.get(memo_key)
+    if memo is None or memo[0] != signature:
+        memo = (signature, file_digest(filepath))
+    return _remember(_artifact_hashes, memo_key, memo, MAX_ARTIFACT_HASHES)[1]
+
+
+def code_fingerprint(plot_func):
+    """
+    Hash the code that renders a figure: the plot function and the shared plotting helpers it builds figures with.
+
+    Args:
+        plot_func (callable): The function building the figure.
+
+    Returns:
+        str: The hex digest of the source code.
+    """
+    fingerprint = _code_fingerprints.get(plot_func)
+    if fingerprint is None:
+        source = f'{getsource(plot_func)}\n{getsource(helpers)}'
+        fingerprint = sha256(source.encode()).hexdigest()
+    return _remember(_code_fingerprints, plot_func, fingerprint, MAX_CODE_FINGERPRINTS)
+
+
+def figure_cache_key(artifact_path, plot_func, params=None):
+    """
+    Build the cache key of a figure from its artifact contents, plotting code and parameters, and Plotly version.
+
+    Editing the plot function or the plotting helpers, or upgrading Plotly, changes the key, so a cached figure is
+    never served for code that would render it differently.
+
+    Args:
+        artifact_path (str): The path to the data artifact being plotted.
+        plot_func (callable): The function building the figure.
+        params (dict, optional): Extra keyword arguments passed to plot_func. Default is None.
+
+    Returns:
+        str: The cache key.
+    """
+    spec = dumps({'plot': f'{plot_func.__module__}.{plot_func.__qualname__}', 'code': code_fingerprint(plot_func),
+                  'plotly': plotly_version, 'params': params or {}}, sort_keys=True, default=str)
+    return sha256(f'{artifact_hash(artifact_path)}:{spec}'.encode()).hexdigest()
+
+
+def get_figure_json(artifact_path, plot_func, params=None, cache_path=FIGURES_PATH):
+    """
+    Return the serialized figure for an artifact, building and caching it on a miss.
+
+    Figures are looked up in memory first, then on disk, and only built with plot_func when neither has them. A
+    built figure is written next to its cache file and renamed into place, so a concurrent reader or an interrupted
+    write never leaves a truncated file behind under the key.
+
+    Args:
+        artifact_path (str): The path to the data artifact being plotted.
+        plot_func (callable): The function building the figure from display_data.
+        params (dict, optional): Extra keyword arguments passed to plot_func. Default is None.
+        cache_path (str, optional): The directory holding cached figure JSON files. Default is FIGURES_PATH.
+
+    Returns:
+        str: The Plotly figure serialized as JSON.
+    """
+    key = figure_cache_key(artifact_path, plot_func, params)
+    if key in _figures:
+        return _remember(_figures, key, _figures[key], MAX_FIGURES)
+    filepath = path.join(cache_path, f'{key}.json')
+    if path.exists(filepath):
+        with open(filepath, 'r') as f:
+            fig_json = f.read()
+    else:
+        with open(artifact_path, 'rb') as f:
+            display_data = load(f)
+        fig_json = plot_func(display_data=display_data, **(params or {})).to_json()
+        makedirs(cache_path, exist_ok=True)
+
+        def write(tmp_path):
+            with open(tmp_path, 'w') as f:
+                f.write(fig_json)
+
+        write_atomic(filepath, write)
+    return _remember(_figures, key, fig_json, MAX_FIGURES)
+
+
+def precompute_figures(artifacts_path=ARTIFACTS_PATH, cache_path=FIGURES_PATH):
+    """
+    Build and cache the figure of every data artifact that has a plot function.
+
+    Cached figure files under any other key were built from older artifacts or plotting code and are deleted.
+
+    Args:
+        artifacts_path (str, optional): The directory holding the data artifacts. Default is ARTIFACTS_PATH.
+        cache_path (str, optional): The directory holding cached figure JSON files. Default is FIGURES_PATH.
+
+    Returns:
+        list[str]: The deleted figure files.
+    """
+    current = set()
+    for key, plot_func in FIGURE_FUNCTIONS.items():
+        artifact_path = path.join(artifacts_path, f'{key}.joblib')
+        get_figure_json(artifact_path, plot_func, cache_path=cache_path)
+        current.add(f'{figure_cache_key(artifact_path, plot_func)}.json')
+    superseded = [name for name in listdir(cache_path) if name.endswith('.json') and name not in current]
+    for name in superseded:
+        remove(path.join(cache_path, name))
+    return superseded
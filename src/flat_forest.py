@@ -0,0 +1,223 @@
+# flat_forest.py
+from argparse import ArgumentParser
+from json import dump as json_dump, load as json_load
+from os import getpid, makedirs, path, replace
+from shutil import rmtree
+from joblib import load
+from numpy import arange, asarray, concatenate, float32, float64, int32, inf, isinf, isnan, load as np_load, \
+    save as np_save, tile, where, zeros
+from sklearn import __version__ as sklearn_version
+
+# From scikit-learn 1.4 on, classifier trees store class fractions in tree_.value and predict_proba returns them as is
+VALUES_ARE_FRACTIONS = tuple(int(v) for v in sklearn_version.split('.')[:2]) >= (1, 4)
+
+ARRAY_NAMES = ['feature', 'threshold', 'left', 'right', 'value', 'roots', 'classes', 'missing_left']
+
+
+class FlatForest:
+    """
+    A trained random forest flattened into contiguous numpy arrays.
+
+    All trees share one set of node arrays (feature, threshold, left and right
+    child, class distribution) and each tree is identified by its root index.
+    Leaves point to themselves, so every (row, tree) pair of a batch walks down
+    in lockstep with plain array indexing and drops out once it reaches a leaf.
+    A missing (NaN) value goes to the child sklearn's missing_go_to_left names
+    for the node, and infinite values are rejected, as sklearn does.
+    This avoids sklearn's per-tree call overhead, which dominates small batches;
+    for large batches sklearn's compiled traversal is faster.
+    Predictions match RandomForestClassifier.predict_proba and predict exactly:
+    inputs are compared as float32 against the float64 thresholds, and tree
+    probabilities are summed in tree order before averaging, as sklearn does.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots, classes, max_depth, missing_left):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.classes_ = classes
+        self.max_depth = max_depth
+        self.missing_left = missing_left
+
+    @classmethod
+    def from_model(cls, model):
+        """
+        Flatten a fitted RandomForestClassifier.
+
+        Args:
+            model (sklearn.ensemble.RandomForestClassifier): The fitted single-output forest.
+
+        Returns:
+            FlatForest: The flattened forest.
+        """
+        features, thresholds, lefts, rights, values, roots, missing_lefts = [], [], [], [], [], [], []
+        offset = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            nodes = arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+            features.append(where(is_leaf, 0, tree.feature))
+            thresholds.append(where(is_leaf, inf, tree.threshold))
+            lefts.append(where(is_leaf, nodes, tree.children_left) + offset)
+            rights.append(where(is_leaf, nodes, tree.children_right) + offset)
+            # Before scikit-learn 1.3 trees had no missing value support and rejected NaN
+            missing_go_to_left = getattr(tree, 'missing_go_to_left', None)
+            missing_lefts.append(zeros(tree.node_count, dtype=bool) if missing_go_to_left is None
+                                 else asarray(missing_go_to_left, dtype=bool) & ~is_leaf)
+            value = tree.value[:, 0, :model.n_classes_].astype(float64)
+            if not VALUES_ARE_FRACTIONS:
+                normalizer = value.sum(axis=1, keepdims=True)
+                normalizer[normalizer == 0.0] = 1.0
+                value = value / normalizer
+            values.append(value)
+            roots.append(offset)
+            offset += tree.node_count
+        return cls(
+            feature=concatenate(features).astype(int32),
+            threshold=concatenate(thresholds).astype(float64),
+            left=concatenate(lefts).astype(int32),
+            right=concatenate(rights).astype(int32),
+            value=concatenate(values),
+            roots=asarray(roots, dtype=int32),
+            classes=asarray(model.classes_),
+            max_depth=max(e.tree_.max_depth for e in model.estimators_),
+            missing_left=concatenate(missing_lefts)
+        )
+
+    @property
+    def n_estimators(self):
+        return len(self.roots)
+
+    def apply(self, X):
+        """
+        Find the leaf each row reaches in every tree.
+
+        Args:
+            X (array-like): Feature matrix of shape (n_samples, n_features).
+
+        Returns:
+            numpy.ndarray: Global leaf indices of shape (n_samples, n_estimators).
+
+        Raises:
+            ValueError: If X holds infinite values or values too large for float32.
+        """
+        X = asarray(X, dtype=float32)
+        if isinf(X).any():
+            raise ValueError("Input X contains infinity or a value too large for dtype('float32').")
+        n_samples = len(X)
+        nodes = tile(self.roots, n_samples)
+        rows = arange(n_samples).repeat(self.n_estimators)
+        active = (self.left[nodes] != nodes).nonzero()[0]
+        while active.size:
+            current = nodes[active]
+            values = X[rows[active], self.feature[current]]
+            go_left = values <= self.threshold[current]
+            missing = isnan(values)
+            if missing.any():
+                go_left[missing] = self.missing_left[current[missing]]
+            nodes[active] = current = where(go_left, self.left[current], self.right[current])
+            active = active[self.left[current] != current]
+        return nodes.reshape(n_samples, self.n_estimators)
+
+    def predict_proba(self, X):
+        """
+        Predict class probabilities, averaged over all trees.
+
+        Args:
+            X (array-like): Feature matrix of shape (n_samples, n_features).
+
+        Returns:
+            numpy.ndarray: Class probabilities of shape (n_samples, n_classes), columns in classes_ order.
+        """
+        # Reducing over the tree axis adds the trees one after another, in order
+        return self.value[self.apply(X)].sum(axis=1) / self.n_estimators
+
+    def predict(self, X):
+        """
+        Predict class labels.
+
+        Args:
+            X (array-like): Feature matrix of shape (n_samples, n_features).
+
+        Returns:
+            numpy.ndarray: The predicted class of each row.
+        """
+        return self.classes_.take(self.predict_proba(X).argmax(axis=1))
+
+    def touch(self):
+        """
+        Read every array once so memory-mapped pages are resident before the first prediction.
+
+        Returns:
+            None
+        """
+        for array in (self.feature, self.threshold, self.left, self.right, self.value, self.roots, self.missing_left):
+            array.sum()
+
+    def save(self, dirpath):
+        """
+        Save the forest as one .npy file per array plus a small JSON header.
+
+        The arrays are written to a sibling temporary directory that is renamed into place, and an existing forest
+        is moved aside before it is deleted rather than overwritten. Processes that memory-mapped the old arrays keep
+        reading them, and a loader never sees arrays from two different forests.
+
+        Args:
+            dirpath (str): The directory to write to; replaced if it exists.
+
+        Returns:
+            None
+        """
+        dirpath = path.normpath(str(dirpath))
+        tmp_dir = f'{dirpath}.{getpid()}.tmp'
+        rmtree(tmp_dir, ignore_errors=True)
+        makedirs(tmp_dir)
+        arrays = {'feature': self.feature, 'threshold': self.threshold, 'left': self.left, 'right': self.right,
+                  'value': self.value, 'roots': self.roots, 'classes': self.classes_, 'missing_left': self.missing_left}
+        for name, array in arrays.items():
+            np_save(path.join(tmp_dir, f'{name}.npy'), array, allow_pickle=False)
+        with open(path.join(tmp_dir, 'forest.json'), 'w') as f:
+            json_dump({'max_depth': int(self.max_depth), 'n_estimators': self.n_estimators}, f)
+        old_dir = f'{dirpath}.{getpid()}.old'
+        if path.exists(dirpath):
+            replace(dirpath, old_dir)
+        replace(tmp_dir, dirpath)
+        rmtree(old_dir, ignore_errors=True)
+
+    @classmethod
+    def load(cls, dirpath, mmap_mode=None):
+        """
+        Load a forest saved with save.
+
+        With mmap_mode='r' the node arrays are memory-mapped read-only instead of read into memory, so loading is
+        near-instant and every process mapping the same files shares their physical pages through the OS page cache.
+
+        Args:
+            dirpath (str): The directory the forest was saved to.
+            mmap_mode (str, optional): Memory-map mode passed to numpy.load, e.g. 'r'. Default is None (read into memory).
+
+        Returns:
+            FlatForest: The loaded forest.
+
+        Raises:
+            ValueError: If an array is missing, as in forests saved before missing values were routed.
+        """
+        with open(path.join(dirpath, 'forest.json'), 'r') as f:
+            header = json_load(f)
+        missing = [name for name in ARRAY_NAMES if not path.exists(path.join(dirpath, f'{name}.npy'))]
+        if missing:
+            raise ValueError(f"The flat forest in {dirpath} has no {', '.join(missing)}; flatten the model again")
+        arrays = {name: np_load(path.join(dirpath, f'{name}.npy'), mmap_mode=mmap_mode, allow_pickle=False)
+                  for name in ARRAY_NAMES}
+        return cls(max_depth=header['max_depth'], **arrays)
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description="Flatten a pickled random forest into numpy arrays.")
+    parser.add_argument('model_path', help="path to the joblib-pickled RandomForestClassifier")
+    parser.add_argument('output_dir', help="directory the flat forest arrays are written to")
+    args = parser.parse_args()
+    FlatForest.from_model(load(args.model_path)).save(args.output_dir)
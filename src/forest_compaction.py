@@ -0,0 +1,147 @@
+# forest_compaction.py
+from copy import copy
+from statistics import median
+from time import perf_counter
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import f1_score
+from sklearn.model_selection import train_test_split
+from src.flat_forest import ARRAY_NAMES, FlatForest
+
+COMPACTION_OBJECTIVES = ['size', 'latency']
+# Depth caps and leaf sizes tried on top of the chosen configuration; ones it already satisfies are skipped
+DEPTH_CAPS = [20, 12, 8]
+LEAF_SIZES = [5, 20]
+# Fractions of the trees every refit configuration is scored with
+TREE_FRACTIONS = [1, 1 / 2, 1 / 4, 1 / 8]
+MIN_TREES = 10
+
+
+def first_trees(model, n_trees):
+    """
+    Keep the first trees of a fitted forest.
+
+    With a fixed random_state the trees of a forest are drawn in sequence, so the first n_trees are the forest the
+    same configuration grows with n_estimators=n_trees.
+
+    Args:
+        model (RandomForestClassifier): The fitted forest.
+        n_trees (int): The number of trees to keep.
+
+    Returns:
+        RandomForestClassifier: A shallow copy holding the first n_trees trees.
+    """
+    smaller = copy(model)
+    smaller.estimators_ = model.estimators_[:n_trees]
+    smaller.n_estimators = n_trees
+    return smaller
+
+
+def measure_forest(model, X_val, y_val, repeats=100):
+    """
+    Measure the size, latency and accuracy of a forest as the API serves it.
+
+    Args:
+        model (RandomForestClassifier): The fitted forest.
+        X_val (numpy.ndarray): The scaled validation matrix.
+        y_val (numpy.ndarray): The validation targets.
+        repeats (int, optional): Single-row predictions timed. Default is 100.
+
+    Returns:
+        dict: Tree count, node count, flat forest bytes, median single-row latency and 1000-row batch time in
+            milliseconds, and validation macro F1.
+    """
+    flat = FlatForest.from_model(model)
+    arrays = [getattr(flat, 'classes_' if name == 'classes' else name) for name in ARRAY_NAMES]
+    row = X_val[:1]
+    timings = []
+    for _ in range(repeats):
+        start = perf_counter()
+        flat.predict_proba(row)
+        timings.append(perf_counter() - start)
+    start = perf_counter()
+    flat.predict_proba(X_val[:1000])
+    batch_seconds = perf_counter() - start
+    return {
+        'n_trees': len(model.estimators_),
+        'nodes': int(sum(e.tree_.node_count for e in model.estimators_)),
+        'size_bytes': int(sum(array.nbytes for array in arrays)),
+        'latency_ms': median(timings) * 1000,
+        'batch_ms': batch_seconds * 1000,
+        'macro_f1': float(f1_score(y_val, flat.classes_.take(flat.predict_proba(X_val).argmax(axis=1)),
+                                   average='macro'))
+    }
+
+
+def compaction_configs(params, depth_caps=None, leaf_sizes=None):
+    """
+    List the depth cap and leaf size combinations to refit.
+
+    Args:
+        params (dict): The chosen forest parameters.
+        depth_caps (list[int], optional): Depth caps to try. Default is None (DEPTH_CAPS).
+        leaf_sizes (list[int], optional): min_samples_leaf values to try. Default is None (LEAF_SIZES).
+
+    Returns:
+        list[dict]: max_depth and min_samples_leaf of each configuration, the chosen one first.
+    """
+    max_depth = params.get('max_depth')
+    min_samples_leaf = params.get('min_samples_leaf', 1)
+    depths = [max_depth] + [d for d in (depth_caps or DEPTH_CAPS) if max_depth is None or d < max_depth]
+    leaves = [min_samples_leaf] + [m for m in (leaf_sizes or LEAF_SIZES) if m > min_samples_leaf]
+    return [{'max_depth': d, 'min_samples_leaf': m} for d in depths for m in leaves]
+
+
+def compact_forest(params, X_train, y_train, f1_tolerance=0.01, objective='size', depth_caps=None, leaf_sizes=None,
+                   random_state=42, n_jobs=-1):
+    """
+    Find the smallest or fastest forest whose macro F1 stays within a tolerance of the chosen configuration.
+
+    A fifth of the training data is held out. The chosen configuration and every depth cap and min_samples_leaf
+    variant of it are fit on the rest, and each is scored with all of its trees and with the first half, quarter
+    and eighth of them, which needs no further fits.
+
+    Args:
+        params (dict): The chosen forest parameters, e.g. the search's best_params_.
+        X_train (numpy.ndarray): The scaled training matrix.
+        y_train (numpy.ndarray): The training targets.
+        f1_tolerance (float, optional): Validation macro F1 a candidate may lose against the full forest. Default
+            is 0.01.
+        objective (str, optional): 'size' picks the fewest flat forest bytes, 'latency' the fastest single-row
+            prediction. Default is 'size'.
+        depth_caps (list[int], optional): Depth caps to try. Default is None (DEPTH_CAPS).
+        leaf_sizes (list[int], optional): min_samples_leaf values to try. Default is None (LEAF_SIZES).
+        random_state (int, optional): Seed of the split and the forests. Default is 42.
+        n_jobs (int, optional): Trees fit in parallel, e.g. the concurrent fits a memory budget allows. Default is
+            -1 (one per core).
+
+    Returns:
+        tuple: The parameters of the picked candidate (n_estimators, max_depth and min_samples_leaf) and the
+            measurements of every candidate, the full forest first.
+
+    Raises:
+        ValueError: If objective is not one of COMPACTION_OBJECTIVES.
+    """
+    if objective not in COMPACTION_OBJECTIVES:
+        raise ValueError(f"objective must be one of {COMPACTION_OBJECTIVES}, got '{objective}'")
+    X_fit, X_val, y_fit, y_val = train_test_split(X_train, y_train, test_size=0.2, random_state=random_state)
+    n_estimators = params.get('n_estimators', 100)
+    tree_counts = sorted({min(n_estimators, max(MIN_TREES, round(n_estimators * f))) for f in TREE_FRACTIONS},
+                         reverse=True)
+
+    candidates = []
+    for config in compaction_configs(params, depth_caps, leaf_sizes):
+        model = RandomForestClassifier(**{**params, **config}, random_state=random_state, n_jobs=n_jobs)
+        model.fit(X_fit, y_fit)
+        for n_trees in tree_counts:
+            candidates.append({**config, **measure_forest(first_trees(model, n_trees), X_val, y_val)})
+
+    reference = candidates[0]
+    key = 'size_bytes' if objective == 'size' else 'latency_ms'
+    for c in candidates:
+        c['eligible'] = c['macro_f1'] >= reference['macro_f1'] - f1_tolerance
+        c['picked'] = False
+    picked = min((c for c in candidates if c['eligible']),
+                 key=lambda c: (c[key], c['latency_ms'] if objective == 'size' else c['size_bytes']))
+    picked['picked'] = True
+    return {'n_estimators': picked['n_trees'], 'max_depth': picked['max_depth'],
+            'min_samples_leaf': picked['min_samples_leaf']}, candidates
@@ -1,5 +1,73 @@
 # helpers.py
+from concurrent.futures import ThreadPoolExecutor
+from os import getpid, path, remove, replace
+from numpy import arange, asarray, abs as np_abs, argmax, linspace
+from pandas import concat
 from plotly.express import bar, line
+import plotly.io as pio
+from src.io_utils import write_atomic
+
+# Largest number of points kept per plotted line before downsampling
+DEFAULT_MAX_POINTS = 1000
+# Total number of line points left after downsampling above which traces are rendered with WebGL (Scattergl). With
+# at most DEFAULT_MAX_POINTS per line, only plots of many lines or with downsampling disabled reach it
+WEBGL_THRESHOLD = 5000
+
+
+def lttb_indices(y, n_out):
+    """
+    Select the points of a series to keep using Largest-Triangle-Three-Buckets.
+
+    Points are assumed evenly spaced, so their positions are used as the x values.
+
+    Args:
+        y (array-like): The series values, in plotting order.
+        n_out (int): The number of points to keep, including the first and last point.
+
+    Returns:
+        numpy.ndarray: The sorted positions of the points to keep.
+    """
+    y = asarray(y, dtype='float64')
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return arange(n)
+    x = arange(n, dtype='float64')
+    edges = linspace(1, n - 1, n_out - 1).astype(int)
+    kept = [0]
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_stop = edges[i + 2] if i + 2 < len(edges) else n
+        # Average of the next bucket is the third vertex of the triangle
+        avg_x = x[stop:next_stop].mean() if next_stop > stop else x[-1]
+        avg_y = y[stop:next_stop].mean() if next_stop > stop else y[-1]
+        prev = kept[-1]
+        area = np_abs((x[prev] - avg_x) * (y[start:stop] - y[prev]) -
+                      (x[prev] - x[start:stop]) * (avg_y - y[prev]))
+        kept.append(start + int(argmax(area)))
+    kept.append(n - 1)
+    return asarray(kept)
+
+
+def downsample(display_data, y_col, max_points, group_col=None):
+    """
+    Downsample each series of a long-format DataFrame to at most max_points rows with LTTB.
+
+    Args:
+        display_data (pd.DataFrame): The data to be plotted, in plotting order.
+        y_col (str): The column holding the series values.
+        max_points (int): The largest number of rows kept per series. None disables downsampling.
+        group_col (str, optional): The column identifying each series. Default is None (a single series).
+
+    Returns:
+        pd.DataFrame: The downsampled data.
+    """
+    if max_points is None:
+        return display_data
+    groups = [display_data] if group_col is None else [
+        g for _, g in display_data.groupby(group_col, sort=False)]
+    if all(len(g) <= max_points for g in groups):
+        return display_data
+    return concat([g.iloc[lttb_indices(g[y_col].fillna(0), max_points)] for g in groups])
 
 
 def get_bar_plot(display_data, color_col_name, title):
@@ -23,24 +91,34 @@ def get_bar_plot(display_data, color_col_name, title):
     return fig
 
 
-def get_line_plot(display_data, x_col, y_col, labels, color_sequence, title, color_col=None):
+def get_line_plot(display_data, x_col, y_col, labels, color_sequence, title, color_col=None,
+                  max_points=DEFAULT_MAX_POINTS, webgl_threshold=WEBGL_THRESHOLD):
     """
     Generate a line plot using Plotly.
 
     Args:
         display_data (pd.DataFrame): The data to be plotted.
         x_col (str): The column name to be used for the x-axis.
-        y_col (str): The column name to be used for the y-axis.
+        y_col (str or list of str): The column name(s) to be used for the y-axis.
         labels (dict): A dictionary mapping column names to axis labels.
         color_sequence (list of str): A list of colors to be used for the lines.
         title (str): The title of the plot.
         color_col (str, optional): The column name to be used for coloring the lines. Default is None.
+        max_points (int, optional): The largest number of points kept per line before downsampling. Default is DEFAULT_MAX_POINTS.
+        webgl_threshold (int, optional): The total number of points left after downsampling above which lines are drawn with WebGL. Default is WEBGL_THRESHOLD.
 
     Returns:
         plotly.graph_objs._figure.Figure: A Plotly Figure object representing the line plot.
     """
+    if isinstance(y_col, list):
+        # Same long format Plotly Express builds for wide data, so each line is downsampled on its own
+        display_data = display_data.melt(
+            id_vars=[x_col], value_vars=y_col, var_name='variable', value_name='value')
+        y_col, color_col = 'value', 'variable'
+    display_data = downsample(display_data, y_col, max_points, color_col)
+    render_mode = 'webgl' if len(display_data) > webgl_threshold else 'svg'
     fig = line(display_data, x=x_col, y=y_col, labels=labels, title=title,
-               color=color_col, color_discrete_sequence=color_sequence)
+               color=color_col, color_discrete_sequence=color_sequence, render_mode=render_mode)
     fig.update_layout(legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
                       font=dict(family="Courier New, monospace", size=18), legend_title=None, template='plotly_dark')
     fig.update_traces(line={'width': 3})
@@ -64,3 +142,64 @@ def display_plot(fig, png_path=None, html_path=None):
         fig.write_image(png_path, engine="kaleido", width=1080, height=720)
     if html_path:
         fig.write_html(html_path, full_html='False', include_plotlyjs='cdn')
+
+
+def write_pngs(figs, png_paths, width=1080, height=720):
+    """
+    Save several Plotly figures as PNG images in one batch.
+
+    Uses a single Kaleido session through plotly.io.write_images when the installed Plotly provides it,
+    otherwise renders the images in parallel threads. Existing images are only replaced once every image of the
+    batch rendered, so a failed export leaves the previous images whole.
+
+    Args:
+        figs (list of plotly.graph_objs._figure.Figure): The figures to be saved.
+        png_paths (list of str): The file paths of the PNG images, one per figure.
+        width (int, optional): The image width in pixels. Default is 1080.
+        height (int, optional): The image height in pixels. Default is 720.
+
+    Returns:
+        None
+    """
+    if not figs:
+        return
+    # Rendered next to their destinations and renamed into place once all of them are written
+    tmp_paths = [f'{png_path}.{getpid()}.tmp' for png_path in png_paths]
+    try:
+        if hasattr(pio, 'write_images'):
+            pio.write_images(figs, tmp_paths, format='png', width=width, height=height)
+        else:
+            with ThreadPoolExecutor(max_workers=len(figs)) as pool:
+                list(pool.map(lambda args: args[0].write_image(args[1], format='png', engine="kaleido", width=width,
+                                                               height=height),
+                              zip(figs, tmp_paths)))
+        for tmp_path, png_path in zip(tmp_paths, png_paths):
+            replace(tmp_path, png_path)
+    finally:
+        for tmp_path in tmp_paths:
+            if path.exists(tmp_path):
+                remove(tmp_path)
+
+
+def write_html_report(figs, html_path, title='Artificial Space Objects Report'):
+    """
+    Save several Plotly figures in one HTML document that loads plotly.js once.
+
+    Args:
+        figs (list of plotly.graph_objs._figure.Figure): The figures to be included, in order.
+        html_path (str): The file path of the HTML report.
+        title (str, optional): The title of the HTML document. Default is 'Artificial Space Objects Report'.
+
+    Returns:
+        None
+    """
+    divs = [fig.to_html(full_html=False, include_plotlyjs='cdn' if i == 0 else False)
+            for i, fig in enumerate(figs)]
+
+    def write(tmp_path):
+        with open(tmp_path, 'w') as f:
+            f.write(f'<html>\n<head><meta charset="utf-8"><title>{title}</title></head>\n<body>\n')
+            f.write('\n'.join(divs))
+            f.write('\n</body>\n</html>\n')
+
+    write_atomic(html_path, write)
@@ -0,0 +1,63 @@
+# io_utils.py
+from hashlib import sha256
+from json import dump
+from os import getpid, path, remove, replace
+
+
+def file_digest(filepath):
+    """
+    Compute the SHA-256 digest of a file.
+
+    Args:
+        filepath (str): The file path.
+
+    Returns:
+        str: The hex digest.
+    """
+    digest = sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_atomic(filepath, write):
+    """
+    Write a file next to its destination and rename it into place.
+
+    Readers see either the old or the new file, never a partial one. The old file is unlinked rather than
+    overwritten, so a process that memory-mapped it keeps reading the old contents instead of faulting on pages
+    that changed or disappeared under it.
+
+    Args:
+        filepath (str): The destination path.
+        write (callable): Called with a temporary path in the same directory to write the file to.
+
+    Returns:
+        None
+    """
+    tmp_path = f'{filepath}.{getpid()}.tmp'
+    try:
+        write(tmp_path)
+        replace(tmp_path, filepath)
+    finally:
+        if path.exists(tmp_path):
+            remove(tmp_path)
+
+
+def write_json_atomic(filepath, content):
+    """
+    Write a JSON file so readers see either the old or the new content, never a partial file.
+
+    Args:
+        filepath (str): The destination path.
+        content (dict): The JSON content.
+
+    Returns:
+        None
+    """
+    def write(tmp_path):
+        with open(tmp_path, 'w') as f:
+            dump(content, f, indent=2)
+
+    write_atomic(filepath, write)
@@ -1,3 +1,6 @@
 # local.py
 DATA_PATH = 'data/'
 ARTIFACTS_PATH = 'artifacts/'
+FIGURES_PATH = 'artifacts/figures/'
+MODELS_PATH = 'artifacts/models/'
+FEATURE_STORE_PATH = 'artifacts/feature_store/'
@@ -1,12 +1,27 @@
 # main.py
+from argparse import ArgumentParser
+from json import load as json_load
 from joblib import load
-from os import listdir
+from os import listdir, path
+from plotly.io import from_json
 from src.artifact_setup import make_artifacts
+from src.figure_cache import FIGURE_FUNCTIONS, figure_cache_key, get_figure_json
+from src.helpers import write_pngs, write_html_report
+from src.io_utils import write_json_atomic
 from src.sat_growth_over_time import display_sat_growth_over_time_plot, display_starlink_vs_all_other_sats_plot
 from src.annual_launches_by_country import display_annual_launches_by_org_plot
 from src.annual_launches_by_sat_type import display_launch_count_by_sat_class_plot
 from src.local import ARTIFACTS_PATH
 
+IMG_PATH = '../img/'
+# Image file name (without extension) exported for each data artifact
+EXPORT_NAMES = {
+    'launch_decay_orbit_over_time': 'sat_growth',
+    'starlink_vs_other_launches': 'starlink_vs_all_others',
+    'annual_launches_by_country': 'launches_by_country',
+    'launch_count_by_sat_class': 'launches_by_sat_type'
+}
+
 
 def check_and_create_artifacts(filenames):
     """
@@ -33,7 +48,53 @@ def load_data(filepath):
         return load(f)
 
 
-def main():
+def export_report(filenames, img_path=IMG_PATH, force=False):
+    """
+    Export figures headlessly: PNGs in one batch and a single combined HTML report.
+
+    Only PNGs whose figure cache key changed since the last export (or that are missing) are rendered again.
+
+    Args:
+        filenames (list): List of artifact filenames to export.
+        img_path (str, optional): The directory the images and report are written to. Default is IMG_PATH.
+        force (bool, optional): Whether to render every PNG regardless of the export manifest. Default is False.
+
+    Returns:
+        list: The PNG paths that were rendered.
+    """
+    manifest_path = path.join(img_path, 'export_manifest.json')
+    manifest = {}
+    if path.exists(manifest_path):
+        with open(manifest_path, 'r') as f:
+            manifest = json_load(f)
+
+    figs, changed_figs, changed_paths = [], [], []
+    for filename in filenames:
+        artifact_path = f'{ARTIFACTS_PATH}{filename}.joblib'
+        plot_func = FIGURE_FUNCTIONS[filename]
+        key = figure_cache_key(artifact_path, plot_func)
+        fig = from_json(get_figure_json(artifact_path, plot_func))
+        figs.append(fig)
+        png_path = path.join(img_path, f'{EXPORT_NAMES[filename]}.png')
+        if force or manifest.get(filename) != key or not path.exists(png_path):
+            changed_figs.append(fig)
+            changed_paths.append(png_path)
+            manifest[filename] = key
+
+    write_pngs(changed_figs, changed_paths)
+    write_html_report(figs, path.join(img_path, 'report.html'))
+    write_json_atomic(manifest_path, dict(sorted(manifest.items())))
+    return changed_paths
+
+
+def main(headless=False, force=False):
+    """
+    Create any missing artifacts, then display and save the figures.
+
+    Args:
+        headless (bool, optional): Whether to skip displaying the figures and export them with export_report. Default is False.
+        force (bool, optional): Whether a headless export renders every PNG, changed or not. Default is False.
+    """
     filenames = [
         'annual_launches_by_country',
         'launch_count_by_sat_class',
@@ -43,6 +104,11 @@ def main():
 
     check_and_create_artifacts(filenames)
 
+    if headless:
+        rendered = export_report(filenames, force=force)
+        print(f"Rendered {len(rendered)} of {len(filenames)} images")
+        return
+
     data = {filename: load_data(f'{ARTIFACTS_PATH}{filename}.joblib')
             for filename in filenames}
 
@@ -72,4 +138,10 @@ def main():
 
 
 if __name__ == '__main__':
-    main()
+    parser = ArgumentParser(description="Display or export the ASO figures.")
+    parser.add_argument('--headless', action='store_true',
+                        help="skip fig.show() and export PNGs plus one HTML report")
+    parser.add_argument('--force', action='store_true',
+                        help="with --headless, render every PNG even if its artifact is unchanged")
+    args = parser.parse_args()
+    main(headless=args.headless, force=args.force)
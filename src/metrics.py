@@ -0,0 +1,364 @@
+# metrics.py
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock, local
+from time import perf_counter_ns
+
+# Latency buckets in seconds, from 10 microseconds to 10 seconds
+LATENCY_BUCKETS = (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0)
+# Row-count buckets for batch sizes, powers of two up to 16384
+SIZE_BUCKETS = tuple(float(2 ** i) for i in range(15))
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# Whether counter increments and histogram observations made in the current context are recorded
+_recording = ContextVar('metrics_recording', default=True)
+
+
+@contextmanager
+def paused():
+    """
+    Drop the counter increments and histogram observations made inside the context, e.g. by synthetic warm-up work.
+
+    Gauges are still set. The setting follows the context, so requests served concurrently keep recording.
+
+    Yields:
+        None
+    """
+    token = _recording.set(False)
+    try:
+        yield
+    finally:
+        _recording.reset(token)
+
+
+def _format_labels(label_names, label_values, extra=None):
+    pairs = list(zip(label_names, label_values))
+    if extra is not None:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """
+    Monotonic counter, optionally split by label values.
+    """
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = Lock()
+
+    def inc(self, *label_values, amount=1):
+        """
+        Increase the counter.
+
+        Args:
+            *label_values (str): One value per label name.
+            amount (float, optional): The increment. Default is 1.
+
+        Returns:
+            None
+        """
+        if not _recording.get():
+            return
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        for label_values, value in sorted(self._values.items()):
+            lines.append(f'{self.name}{_format_labels(self.label_names, label_values)} {_format_value(value)}')
+        return lines
+
+
+class Gauge(Counter):
+    """
+    Value that can go up and down, optionally split by label values.
+    """
+
+    def set(self, value, *label_values):
+        """
+        Set the gauge.
+
+        Args:
+            value (float): The new value.
+            *label_values (str): One value per label name.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._values[label_values] = value
+
+    def render(self):
+        lines = super().render()
+        lines[1] = f'# TYPE {self.name} gauge'
+        return lines
+
+
+class _HistogramSeries:
+    """
+    One label combination of a histogram, sharded per thread.
+
+    Every thread writes to its own bucket counts, so an observation takes no
+    lock and loses no increments; shards are summed when the series is read.
+    """
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self._local = local()
+        self._shards = []
+
+    def _new_shard(self):
+        shard = self._local.shard = [[0] * (len(self.bounds) + 1), 0.0, 0]
+        self._shards.append(shard)
+        return shard
+
+    def observe(self, value):
+        """
+        Record one value.
+
+        Args:
+            value (float): The observed value.
+
+        Returns:
+            None
+        """
+        if not _recording.get():
+            return
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._new_shard()
+        shard[0][bisect_left(self.bounds, value)] += 1
+        shard[1] += value
+        shard[2] += 1
+
+    def observe_since(self, start_ns):
+        """
+        Record the seconds elapsed since a perf_counter_ns timestamp.
+
+        Args:
+            start_ns (int): The perf_counter_ns value taken when the timed stage started.
+
+        Returns:
+            int: The current perf_counter_ns value, so consecutive stages can be chained.
+        """
+        now = perf_counter_ns()
+        if not _recording.get():
+            return now
+        value = (now - start_ns) / 1e9
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._new_shard()
+        shard[0][bisect_left(self.bounds, value)] += 1
+        shard[1] += value
+        shard[2] += 1
+        return now
+
+    def snapshot(self):
+        counts = [0] * (len(self.bounds) + 1)
+        total, count = 0.0, 0
+        for shard_counts, shard_total, shard_count in list(self._shards):
+            counts = [a + b for a, b in zip(counts, shard_counts)]
+            total += shard_total
+            count += shard_count
+        return counts, total, count
+
+
+class Histogram:
+    """
+    Histogram of observed values in fixed buckets, optionally split by label values.
+
+    Hot paths bind a label combination once with labels() and observe on the
+    returned series: an observation is then one binary search over the bucket
+    bounds and three increments on thread-local lists, well under a microsecond.
+    Buckets are stored per bucket and only made cumulative when rendered.
+    """
+
+    def __init__(self, name, documentation, buckets=LATENCY_BUCKETS, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.bounds = tuple(sorted(buckets))
+        self.label_names = tuple(label_names)
+        self._series = {}
+        self._lock = Lock()
+
+    def labels(self, *label_values):
+        """
+        Get the series of one label combination, creating it on first use.
+
+        Args:
+            *label_values (str): One value per label name.
+
+        Returns:
+            _HistogramSeries: The series to observe values on.
+        """
+        series = self._series.get(label_values)
+        if series is None:
+            with self._lock:
+                series = self._series.setdefault(label_values, _HistogramSeries(self.bounds))
+        return series
+
+    def observe(self, value, *label_values):
+        """
+        Record one value.
+
+        Args:
+            value (float): The observed value.
+            *label_values (str): One value per label name.
+
+        Returns:
+            None
+        """
+        if not _recording.get():
+            return
+        self.labels(*label_values).observe(value)
+
+    def observe_since(self, start_ns, *label_values):
+        """
+        Record the seconds elapsed since a perf_counter_ns timestamp.
+
+        Args:
+            start_ns (int): The perf_counter_ns value taken when the timed stage started.
+            *label_values (str): One value per label name.
+
+        Returns:
+            int: The current perf_counter_ns value, so consecutive stages can be chained.
+        """
+        if not _recording.get():
+            return perf_counter_ns()
+        return self.labels(*label_values).observe_since(start_ns)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        for label_values, series in sorted(self._series.items()):
+            counts, total, count = series.snapshot()
+            cumulative = 0
+            for bound, n in zip(self.bounds + (float('inf'),), counts):
+                cumulative += n
+                labels = _format_labels(self.label_names, label_values, ('le', _format_value(bound)))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.label_names, label_values)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Collection of metrics rendered together in the Prometheus text format.
+
+    Besides the metrics it owns, the registry can hold collector callbacks that
+    are called at render time, so counters kept elsewhere (the prediction cache,
+    the micro-batcher) are exported without being updated twice.
+    """
+
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def counter(self, name, documentation, label_names=()):
+        metric = Counter(name, documentation, label_names)
+        self.metrics.append(metric)
+        return metric
+
+    def gauge(self, name, documentation, label_names=()):
+        metric = Gauge(name, documentation, label_names)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, buckets=LATENCY_BUCKETS, label_names=()):
+        metric = Histogram(name, documentation, buckets, label_names)
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collect):
+        """
+        Register a callback exporting values kept outside the registry.
+
+        Args:
+            collect (callable): Function returning a list of (name, type, documentation, value) tuples.
+
+        Returns:
+            None
+        """
+        self.collectors.append(collect)
+
+    def render(self):
+        """
+        Render every metric in the Prometheus text exposition format.
+
+        Returns:
+            str: The exposition text.
+        """
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for collect in self.collectors:
+            for name, metric_type, documentation, value in collect():
+                lines.extend([f'# HELP {name} {documentation}', f'# TYPE {name} {metric_type}',
+                              f'{name} {_format_value(value)}'])
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware counting requests and timing them end to end by route.
+
+    Requests are labelled with the route template rather than the raw path, so
+    unknown paths cannot blow up the number of series. Being plain ASGI, it adds
+    one coroutine frame per request instead of the cost of a BaseHTTPMiddleware.
+    """
+
+    def __init__(self, app, requests, latency, observer=None):
+        """
+        Initialize the middleware.
+
+        Args:
+            app (ASGIApp): The wrapped application.
+            requests (Counter): Counter labelled by method, route and status code.
+            latency (Histogram): Histogram labelled by method and route.
+            observer (callable, optional): Called with the method, route, status code and latency in seconds of
+                every request. Default is None.
+        """
+        self.app = app
+        self.requests = requests
+        self.latency = latency
+        self.observer = observer
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        start = perf_counter_ns()
+        status = [500]
+
+        async def send_with_status(message):
+            if message['type'] == 'http.response.start':
+                status[0] = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get('route')
+            route = getattr(route, 'path', 'unmatched')
+            seconds = (perf_counter_ns() - start) / 1e9
+            self.latency.observe(seconds, scope['method'], route)
+            self.requests.inc(scope['method'], route, str(status[0]))
+            if self.observer is not None:
+                self.observer(scope['method'], route, status[0], seconds)
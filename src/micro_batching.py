@@ -0,0 +1,194 @@
+# micro_batching.py
+from asyncio import CancelledError, Queue, TimeoutError as AsyncTimeoutError, get_running_loop, wait_for
+from time import perf_counter
+
+
+class MicroBatcher:
+    """
+    Collect concurrent requests into batches and score each batch with one call.
+
+    Requests wait in an asyncio queue. A single worker task takes the first
+    waiting request, keeps collecting until max_batch_size requests are in hand
+    or max_wait_ms has passed, then scores the batch in the default executor so
+    the event loop stays free. Requests arriving while a batch is being scored
+    pile up in the queue, so batches grow with load on their own. Items are
+    submitted with a group, e.g. the model they have to be scored with, and
+    each group of a batch is scored in a call of its own.
+
+    When scoring a batch raises, its items are scored again one at a time,
+    so only the requests that fail on their own get the exception. A worker
+    that dies is restarted on the same queue and picks up the requests still
+    waiting in it; when it is cancelled, the waiting requests are cancelled
+    with it instead of hanging.
+    """
+
+    def __init__(self, score_batch, max_batch_size=64, max_wait_ms=2.0):
+        """
+        Initialize the batcher.
+
+        Args:
+            score_batch (callable): Function taking a list of items and the group they were submitted with, and
+                returning a list of results in the same order.
+            max_batch_size (int, optional): Largest number of items scored in one call. Default is 64.
+            max_wait_ms (float, optional): Longest time in milliseconds the first item of a batch waits for others. Default is 2.0.
+        """
+        self.score_batch = score_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue = None
+        self.loop = None
+        self.worker = None
+        self.requests = 0
+        self.batches = 0
+        self.full_flushes = 0
+        self.timeout_flushes = 0
+        self.errors = 0
+        self.failed_requests = 0
+        self.largest_batch = 0
+        self.queue_wait_seconds = 0.0
+        self.scoring_seconds = 0.0
+
+    def _ensure_worker(self):
+        loop = get_running_loop()
+        if self.queue is None or self.loop is not loop:
+            # A queue from another event loop only holds requests whose loop has gone
+            self.queue, self.loop = Queue(), loop
+            self.worker = None
+        if self.worker is None or self.worker.done():
+            self._start_worker()
+
+    def _start_worker(self):
+        self.worker = self.loop.create_task(self._run())
+        self.worker.add_done_callback(self._worker_done)
+
+    def _worker_done(self, worker):
+        if worker is not self.worker or self.loop.is_closed():
+            return
+        if worker.cancelled():
+            while not self.queue.empty():
+                _, _, future, _ = self.queue.get_nowait()
+                future.cancel()
+        else:
+            # Retrieved so asyncio does not log it again; the batch the worker held already got the exception
+            worker.exception()
+            if not self.queue.empty():
+                self._start_worker()
+
+    def _score_each(self, items, group):
+        outcomes = []
+        for item in items:
+            try:
+                outcomes.append((True, self.score_batch([item], group)[0]))
+            except Exception as e:
+                outcomes.append((False, e))
+        return outcomes
+
+    async def submit(self, item, group=None):
+        """
+        Queue an item for scoring and wait for its result.
+
+        Args:
+            item (Any): The item passed to score_batch.
+            group (Any, optional): Only items of the same group, compared by identity, are scored together; it is
+                passed to score_batch with them. Default is None.
+
+        Returns:
+            Any: The result score_batch returned for this item.
+        """
+        self._ensure_worker()
+        future = get_running_loop().create_future()
+        self.queue.put_nowait((item, group, future, perf_counter()))
+        return await future
+
+    async def _collect(self, batch):
+        batch.append(await self.queue.get())
+        deadline = perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            remaining = deadline - perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await wait_for(self.queue.get(), remaining))
+            except AsyncTimeoutError:
+                break
+
+    async def _run(self):
+        loop = get_running_loop()
+        while True:
+            # Filled in place, so the requests taken off the queue are known however the worker dies
+            batch = []
+            try:
+                await self._collect(batch)
+                await self._score(loop, batch)
+            except BaseException as e:
+                # The worker is dying; the requests it took off the queue must not wait forever
+                for _, _, future, _ in batch:
+                    if future.done():
+                        continue
+                    if isinstance(e, CancelledError):
+                        future.cancel()
+                    else:
+                        future.set_exception(e)
+                raise
+
+    async def _score(self, loop, batch):
+        start = perf_counter()
+        if len(batch) == self.max_batch_size:
+            self.full_flushes += 1
+        else:
+            self.timeout_flushes += 1
+        self.queue_wait_seconds += sum(start - queued for _, _, _, queued in batch)
+        groups = {}
+        for entry in batch:
+            groups.setdefault(id(entry[1]), []).append(entry)
+        for entries in groups.values():
+            await self._score_group(loop, entries)
+        self.scoring_seconds += perf_counter() - start
+
+    async def _score_group(self, loop, entries):
+        group = entries[0][1]
+        self.requests += len(entries)
+        self.batches += 1
+        self.largest_batch = max(self.largest_batch, len(entries))
+        items = [item for item, _, _, _ in entries]
+        try:
+            outcomes = [(True, result) for result in await loop.run_in_executor(None, self.score_batch, items, group)]
+        except Exception as e:
+            self.errors += 1
+            outcomes = [(False, e)] if len(entries) == 1 else await loop.run_in_executor(None, self._score_each,
+                                                                                          items, group)
+        for (_, _, future, _), (ok, outcome) in zip(entries, outcomes):
+            if not ok:
+                self.failed_requests += 1
+            if future.done():
+                continue
+            if ok:
+                future.set_result(outcome)
+            else:
+                future.set_exception(outcome)
+
+    def stats(self):
+        """
+        Summarize batching behavior since startup.
+
+        Returns:
+            dict: Configuration, counters and averages of the batcher.
+        """
+        return {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000,
+            'requests': self.requests,
+            'batches': self.batches,
+            'mean_batch_size': self.requests / self.batches if self.batches else 0.0,
+            'largest_batch': self.largest_batch,
+            'full_flushes': self.full_flushes,
+            'timeout_flushes': self.timeout_flushes,
+            'errors': self.errors,
+            'failed_requests': self.failed_requests,
+            'queued': self.queue.qsize() if self.queue is not None else 0,
+            'mean_queue_wait_ms': 1000 * self.queue_wait_seconds / self.requests if self.requests else 0.0,
+            'mean_scoring_ms': 1000 * self.scoring_seconds / self.batches if self.batches else 0.0
+        }
@@ -0,0 +1,144 @@
+# model_bundle.py
+from json import load as json_load
+from os import path
+from time import perf_counter
+from joblib import load
+from src.flat_forest import FlatForest
+from src.model_registry import MANIFEST_FILE, verify_manifest
+from src.pipeline import PIPELINE_FILE, InferencePipeline
+from src.prediction_cache import artifact_version
+from src.preprocessing import CATEGORICAL_FEATURES, PREPROCESSOR_FILE, FeaturePreprocessor
+
+MODEL_FILE = 'ran_for_model.joblib'
+SCALER_FILE = 'scaler.joblib'
+STATUS_MAPPING_FILE = 'status_mapping.joblib'
+# Everything a bundle is loaded from, relative to its directory
+BUNDLE_FILES = [MODEL_FILE, PIPELINE_FILE]
+
+
+def load_preprocessor(dirpath):
+    """
+    Load the feature preprocessor of an artifacts directory.
+
+    Directories written before typed preprocessing, such as the artifacts shipped with the repository, have a label
+    encoder per categorical feature instead; they are converted into a preprocessor with the legacy fill values
+    (see FeaturePreprocessor.from_label_encoders()).
+
+    Args:
+        dirpath (str): The artifacts directory.
+
+    Returns:
+        FeaturePreprocessor: The preprocessor.
+    """
+    preprocessor_path = path.join(dirpath, PREPROCESSOR_FILE)
+    if not path.exists(preprocessor_path):
+        return FeaturePreprocessor.from_label_encoders(
+            {col: load(path.join(dirpath, f'{col}_label_encoder.joblib')) for col in CATEGORICAL_FEATURES})
+    return FeaturePreprocessor.load(preprocessor_path)
+
+
+class ModelBundle:
+    """
+    The model and preprocessing artifacts that serve predictions, loaded together.
+
+    A request takes one reference to the current bundle and uses it from
+    encoding to labelling, so the bundle can be replaced as a whole without a
+    request mixing artifacts from two versions.
+    """
+
+    def __init__(self, model, pipeline, version, load_seconds=None):
+        """
+        Initialize the bundle.
+
+        Args:
+            model (RandomForestClassifier): The sklearn model, or None when only the flat forest is served.
+            pipeline (InferencePipeline): The fused preprocessing, scaling and flat forest.
+            version (str): Identifier of the artifact files the bundle was loaded from.
+            load_seconds (dict, optional): Seconds taken to load each artifact. Default is None.
+        """
+        self.model = model
+        self.pipeline = pipeline
+        self.version = version
+        self.load_seconds = load_seconds or {}
+
+    @property
+    def flat_model(self):
+        return self.pipeline.forest
+
+    @property
+    def preprocessor(self):
+        return self.pipeline.preprocessor
+
+    @classmethod
+    def load(cls, dirpath, mmap=True, flat_only=False, published=False):
+        """
+        Load the artifacts written by model_creation.py from a directory.
+
+        A directory with a manifest is verified against it first, and a published version must have one, so a
+        corrupt or partly copied version is never loaded.
+        The inference pipeline is one file; the pickled sklearn model is loaded next to it for large batches unless
+        flat_only is set. Directories without a pipeline, such as the artifacts shipped with the repository, are
+        assembled from the sklearn model, scaler, status mapping and preprocessor or label encoders (see
+        load_preprocessor()), flattening the model. The version is taken from the directory's manifest when it has
+        one, otherwise from the artifact files' modification times and sizes.
+
+        Args:
+            dirpath (str): The directory holding the inference pipeline and model, or the separate artifacts.
+            mmap (bool, optional): Memory-map the forest arrays read-only so worker processes share their pages. Default is True.
+            flat_only (bool, optional): Skip the pickled sklearn model when the flat forest exists. Default is False.
+            published (bool, optional): Whether dirpath is a published version, which must have a manifest.
+                Default is False (verified only when it has a manifest).
+
+        Returns:
+            ModelBundle: The loaded bundle.
+
+        Raises:
+            ValueError: If a published version has no manifest or a manifest does not match the files, or the
+                pipeline cannot be loaded (see InferencePipeline.load()).
+        """
+        manifest_path = path.join(dirpath, MANIFEST_FILE)
+        if published or path.exists(manifest_path):
+            verify_manifest(dirpath)
+        load_seconds = {}
+
+        def timed(artifact, loader, *args, **kwargs):
+            start = perf_counter()
+            loaded = loader(*args, **kwargs)
+            load_seconds[artifact] = perf_counter() - start
+            return loaded
+
+        model_path = path.join(dirpath, MODEL_FILE)
+        pipeline_path = path.join(dirpath, PIPELINE_FILE)
+        scaler_path = path.join(dirpath, SCALER_FILE)
+        status_mapping_path = path.join(dirpath, STATUS_MAPPING_FILE)
+        mmap_mode = 'r' if mmap else None
+
+        if path.exists(pipeline_path):
+            pipeline = timed('pipeline', InferencePipeline.load, pipeline_path, mmap_mode=mmap_mode)
+            model = None
+            if path.exists(model_path) and not (flat_only and pipeline.forest is not None):
+                model = timed('model', load, model_path)
+            version_files = [pipeline_path, model_path]
+        else:
+            model = timed('model', load, model_path)
+            pipeline = InferencePipeline.from_artifacts(
+                timed('preprocessor', load_preprocessor, dirpath), timed('scaler', load, scaler_path), model,
+                timed('status_mapping', load, status_mapping_path))
+            if flat_only:
+                model = None
+            version_files = [model_path, scaler_path, status_mapping_path, path.join(dirpath, PREPROCESSOR_FILE)]
+        if path.exists(manifest_path):
+            with open(manifest_path, 'r') as f:
+                version = json_load(f)['version']
+        else:
+            version = artifact_version(version_files)
+        return cls(model, pipeline, version, load_seconds)
+
+    def touch(self):
+        """
+        Fault the memory-mapped forest arrays into memory.
+
+        Returns:
+            None
+        """
+        self.pipeline.touch()
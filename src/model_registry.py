@@ -0,0 +1,259 @@
+# model_registry.py
+from argparse import ArgumentParser
+from datetime import datetime, timezone
+from json import load as json_load
+from os import makedirs, path, replace, walk
+from shutil import copy2, copytree, rmtree
+from threading import Event, Thread
+from time import perf_counter, time
+from src.io_utils import file_digest, write_json_atomic
+
+MANIFEST_FILE = 'manifest.json'
+CURRENT_FILE = 'current.json'
+
+
+def directory_files(dirpath):
+    """
+    List the files of a version directory, manifest excluded.
+
+    Args:
+        dirpath (str): The directory.
+
+    Returns:
+        list[str]: Sorted paths relative to the directory, with forward slashes.
+    """
+    files = []
+    for root, _, names in walk(dirpath):
+        for name in names:
+            relative = path.relpath(path.join(root, name), dirpath).replace(path.sep, '/')
+            if relative != MANIFEST_FILE:
+                files.append(relative)
+    return sorted(files)
+
+
+def verify_manifest(version_dir):
+    """
+    Check a version directory against its manifest.
+
+    Args:
+        version_dir (str): The version directory.
+
+    Returns:
+        dict: The manifest.
+
+    Raises:
+        ValueError: If the manifest is missing or a file is missing or does not match its digest.
+    """
+    manifest_path = path.join(version_dir, MANIFEST_FILE)
+    if not path.exists(manifest_path):
+        raise ValueError(f"No {MANIFEST_FILE} in {version_dir}")
+    with open(manifest_path, 'r') as f:
+        manifest = json_load(f)
+    for relative, digest in manifest['files'].items():
+        filepath = path.join(version_dir, relative)
+        if not path.exists(filepath):
+            raise ValueError(f"{relative} is listed in the manifest of {version_dir} but missing")
+        if file_digest(filepath) != digest:
+            raise ValueError(f"{relative} in {version_dir} does not match its manifest digest")
+    return manifest
+
+
+def current_version(models_path):
+    """
+    Read which version is published as current.
+
+    Args:
+        models_path (str): The directory holding the version directories.
+
+    Returns:
+        str: The current version, or None when nothing is published.
+    """
+    current_path = path.join(models_path, CURRENT_FILE)
+    if not path.exists(current_path):
+        return None
+    with open(current_path, 'r') as f:
+        return json_load(f)['version']
+
+
+def set_current(models_path, version):
+    """
+    Point the current version at an existing version directory.
+
+    Args:
+        models_path (str): The directory holding the version directories.
+        version (str): The version to serve.
+
+    Returns:
+        None
+    """
+    verify_manifest(path.join(models_path, version))
+    write_json_atomic(path.join(models_path, CURRENT_FILE),
+                      {'version': version, 'published_at': datetime.now(timezone.utc).isoformat()})
+
+
+def publish_version(source_dir, files, models_path, version=None, metadata=None, make_current=True):
+    """
+    Copy model artifacts into a new version directory with a manifest and publish it.
+
+    The files are copied into a temporary directory that is renamed into place once the manifest is written, so a
+    version directory is either complete or absent. Switching the current version is a single atomic file replace.
+
+    Args:
+        source_dir (str): The directory the artifacts are copied from.
+        files (list[str]): The artifact files and directories, relative to source_dir.
+        models_path (str): The directory holding the version directories.
+        version (str, optional): The version name. Default is None (the current UTC time, e.g. 20240801T120000Z).
+        metadata (dict, optional): Extra information stored in the manifest, e.g. training metrics. Default is None.
+        make_current (bool, optional): Whether to publish the version as current. Default is True.
+
+    Returns:
+        str: The version name.
+    """
+    version = version or datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    version_dir = path.join(models_path, version)
+    if path.exists(version_dir):
+        raise ValueError(f"Version {version} already exists in {models_path}")
+    tmp_dir = path.join(models_path, f'.{version}.tmp')
+    rmtree(tmp_dir, ignore_errors=True)
+    makedirs(tmp_dir)
+    for name in files:
+        source = path.join(source_dir, name)
+        if path.isdir(source):
+            copytree(source, path.join(tmp_dir, name))
+        else:
+            copy2(source, path.join(tmp_dir, name))
+    manifest = {
+        'version': version,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'files': {relative: file_digest(path.join(tmp_dir, relative)) for relative in directory_files(tmp_dir)},
+        'metadata': metadata or {}
+    }
+    write_json_atomic(path.join(tmp_dir, MANIFEST_FILE), manifest)
+    replace(tmp_dir, version_dir)
+    if make_current:
+        set_current(models_path, version)
+    return version
+
+
+class ModelWatcher:
+    """
+    Background thread that loads a newly published model version.
+
+    The watcher polls the current-version pointer. When it names a version
+    other than the one being served, the install callback loads, validates and
+    swaps it in. A version that fails is not retried until the pointer changes
+    again, so a broken publish is reported once and the old version keeps serving.
+    """
+
+    def __init__(self, models_path, install, loaded_version=None, interval=5.0):
+        """
+        Initialize the watcher.
+
+        Args:
+            models_path (str): The directory holding the version directories.
+            install (callable): Called with a version directory; loads, validates and swaps in the bundle, raising
+                on failure.
+            loaded_version (str, optional): The version already being served. Default is None.
+            interval (float, optional): Seconds between polls. Default is 5.0.
+        """
+        self.models_path = models_path
+        self.install = install
+        self.interval = interval
+        self.version = loaded_version
+        self.attempted = loaded_version
+        self.reloads = 0
+        self.failures = 0
+        self.last_error = None
+        self.last_reload_seconds = None
+        self.last_reload_at = None
+        self._stop = Event()
+        self._thread = None
+
+    def check(self):
+        """
+        Poll once and install the current version if it changed.
+
+        Returns:
+            bool: Whether a new version was swapped in.
+        """
+        version = current_version(self.models_path)
+        if version is None or version == self.attempted:
+            return False
+        self.attempted = version
+        start = perf_counter()
+        try:
+            self.install(path.join(self.models_path, version))
+        except Exception as e:
+            self.failures += 1
+            self.last_error = f'{version}: {e}'
+            raise
+        self.version = version
+        self.reloads += 1
+        self.last_error = None
+        self.last_reload_seconds = perf_counter() - start
+        self.last_reload_at = time()
+        return True
+
+    def _run(self, on_error):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                if on_error is not None:
+                    on_error(e)
+
+    def start(self, on_error=None):
+        """
+        Start polling in a daemon thread.
+
+        Args:
+            on_error (callable, optional): Called with the exception when installing a version fails. Default is None.
+
+        Returns:
+            None
+        """
+        if self._thread is None:
+            self._thread = Thread(target=self._run, args=(on_error,), name='model-watcher', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """
+        Stop polling.
+
+        Returns:
+            None
+        """
+        self._stop.set()
+
+    def stats(self):
+        """
+        Summarize the served version and reload history.
+
+        Returns:
+            dict: The version, reload and failure counters, last reload duration and time, and last error.
+        """
+        return {
+            'version': self.version,
+            'reloads': self.reloads,
+            'failures': self.failures,
+            'last_reload_seconds': self.last_reload_seconds,
+            'last_reload_at': self.last_reload_at,
+            'last_error': self.last_error
+        }
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description="Publish model versions or switch the one being served.")
+    parser.add_argument('models_path', help="directory holding the version directories")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    publish_parser = subparsers.add_parser('publish', help="copy artifacts into a new version and serve it")
+    publish_parser.add_argument('source_dir', help="directory the artifacts are copied from")
+    publish_parser.add_argument('files', nargs='+', help="artifact files and directories to copy")
+    publish_parser.add_argument('--version', help="version name; defaults to the current UTC time")
+    current_parser = subparsers.add_parser('set-current', help="serve an existing version, e.g. to roll back")
+    current_parser.add_argument('version', help="the version to serve")
+    args = parser.parse_args()
+    if args.command == 'publish':
+        print(publish_version(args.source_dir, args.files, args.models_path, args.version))
+    else:
+        set_current(args.models_path, args.version)
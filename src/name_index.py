@@ -0,0 +1,149 @@
+# name_index.py
+from bisect import bisect_left
+from heapq import nsmallest
+from re import split as re_split
+from pandas import isna, notna
+
+NAME_FIELDS = ['object_name', 'object_id', 'norad_cat_id', 'Sat_catalog']
+# Match kinds in ranking order: whole key equals the query, key starts with it, a token of an alternate name does
+EXACT, PREFIX, TOKEN = 0, 1, 2
+KEY_END = '\uffff'
+
+
+def normalize_key(value):
+    """
+    Normalize a name or designation for lookup.
+
+    Args:
+        value (Any): The raw catalog value.
+
+    Returns:
+        str: The upper-cased value with surrounding and repeated whitespace removed, or an empty string for missing values.
+    """
+    if value is None or (not isinstance(value, str) and isna(value)):
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return ' '.join(str(value).upper().split())
+
+
+def tokenize(value):
+    """
+    Split a normalized value into alphanumeric tokens.
+
+    Args:
+        value (str): The normalized value.
+
+    Returns:
+        list[str]: The non-empty tokens.
+    """
+    return [t for t in re_split(r'[^0-9A-Z]+', value) if t]
+
+
+class NameIndex:
+    """
+    Lookup index over object names and designations of the merged catalog.
+
+    Primary keys (object_name, object_id and the catalog number) are kept in a
+    sorted list, so a prefix search is two binary searches. Alternate names are
+    split into tokens and kept in an inverted index whose vocabulary is also
+    sorted, so partial tokens match by prefix as well.
+    """
+
+    def __init__(self, catalog_df, max_candidates=500):
+        """
+        Build the index from the merged catalog.
+
+        Args:
+            catalog_df (pd.DataFrame): The merged catalog.
+            max_candidates (int, optional): Maximum number of candidate hits ranked per search. Default is 500.
+        """
+        self.max_candidates = max_candidates
+        fields = [f for f in NAME_FIELDS if f in catalog_df.columns]
+        records = catalog_df.reindex(
+            columns=['object_id', 'object_name'] + [f for f in fields if f not in ('object_id', 'object_name')]
+            + ['alternate_names']).reset_index(drop=True)
+        self.rows = records.astype(object).where(
+            notna(records), None).to_dict(orient='records')
+
+        entries = []
+        for field in fields:
+            for row, value in enumerate(records[field].tolist()):
+                key = normalize_key(value)
+                if key:
+                    entries.append((key, row, field))
+        entries.sort()
+        self.keys = [e[0] for e in entries]
+        self.key_rows = [e[1] for e in entries]
+        self.key_fields = [e[2] for e in entries]
+
+        self.alternate_keys = [normalize_key(value) for value in records['alternate_names'].tolist()]
+        postings = {}
+        for row, key in enumerate(self.alternate_keys):
+            for token in set(tokenize(key)):
+                postings.setdefault(token, []).append(row)
+        self.tokens = sorted(postings)
+        self.postings = [postings[t] for t in self.tokens]
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _key_range(self, sorted_keys, prefix):
+        lo = bisect_left(sorted_keys, prefix)
+        return lo, bisect_left(sorted_keys, prefix + KEY_END, lo)
+
+    def _token_rows(self, token, exact=False):
+        if exact:
+            i = bisect_left(self.tokens, token)
+            found = i < len(self.tokens) and self.tokens[i] == token
+            return set(self.postings[i]) if found else set()
+        lo, hi = self._key_range(self.tokens, token)
+        rows = set()
+        for postings in self.postings[lo:min(hi, lo + self.max_candidates)]:
+            rows.update(postings)
+        return rows
+
+    def search(self, query, limit=10):
+        """
+        Search names and designations by prefix and alternate names by token.
+
+        Args:
+            query (str): The partial name, designation or catalog number.
+            limit (int, optional): Maximum number of hits to return. Default is 10.
+
+        Returns:
+            list[dict]: The ranked hits, exact matches first, then primary-key prefix matches, then alternate-name token matches.
+        """
+        prefix = normalize_key(query)
+        if not prefix:
+            return []
+
+        best = {}
+        lo, hi = self._key_range(self.keys, prefix)
+        # Rank the whole prefix range before keeping max_candidates of it; the sorted keys put long keys that share
+        # a prefix ahead of shorter ones, e.g. 2019-029AA before 2019-029B
+        candidates = nsmallest(self.max_candidates, (
+            ((EXACT if self.keys[i] == prefix else PREFIX, 0, len(self.keys[i]), self.keys[i]), i)
+            for i in range(lo, hi)))
+        for rank, i in candidates:
+            row = self.key_rows[i]
+            if row not in best or rank < best[row][0]:
+                best[row] = (rank, self.key_fields[i], self.keys[i])
+
+        query_tokens = tokenize(prefix)
+        if query_tokens:
+            rows = self._token_rows(query_tokens[0])
+            for token in query_tokens[1:]:
+                rows &= self._token_rows(token)
+            exact_rows = self._token_rows(query_tokens[-1], exact=True)
+            # Rank every token match before keeping max_candidates of them, so which ones survive does not depend
+            # on the order the row set iterates in
+            candidates = nsmallest(self.max_candidates, (
+                ((TOKEN, 0 if row in exact_rows else 1, len(self.alternate_keys[row]), self.alternate_keys[row]), row)
+                for row in rows if row not in best))
+            for rank, row in candidates:
+                best[row] = (rank, 'alternate_names', self.alternate_keys[row])
+
+        ranked = sorted(best.items(), key=lambda item: item[1][0])[:limit]
+        return [dict(self.rows[row], matched_field=field, matched_key=key)
+                for row, (_, field, key) in ranked]
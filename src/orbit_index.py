@@ -0,0 +1,96 @@
+# orbit_index.py
+from numpy import argsort, searchsorted, flatnonzero, column_stack, asarray
+from pandas import to_numeric
+from sklearn.neighbors import KDTree
+
+ORBIT_COLUMNS = ['perigee_km', 'apogee_km', 'inclination', 'period_mins']
+RESULT_COLUMNS = ['object_id', 'object_name'] + ORBIT_COLUMNS
+# Kilometers of perigee or apogee difference that count as much as one degree of inclination in nearest-orbit
+# distances. Scaling by the catalog-wide spread instead lets the GEO and HEO objects stretch the altitude axes so
+# far that two LEO orbits hundreds of kilometers apart look closer than ones a few degrees apart.
+KM_PER_DEGREE = 10.0
+
+
+class OrbitIndex:
+    """
+    In-memory index over the orbital elements of the merged catalog.
+
+    Rows are sorted by inclination so that an inclination window is a contiguous
+    slice found with a binary search, and the perigee-apogee band test only runs
+    on that slice. A KDTree over (perigee, apogee, inclination), with the
+    inclination converted to kilometers, answers k-nearest-orbit lookups.
+    """
+
+    def __init__(self, catalog_df, km_per_degree=KM_PER_DEGREE):
+        """
+        Build the index from the merged catalog.
+
+        Args:
+            catalog_df (pd.DataFrame): The merged catalog containing 'perigee_km', 'apogee_km' and 'inclination' columns.
+            km_per_degree (float, optional): Kilometers of altitude difference weighed like one degree of
+                inclination. Default is KM_PER_DEGREE.
+        """
+        df = catalog_df.reindex(columns=RESULT_COLUMNS).copy()
+        for col in ORBIT_COLUMNS:
+            df[col] = to_numeric(df[col], errors='coerce')
+        df = df.dropna(subset=['perigee_km', 'apogee_km', 'inclination'])
+
+        order = argsort(df['inclination'].to_numpy(), kind='stable')
+        self.records = df.iloc[order].reset_index(drop=True)
+        self.perigee = self.records['perigee_km'].to_numpy(dtype='float64')
+        self.apogee = self.records['apogee_km'].to_numpy(dtype='float64')
+        self.inclination = self.records['inclination'].to_numpy(dtype='float64')
+
+        self.weights = asarray([1.0, 1.0, km_per_degree])
+        points = column_stack([self.perigee, self.apogee, self.inclination])
+        self.tree = KDTree(points * self.weights) if len(points) else None
+
+    def __len__(self):
+        return len(self.records)
+
+    def band_query(self, altitude_min, altitude_max, inclination_min=None, inclination_max=None, limit=None):
+        """
+        Find objects whose perigee-apogee band crosses an altitude range, optionally within an inclination window.
+
+        Args:
+            altitude_min (float): Lower bound of the altitude range in kilometers.
+            altitude_max (float): Upper bound of the altitude range in kilometers.
+            inclination_min (float, optional): Lower bound of the inclination window in degrees. Default is None.
+            inclination_max (float, optional): Upper bound of the inclination window in degrees. Default is None.
+            limit (int, optional): Maximum number of rows to return. Default is None.
+
+        Returns:
+            pd.DataFrame: The matching catalog rows, ordered by inclination.
+        """
+        lo = 0 if inclination_min is None else searchsorted(
+            self.inclination, inclination_min, side='left')
+        hi = len(self) if inclination_max is None else searchsorted(
+            self.inclination, inclination_max, side='right')
+        mask = (self.perigee[lo:hi] <= altitude_max) & (
+            self.apogee[lo:hi] >= altitude_min)
+        rows = flatnonzero(mask) + lo
+        if limit is not None:
+            rows = rows[:limit]
+        return self.records.iloc[rows]
+
+    def nearest(self, perigee_km, apogee_km, inclination, k=10):
+        """
+        Find the k catalog objects with the closest orbits.
+
+        Args:
+            perigee_km (float): Perigee of the reference orbit in kilometers.
+            apogee_km (float): Apogee of the reference orbit in kilometers.
+            inclination (float): Inclination of the reference orbit in degrees.
+            k (int, optional): Number of neighbors to return. Default is 10.
+
+        Returns:
+            pd.DataFrame: The nearest catalog rows with an added 'distance' column in kilometers, inclination
+                differences counted at km_per_degree.
+        """
+        if self.tree is None:
+            return self.records.assign(distance=[])
+        k = min(k, len(self))
+        query = asarray([[perigee_km, apogee_km, inclination]]) * self.weights
+        distances, rows = self.tree.query(query, k=k)
+        return self.records.iloc[rows[0]].assign(distance=distances[0])
+
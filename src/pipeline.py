@@ -0,0 +1,205 @@
+# pipeline.py
+from argparse import ArgumentParser
+from os import path
+from joblib import dump, load
+from numpy import asarray, float32
+from src.flat_forest import ARRAY_NAMES, FlatForest
+from src.io_utils import write_atomic
+from src.preprocessing import FeaturePreprocessor
+
+PIPELINE_FILE = 'inference_pipeline.joblib'
+PIPELINE_FORMAT = 1
+
+
+class InferencePipeline:
+    """
+    Imputation, encoding, scaling and the flattened forest fused into one artifact.
+
+    Every step works on one contiguous float32 matrix: the preprocessor fills
+    it from the raw feature values, scaling runs in place on it with the
+    fitted means and standard deviations, and the flat forest scores it. The
+    class labels are stored aligned with the forest's class order, so turning
+    probabilities into statuses is one take(). Saved with joblib as one file,
+    its arrays can be memory-mapped read-only at load time.
+    """
+
+    def __init__(self, preprocessor, mean, scale, forest, labels):
+        """
+        Initialize the pipeline.
+
+        Args:
+            preprocessor (FeaturePreprocessor): The fitted feature imputation and encoding.
+            mean (numpy.ndarray): The fitted scaler's mean_.
+            scale (numpy.ndarray): The fitted scaler's scale_.
+            forest (FlatForest): The flattened forest, or None when only an sklearn model exists.
+            labels (numpy.ndarray): The status label of each class, in the forest's class order.
+        """
+        self.preprocessor = preprocessor
+        # StandardScaler.transform casts its statistics to the dtype of the data, float32 here
+        self.mean = asarray(mean, dtype=float32)
+        self.scale = asarray(scale, dtype=float32)
+        self.forest = forest
+        self.labels = asarray(labels)
+
+    @classmethod
+    def from_artifacts(cls, preprocessor, scaler, forest, status_mapping):
+        """
+        Build a pipeline from the separately fitted training artifacts.
+
+        Args:
+            preprocessor (FeaturePreprocessor): The fitted feature imputation and encoding.
+            scaler (StandardScaler): The fitted scaler.
+            forest (FlatForest or RandomForestClassifier): The forest; an sklearn model is flattened.
+            status_mapping (dict): Status labels mapped to the class codes the forest predicts.
+
+        Returns:
+            InferencePipeline: The pipeline.
+
+        Raises:
+            ValueError: If the forest predicts classes missing from the status mapping.
+        """
+        if forest is not None and not isinstance(forest, FlatForest):
+            forest = FlatForest.from_model(forest)
+        status_mapping_inv = {v: k for k, v in status_mapping.items()}
+        classes = forest.classes_.tolist() if forest is not None else sorted(status_mapping_inv)
+        unknown = set(classes) - set(status_mapping_inv)
+        if unknown:
+            raise ValueError(f"The model predicts classes {sorted(unknown)} missing from the status mapping")
+        return cls(preprocessor, scaler.mean_, scaler.scale_, forest, [status_mapping_inv[c] for c in classes])
+
+    @property
+    def features(self):
+        return self.preprocessor.features
+
+    def scale_in_place(self, X):
+        """
+        Standardize a float32 matrix in place, rounding like StandardScaler.transform on float32 input.
+
+        Args:
+            X (numpy.ndarray): Imputed and encoded float32 matrix, columns in features order.
+
+        Returns:
+            numpy.ndarray: X, scaled.
+        """
+        X -= self.mean
+        X /= self.scale
+        return X
+
+    def transform_items(self, items):
+        """
+        Impute, encode and scale validated request objects.
+
+        Args:
+            items (list): Objects with one attribute per feature, such as pydantic request models.
+
+        Returns:
+            numpy.ndarray: The scaled float32 matrix.
+        """
+        return self.scale_in_place(self.preprocessor.transform_items(items))
+
+    def predict_proba(self, X, forest=None):
+        """
+        Score a scaled matrix.
+
+        Args:
+            X (numpy.ndarray): The scaled float32 matrix.
+            forest (object, optional): A forest with the same classes to score with instead, such as the sklearn
+                model for large batches. Default is None (the flat forest).
+
+        Returns:
+            numpy.ndarray: Class probabilities, columns in the order of labels.
+        """
+        return (self.forest if forest is None else forest).predict_proba(X)
+
+    def predict_items(self, items, forest=None):
+        """
+        Predict the status of validated request objects in one vectorized pass.
+
+        Args:
+            items (list): Objects with one attribute per feature, such as pydantic request models.
+            forest (object, optional): A forest with the same classes to score with instead. Default is None.
+
+        Returns:
+            tuple: The predicted status labels and the probability of each prediction.
+        """
+        proba = self.predict_proba(self.transform_items(items), forest)
+        best = proba.argmax(axis=1)
+        return self.labels.take(best).tolist(), proba[range(len(best)), best]
+
+    def touch(self):
+        """
+        Fault the memory-mapped forest arrays into memory.
+
+        Returns:
+            None
+        """
+        if self.forest is not None:
+            self.forest.touch()
+
+    def save(self, filepath):
+        """
+        Save the pipeline as one joblib file of plain arrays and dictionaries.
+
+        The file is written next to filepath and renamed into place, so API workers that memory-mapped the previous
+        pipeline keep serving it until they load the new one.
+
+        Args:
+            filepath (str): The destination path.
+
+        Returns:
+            None
+        """
+        forest = None
+        if self.forest is not None:
+            forest = {name: getattr(self.forest, 'classes_' if name == 'classes' else name) for name in ARRAY_NAMES}
+            forest['max_depth'] = int(self.forest.max_depth)
+        state = {
+            'format': PIPELINE_FORMAT,
+            'preprocessor': self.preprocessor.to_dict(),
+            'mean': self.mean,
+            'scale': self.scale,
+            'labels': self.labels.astype(str),
+            'forest': forest
+        }
+        write_atomic(filepath, lambda tmp_path: dump(state, tmp_path))
+
+    @classmethod
+    def load(cls, filepath, mmap_mode=None):
+        """
+        Load a pipeline saved with save().
+
+        Args:
+            filepath (str): The saved pipeline.
+            mmap_mode (str, optional): Memory-map mode passed to joblib.load, e.g. 'r', so worker processes share
+                the forest's pages. Default is None (read into memory).
+
+        Returns:
+            InferencePipeline: The loaded pipeline.
+
+        Raises:
+            ValueError: If the file was written in another format, or its forest lacks an array, as forests saved
+                before missing values were routed do.
+        """
+        state = load(filepath, mmap_mode=mmap_mode)
+        if state.get('format') != PIPELINE_FORMAT:
+            raise ValueError(f"{filepath} has pipeline format {state.get('format')}, expected {PIPELINE_FORMAT}")
+        missing = [name for name in ARRAY_NAMES if state['forest'] is not None and name not in state['forest']]
+        if missing:
+            raise ValueError(f"The forest in {filepath} has no {', '.join(missing)}; fuse the pipeline again with "
+                             f"src/pipeline.py")
+        forest = FlatForest(**state['forest']) if state['forest'] is not None else None
+        return cls(FeaturePreprocessor.from_dict(state['preprocessor']), state['mean'], state['scale'], forest,
+                   state['labels'])
+
+
+if __name__ == '__main__':
+    from src.model_bundle import MODEL_FILE, SCALER_FILE, STATUS_MAPPING_FILE, load_preprocessor
+
+    parser = ArgumentParser(description="Fuse the preprocessor, scaler, model and status mapping into one pipeline.")
+    parser.add_argument('artifacts_path', help="directory holding the separately saved artifacts")
+    parser.add_argument('--output', help="pipeline path; defaults to the artifacts directory")
+    args = parser.parse_args()
+    InferencePipeline.from_artifacts(
+        load_preprocessor(args.artifacts_path), load(path.join(args.artifacts_path, SCALER_FILE)),
+        load(path.join(args.artifacts_path, MODEL_FILE)), load(path.join(args.artifacts_path, STATUS_MAPPING_FILE))
+    ).save(args.output or path.join(args.artifacts_path, PIPELINE_FILE))
@@ -0,0 +1,160 @@
+# prediction_cache.py
+from collections import OrderedDict
+from os import path
+from threading import Lock
+from time import monotonic
+
+MISSING = object()
+
+
+def artifact_version(filepaths):
+    """
+    Identify a set of model artifacts by their modification times and sizes.
+
+    Args:
+        filepaths (list[str]): The artifact paths; missing files are skipped.
+
+    Returns:
+        str: A version string that changes whenever any of the files is replaced.
+    """
+    parts = []
+    for filepath in filepaths:
+        if path.exists(filepath):
+            parts.append(f'{path.basename(filepath)}:{path.getmtime(filepath):.6f}:{path.getsize(filepath)}')
+    return '|'.join(parts)
+
+
+class PredictionCache:
+    """
+    Thread-safe LRU cache of predictions keyed on canonicalized feature tuples.
+
+    Numeric features can be rounded to a fixed number of decimals so near-identical
+    requests share an entry. Entries can expire after a TTL, and the whole cache
+    is dropped when the model version it was filled under changes.
+    """
+
+    def __init__(self, numeric_features, categorical_features, max_size=10000, ttl_seconds=None, decimals=None,
+                 version=None):
+        """
+        Initialize the cache.
+
+        Args:
+            numeric_features (list[str]): Numeric feature names, in key order.
+            categorical_features (list[str]): Categorical feature names, in key order.
+            max_size (int, optional): Largest number of entries kept before the least recently used is evicted. Default is 10000.
+            ttl_seconds (float, optional): Age in seconds after which an entry expires. Default is None (never).
+            decimals (int, optional): Decimals numeric features are rounded to in the key. Default is None (exact values).
+            version (str, optional): Version of the model the cached predictions come from. Default is None.
+        """
+        self.numeric_features = numeric_features
+        self.categorical_features = categorical_features
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.decimals = decimals
+        self.version = version
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def key(self, item):
+        """
+        Build the canonical cache key of a prediction request.
+
+        Args:
+            item (PredictionRequest): The request.
+
+        Returns:
+            tuple: Rounded numeric features followed by categorical features.
+        """
+        numeric = [float(getattr(item, col)) for col in self.numeric_features]
+        if self.decimals is not None:
+            numeric = [round(v, self.decimals) for v in numeric]
+        # Adding 0.0 folds -0.0 into 0.0
+        return tuple(v + 0.0 for v in numeric) + tuple(getattr(item, col) for col in self.categorical_features)
+
+    def validate(self, version):
+        """
+        Drop every entry if the model version changed.
+
+        Args:
+            version (str): The version of the model now serving predictions.
+
+        Returns:
+            None
+        """
+        if version != self.version:
+            with self._lock:
+                self._entries.clear()
+                self.version = version
+                self.invalidations += 1
+
+    def get(self, key):
+        """
+        Look up a prediction.
+
+        Args:
+            key (tuple): The cache key.
+
+        Returns:
+            Any: The cached prediction, or MISSING.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISSING
+            value, stored = entry
+            if self.ttl_seconds is not None and monotonic() - stored > self.ttl_seconds:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """
+        Store a prediction, evicting the least recently used entry when full.
+
+        Args:
+            key (tuple): The cache key.
+            value (Any): The prediction.
+
+        Returns:
+            None
+        """
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        """
+        Summarize cache usage.
+
+        Returns:
+            dict: Configuration, size and counters of the cache.
+        """
+        lookups = self.hits + self.misses
+        return {
+            'max_size': self.max_size,
+            'ttl_seconds': self.ttl_seconds,
+            'decimals': self.decimals,
+            'version': self.version,
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations
+        }
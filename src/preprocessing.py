@@ -0,0 +1,204 @@
+# preprocessing.py
+from joblib import dump, load
+from numpy import asarray, empty, isnan, nan
+from pandas import to_numeric
+from src.encoders import CategoricalEncoder
+
+NUMERIC_FEATURES = ['total_mass', 'span', 'period_mins', 'perigee_km', 'apogee_km', 'inclination']
+CATEGORICAL_FEATURES = ['object_type']
+PREPROCESSOR_FILE = 'preprocessor.joblib'
+# Fill values of artifacts saved before typed preprocessing, which only kept label encoders. Requests always carry
+# every numeric feature, so those stay without a fill value; a missing object type is imputed with the most common
+# one in the catalog, debris
+LEGACY_MODES = {'object_type': 'DEB'}
+
+
+class FeaturePreprocessor:
+    """
+    Typed imputation and encoding of the model features.
+
+    Numeric features are imputed with their training median and kept as float32
+    values; only categorical features are imputed with their most frequent value
+    and encoded. The output matrix has the numeric features first and the
+    categorical features after them, which is the column order the scaler and
+    model are fit on. Saved as plain lists, the artifact is a few hundred bytes
+    and does not depend on the scikit-learn version it was fit with.
+    """
+
+    def __init__(self, numeric_features=None, categorical_features=None, medians=None, modes=None, encoders=None):
+        """
+        Initialize the preprocessor.
+
+        Args:
+            numeric_features (list[str], optional): Numeric feature names. Default is None (NUMERIC_FEATURES).
+            categorical_features (list[str], optional): Categorical feature names. Default is None
+                (CATEGORICAL_FEATURES).
+            medians (dict, optional): Fill value of each numeric feature. Default is None (missing values stay NaN).
+            modes (dict, optional): Fill value of each categorical feature. Default is None (missing values are
+                encoded as unknown).
+            encoders (dict, optional): CategoricalEncoder of each categorical feature. Default is None (not fitted).
+        """
+        self.numeric_features = list(numeric_features or NUMERIC_FEATURES)
+        self.categorical_features = list(categorical_features or CATEGORICAL_FEATURES)
+        self.features = self.numeric_features + self.categorical_features
+        self.medians = medians or {}
+        self.modes = modes or {}
+        self.encoders = encoders or {}
+        self._fill = asarray([self.medians.get(col, nan) for col in self.numeric_features], dtype='float32')
+
+    @classmethod
+    def from_label_encoders(cls, label_encoders, modes=None, numeric_features=None):
+        """
+        Convert the label encoders of artifacts saved before typed preprocessing into a preprocessor.
+
+        The categorical codes are the label encoders' own; numeric features are passed through as they are.
+
+        Args:
+            label_encoders (dict): Fitted LabelEncoder of each categorical feature.
+            modes (dict, optional): Fill value of each categorical feature. Default is None (LEGACY_MODES).
+            numeric_features (list[str], optional): Numeric feature names. Default is None (NUMERIC_FEATURES).
+
+        Returns:
+            FeaturePreprocessor: The equivalent preprocessor.
+        """
+        encoders = {col: CategoricalEncoder(le.classes_) for col, le in label_encoders.items()}
+        modes = LEGACY_MODES if modes is None else modes
+        return cls(numeric_features, list(label_encoders), modes={col: modes[col] for col in label_encoders
+                                                                  if col in modes}, encoders=encoders)
+
+    def fit(self, data):
+        """
+        Learn the fill values and categories from training data.
+
+        Args:
+            data (DataFrame): The training data with every feature column.
+
+        Returns:
+            FeaturePreprocessor: The fitted preprocessor.
+        """
+        self.medians = {col: float(to_numeric(data[col], errors='coerce').astype('float32').median())
+                        for col in self.numeric_features}
+        self.modes, self.encoders = {}, {}
+        for col in self.categorical_features:
+            values = data[col].dropna().astype(str)
+            self.modes[col] = values.mode()[0]
+            # Sorted like LabelEncoder.classes_, so codes match the ones earlier models were trained on
+            self.encoders[col] = CategoricalEncoder(sorted(values.unique()))
+        self._fill = asarray([self.medians[col] for col in self.numeric_features], dtype='float32')
+        return self
+
+    def _impute(self, X):
+        missing = isnan(X)
+        if missing.any():
+            X[missing] = self._fill[missing.nonzero()[1]]
+        return X
+
+    def _encode(self, col, values):
+        mode = self.modes.get(col)
+        if mode is not None:
+            values = [mode if v is None or v != v else v for v in values]
+        return self.encoders[col].encode_array(values)
+
+    def transform(self, data):
+        """
+        Impute and encode a DataFrame.
+
+        Args:
+            data (DataFrame): The data with every feature column.
+
+        Returns:
+            numpy.ndarray: float32 matrix of shape (len(data), len(features)), columns in features order.
+        """
+        X = empty((len(data), len(self.features)), dtype='float32')
+        n_numeric = len(self.numeric_features)
+        X[:, :n_numeric] = data[self.numeric_features].apply(to_numeric, errors='coerce').to_numpy('float32')
+        self._impute(X[:, :n_numeric])
+        for j, col in enumerate(self.categorical_features, n_numeric):
+            X[:, j] = self._encode(col, data[col].tolist())
+        return X
+
+    def fit_transform(self, data):
+        """
+        Fit the preprocessor and transform the training data.
+
+        Args:
+            data (DataFrame): The training data with every feature column.
+
+        Returns:
+            numpy.ndarray: The preprocessed float32 matrix.
+        """
+        return self.fit(data).transform(data)
+
+    def transform_items(self, items):
+        """
+        Impute and encode validated request objects without building a DataFrame.
+
+        Args:
+            items (list): Objects with one attribute per feature, such as pydantic request models.
+
+        Returns:
+            numpy.ndarray: float32 matrix of shape (len(items), len(features)), columns in features order.
+        """
+        X = empty((len(items), len(self.features)), dtype='float32')
+        n_numeric = len(self.numeric_features)
+        X[:, :n_numeric] = asarray(
+            [[getattr(item, col) for col in self.numeric_features] for item in items], dtype='float32')
+        self._impute(X[:, :n_numeric])
+        for j, col in enumerate(self.categorical_features, n_numeric):
+            X[:, j] = self._encode(col, [getattr(item, col) for item in items])
+        return X
+
+    def to_dict(self):
+        """
+        Describe the fitted preprocessor with plain lists and dictionaries.
+
+        Returns:
+            dict: The feature names, fill values and categories.
+        """
+        return {
+            'numeric_features': self.numeric_features,
+            'categorical_features': self.categorical_features,
+            'medians': self.medians,
+            'modes': self.modes,
+            'classes': {col: list(encoder.classes) for col, encoder in self.encoders.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        """
+        Rebuild a preprocessor from to_dict() output.
+
+        Args:
+            state (dict): The preprocessor description.
+
+        Returns:
+            FeaturePreprocessor: The preprocessor.
+        """
+        encoders = {col: CategoricalEncoder(classes) for col, classes in state['classes'].items()}
+        return cls(state['numeric_features'], state['categorical_features'], state['medians'], state['modes'],
+                   encoders)
+
+    def save(self, filepath):
+        """
+        Save the preprocessor as plain lists and dictionaries.
+
+        Args:
+            filepath (str): The destination path.
+
+        Returns:
+            None
+        """
+        dump(self.to_dict(), filepath)
+
+    @classmethod
+    def load(cls, filepath):
+        """
+        Load a preprocessor saved with save().
+
+        Args:
+            filepath (str): The saved preprocessor.
+
+        Returns:
+            FeaturePreprocessor: The loaded preprocessor.
+        """
+        return cls.from_dict(load(filepath))
@@ -0,0 +1,169 @@
+# profiling.py
+from cProfile import Profile
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from os import cpu_count, makedirs, path
+from platform import python_version
+from sys import platform
+from time import perf_counter, process_time
+from tracemalloc import get_traced_memory, is_tracing, reset_peak, start as start_tracing, stop as stop_tracing
+from numpy import __version__ as numpy_version
+from sklearn import __version__ as sklearn_version
+from src.io_utils import write_json_atomic
+
+try:
+    from resource import RUSAGE_SELF, getrusage
+except ImportError:  # Windows
+    getrusage = None
+
+REPORT_FILE = 'training_report.json'
+
+
+def max_rss_mb():
+    """
+    Read the peak resident memory of the current process.
+
+    Returns:
+        float: Peak RSS in MB so far, or NaN where the resource module is unavailable.
+    """
+    if getrusage is None:
+        return float('nan')
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return getrusage(RUSAGE_SELF).ru_maxrss / (1024 ** 2 if platform == 'darwin' else 1024)
+
+
+def cv_fit_times(search):
+    """
+    Summarize the cross-validation fits of a fitted search.
+
+    Args:
+        search (BaseSearchCV): The fitted GridSearchCV or halving search.
+
+    Returns:
+        list[dict]: Per candidate and halving iteration: the parameters, training rows or trees it was fit with,
+            mean and standard deviation of the fold fit and score seconds, and mean test macro F1.
+    """
+    results = search.cv_results_
+    score_key = 'mean_test_f1_macro' if 'mean_test_f1_macro' in results else 'mean_test_score'
+    fits = []
+    for i, params in enumerate(results['params']):
+        fit = {'params': params,
+               'mean_fit_seconds': float(results['mean_fit_time'][i]),
+               'std_fit_seconds': float(results['std_fit_time'][i]),
+               'mean_score_seconds': float(results['mean_score_time'][i]),
+               'mean_test_f1_macro': float(results[score_key][i])}
+        if 'n_resources' in results:
+            fit.update(iteration=int(results['iter'][i]), n_resources=int(results['n_resources'][i]))
+        fits.append(fit)
+    return fits
+
+
+class StageProfiler:
+    """
+    Wall time, CPU time and memory of the stages of a training run.
+
+    Each stage records its wall-clock and process CPU seconds and the
+    process's peak RSS when it ended; with trace_memory, also the peak of
+    Python and numpy allocations traced by tracemalloc above what was
+    allocated when it started.
+    Stages run one after the other; they do not nest. Work done in joblib
+    worker processes shows up in wall time only, so per-fit numbers of a
+    search come from its cv_results_ instead (see cv_fit_times()). With a
+    profile directory, every stage is also run under cProfile and its
+    statistics are dumped to <stage>.prof for snakeviz or pstats.
+    """
+
+    def __init__(self, trace_memory=False, profile_dir=None):
+        """
+        Initialize the profiler.
+
+        Args:
+            trace_memory (bool, optional): Whether to trace allocations with tracemalloc, which slows
+                allocation-heavy Python code down. Default is False.
+            profile_dir (str, optional): Directory for per-stage cProfile dumps. Default is None (no cProfile).
+        """
+        self.trace_memory = trace_memory
+        self.profile_dir = profile_dir
+        self.stages = []
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self._start = perf_counter()
+        if profile_dir is not None:
+            makedirs(profile_dir, exist_ok=True)
+
+    @contextmanager
+    def stage(self, name, **info):
+        """
+        Profile the block run inside the context.
+
+        Args:
+            name (str): The stage name.
+            **info: Extra values recorded with the stage, e.g. row counts.
+
+        Yields:
+            dict: The stage record, to which the block may add values.
+        """
+        record = {'name': name, **info}
+        if self.trace_memory:
+            if not is_tracing():
+                start_tracing()
+            reset_peak()
+            baseline = get_traced_memory()[0]
+        profiler = Profile() if self.profile_dir is not None else None
+        wall, cpu = perf_counter(), process_time()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield record
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                profiler.dump_stats(path.join(self.profile_dir, f'{name}.prof'))
+            record['wall_seconds'] = perf_counter() - wall
+            record['cpu_seconds'] = process_time() - cpu
+            if self.trace_memory:
+                record['peak_traced_mb'] = (get_traced_memory()[1] - baseline) / 1024 ** 2
+            record['max_rss_mb'] = max_rss_mb()
+            self.stages.append(record)
+
+    def summary(self):
+        """
+        Summarize the stage times, e.g. for a version manifest.
+
+        Returns:
+            dict: Wall seconds of each stage by name.
+        """
+        return {record['name']: record['wall_seconds'] for record in self.stages}
+
+    def report(self, **info):
+        """
+        Build the run report.
+
+        Args:
+            **info: Extra run information, e.g. the published version and search details.
+
+        Returns:
+            dict: Start time, total wall seconds, the environment, every stage record and info.
+        """
+        return {
+            'started_at': self.started_at,
+            'total_wall_seconds': perf_counter() - self._start,
+            'environment': {'python': python_version(), 'numpy': numpy_version, 'scikit-learn': sklearn_version,
+                            'platform': platform, 'cpu_count': cpu_count()},
+            'stages': self.stages,
+            **info
+        }
+
+    def write_report(self, filepath, **info):
+        """
+        Write the run report as JSON.
+
+        Args:
+            filepath (str): The destination path.
+            **info: Extra run information, see report().
+
+        Returns:
+            None
+        """
+        write_json_atomic(filepath, self.report(**info))
+        if self.trace_memory and is_tracing():
+            stop_tracing()
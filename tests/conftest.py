@@ -0,0 +1,8 @@
+# conftest.py
+from os import path
+import sys
+
+# Tests import the repo's modules the way the scripts do, from the repository root
+ROOT = path.dirname(path.dirname(path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
@@ -0,0 +1,71 @@
+# test_api_metrics.py
+from types import SimpleNamespace
+from fastapi.testclient import TestClient
+from numpy import ones, zeros
+from numpy.random import default_rng
+from pandas import DataFrame
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+import api
+from src.model_bundle import ModelBundle
+from src.pipeline import InferencePipeline
+from src.preprocessing import CATEGORICAL_FEATURES, NUMERIC_FEATURES, FeaturePreprocessor
+
+VALID = {'total_mass': 500.0, 'span': 2.0, 'period_mins': 95.0, 'perigee_km': 500.0, 'apogee_km': 520.0,
+         'inclination': 53.0, 'object_type': 'PAY'}
+
+
+def validation_counts(client):
+    counts = {}
+    for line in client.get('/metrics').text.splitlines():
+        if line.startswith('prediction_stage_seconds_count{stage="validate'):
+            counts[line.split('"')[1]] = int(float(line.split()[-1]))
+    return counts
+
+
+def sample_counts():
+    return {line.rsplit(' ', 1)[0]: line.rsplit(' ', 1)[1] for line in api.metrics.render().splitlines()
+            if line.startswith(('prediction_stage_seconds_count', 'prediction_batch_rows_count'))}
+
+
+def make_bundle():
+    rng = default_rng(0)
+    data = DataFrame(rng.uniform(1, 1000, size=(300, len(NUMERIC_FEATURES))), columns=NUMERIC_FEATURES)
+    data['object_type'] = rng.choice(['PAY', 'DEB', 'R/B'], size=len(data))
+    preprocessor = FeaturePreprocessor(NUMERIC_FEATURES, CATEGORICAL_FEATURES)
+    X = preprocessor.fit_transform(data)
+    scaler = StandardScaler().fit(X)
+    model = RandomForestClassifier(n_estimators=5, random_state=0).fit(scaler.transform(X),
+                                                                      rng.integers(0, 3, size=len(data)))
+    return ModelBundle(model, InferencePipeline.from_artifacts(preprocessor, scaler, model, {'O': 0, 'D': 1, 'R': 2}),
+                       'v1')
+
+
+def test_warm_up_records_no_samples():
+    model_bundle = make_bundle()
+    items = api.probe_items(model_bundle)
+    api.score_items(items[:2], 'micro_batch', model_bundle)
+    before = sample_counts()
+
+    api.warm_up(model_bundle, items)
+
+    assert sample_counts() == before
+    api.score_items(items[:2], 'micro_batch', model_bundle)
+    assert sample_counts() != before
+
+
+def test_validate_times_single_requests_only(monkeypatch):
+    monkeypatch.setattr(api, 'bundle', None)
+    client = TestClient(api.app)
+    before = validation_counts(client)
+
+    client.post('/predict', json=VALID)
+    client.post('/predict/batch', json={'items': [VALID] * 3})
+    probe_bundle = SimpleNamespace(pipeline=SimpleNamespace(mean=zeros(7), scale=ones(7)),
+                                   preprocessor=SimpleNamespace(encoders={'object_type': SimpleNamespace(
+                                       classes=['DEB', 'PAY'])}))
+    assert len(api.probe_items(probe_bundle)) == api.FLAT_FOREST_MAX_ROWS + 1
+
+    after = validation_counts(client)
+    assert after['validate'] - before.get('validate', 0) == 1
+    assert after['validate_batch'] - before.get('validate_batch', 0) == 1
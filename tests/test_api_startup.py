@@ -0,0 +1,42 @@
+# test_api_startup.py
+from types import SimpleNamespace
+from fastapi.testclient import TestClient
+from pytest import fixture
+import api
+
+
+@fixture
+def fresh_startup(monkeypatch, tmp_path):
+    for name in ['bundle', 'catalog', 'orbit_index', 'name_index', 'watcher']:
+        monkeypatch.setattr(api, name, None)
+    monkeypatch.setattr(api, 'startup', {'state': 'loading', 'error': None, 'seconds_to_ready': None,
+                                         'seconds_to_first_fast_request': None, 'indexes': 'loading',
+                                         'indexes_error': None})
+    monkeypatch.setattr(api, 'MODELS_PATH', str(tmp_path / 'models'))
+    monkeypatch.setattr(api, 'MODEL_WATCH_INTERVAL_SECONDS', 0)
+    monkeypatch.setattr(api, 'CATALOG_PATH', str(tmp_path / 'missing_catalog.joblib'))
+    monkeypatch.setattr(api, 'prepare_bundle', lambda dirpath, published=False: SimpleNamespace(version='v1'))
+
+
+def test_a_missing_catalog_only_takes_the_catalog_endpoints_down(fresh_startup):
+    api.start_up()
+    assert api.bundle.version == 'v1'
+    assert api.startup['state'] == 'ready'
+    assert api.startup['indexes'] == 'failed'
+
+    client = TestClient(api.app)
+    ready = client.get('/ready')
+    assert ready.status_code == 200
+    assert ready.json()['indexes'] == 'failed'
+    for url in ['/orbits/nearest?perigee_km=500&apogee_km=520&inclination=53',
+                '/orbits/band?altitude_min=400&altitude_max=600', '/search/autocomplete?q=star']:
+        response = client.get(url)
+        assert response.status_code == 503
+        assert 'Catalog indexes are failed' in response.json()['detail']
+
+
+def test_catalog_endpoints_ask_to_retry_while_the_indexes_load(fresh_startup):
+    api.bundle = SimpleNamespace(version='v1')
+    response = TestClient(api.app).get('/search/autocomplete?q=star')
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
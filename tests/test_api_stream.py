@@ -0,0 +1,54 @@
+# test_api_stream.py
+from asyncio import run
+from json import loads
+from fastapi.testclient import TestClient
+import api
+
+
+async def chunked(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+def collect(iterator):
+    async def gather():
+        return [item async for item in iterator]
+    return run(gather())
+
+
+def test_iter_lines_joins_lines_split_across_chunks():
+    lines = collect(api.iter_lines(chunked(b'{"a": 1}\n{"b"', b': 2}\n\n', b'{"c": 3}'), max_line_bytes=100))
+    assert lines == [b'{"a": 1}', b'{"b": 2}', b'{"c": 3}']
+
+
+def test_iter_lines_reports_over_long_lines_and_recovers():
+    chunks = [b'{"a": 1}\n', b'x' * 30, b'x' * 30, b'x' * 30 + b'\n{"b": 2}\n', b'y' * 80]
+    assert collect(api.iter_lines(chunked(*chunks), max_line_bytes=50)) == [b'{"a": 1}', None, b'{"b": 2}', None]
+
+
+def test_iter_rows_turns_invalid_utf8_into_an_error_row():
+    rows = collect(api.iter_rows(chunked(b'{"a": 1}\n\xff\xfe{"b": 2}\n{"c": 3}\n')))
+    assert rows[0] == {'a': 1}
+    assert 'UTF-8' in rows[1]['_error']
+    assert rows[2] == {'c': 3}
+
+
+def test_a_failing_batch_answers_error_rows_and_the_stream_goes_on(monkeypatch):
+    calls = []
+
+    def score_stream_rows(rows, model_bundle=None):
+        calls.append(len(rows))
+        if len(calls) == 1:
+            raise RuntimeError('boom')
+        return ''.join(f'{{"prediction": "O", "object_id": {row["object_id"]}}}\n' for row in rows).encode()
+
+    monkeypatch.setattr(api, 'current_bundle', lambda: None)
+    monkeypatch.setattr(api, 'score_stream_rows', score_stream_rows)
+    monkeypatch.setattr(api, 'STREAM_BATCH_SIZE', 2)
+    body = b''.join(f'{{"object_id": {i}}}\n'.encode() for i in range(5))
+    response = TestClient(api.app).post('/predict/stream', content=body)
+    lines = [loads(line) for line in response.text.splitlines()]
+    assert response.status_code == 200
+    assert [line['object_id'] for line in lines] == [0, 1, 2, 3, 4]
+    assert 'boom' in lines[0]['error'] and 'boom' in lines[1]['error']
+    assert all('prediction' in line for line in lines[2:])
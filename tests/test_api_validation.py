@@ -0,0 +1,30 @@
+# test_api_validation.py
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+from pytest import mark, raises
+from api import PredictionRequest, app
+
+VALID = {'total_mass': 500.0, 'span': 2.0, 'period_mins': 95.0, 'perigee_km': 500.0, 'apogee_km': 520.0,
+         'inclination': 53.0, 'object_type': 'PAY'}
+
+
+@mark.parametrize('value', [float('nan'), float('inf'), float('-inf')])
+def test_prediction_request_rejects_non_finite_values(value):
+    with raises(ValidationError):
+        PredictionRequest(**{**VALID, 'perigee_km': value})
+
+
+@mark.parametrize('literal', ['NaN', 'Infinity', '-Infinity'])
+def test_predict_answers_422_for_non_finite_json(literal):
+    body = '{' + ', '.join(f'"{k}": {literal if k == "apogee_km" else repr(v).replace(chr(39), chr(34))}'
+                           for k, v in VALID.items()) + '}'
+    response = TestClient(app).post('/predict', content=body, headers={'Content-Type': 'application/json'})
+    assert response.status_code == 422
+    assert response.json()['detail'][0]['loc'][-1] == 'apogee_km'
+
+
+def test_batch_errors_point_at_the_non_finite_item():
+    items = [VALID, {**VALID, 'span': 'Infinity'}]
+    response = TestClient(app).post('/predict/batch', json={'items': items})
+    assert response.status_code == 422
+    assert response.json()['detail'][0]['loc'][:3] == ['body', 'items', 1]
@@ -0,0 +1,77 @@
+# test_app.py
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from json import dumps
+from threading import Thread
+from pytest import fixture
+import app
+import api
+from src.model_bundle import ModelBundle
+from src.pipeline import PIPELINE_FILE
+from test_model_registry import publish
+
+
+@fixture
+def local_backend(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, 'PREDICTION_BACKEND', 'local')
+    monkeypatch.setattr(app, 'MODELS_PATH', str(tmp_path / 'models'))
+    monkeypatch.setattr(app, 'ARTIFACTS_PATH', str(tmp_path / 'empty'))
+    app.load_local_bundle.clear()
+    yield tmp_path
+    app.load_local_bundle.clear()
+
+
+def test_the_local_backend_predicts_with_the_current_published_version(local_backend):
+    publish(local_backend, 'v1', 0)
+    model_bundle = ModelBundle.load(str(local_backend / 'models' / 'v1'), published=True)
+    item = api.probe_items(model_bundle)[0]
+    assert app.get_prediction(item.model_dump()) == {'prediction': api.predict_one(item, model_bundle)[0]}
+
+    publish(local_backend, 'v2', 1)
+    model_bundle = ModelBundle.load(str(local_backend / 'models' / 'v2'), published=True)
+    assert app.get_prediction(item.model_dump()) == {'prediction': api.predict_one(item, model_bundle)[0]}
+
+
+def test_the_local_backend_refuses_a_corrupt_version(local_backend):
+    publish(local_backend, 'v1', 0)
+    with open(local_backend / 'models' / 'v1' / PIPELINE_FILE, 'r+b') as f:
+        f.truncate(100)
+    response = app.get_prediction({})
+    assert response['detail'].startswith('The model could not be loaded') and 'manifest' in response['detail']
+
+
+def test_the_local_backend_reports_missing_artifacts(local_backend):
+    assert app.get_prediction({})['detail'].startswith('The model could not be loaded')
+
+
+class StartingApi(BaseHTTPRequestHandler):
+    """Answers 503 like the API while it loads, then the prediction."""
+    requests = []
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        self.requests.append(self.path)
+        loading = len(self.requests) == 1
+        status, body = (503, {'detail': 'Service is loading'}) if loading else (200, {'prediction': 'O'})
+        content = dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_the_remote_backend_retries_while_the_api_starts(monkeypatch):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StartingApi)
+    Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        monkeypatch.setattr(app, 'PREDICTION_BACKEND', 'remote')
+        monkeypatch.setattr(app, 'API_URL', f'http://127.0.0.1:{server.server_address[1]}')
+        assert app.get_prediction({'total_mass': 1.0}) == {'prediction': 'O'}
+        assert StartingApi.requests == ['/predict', '/predict']
+        assert app.get_session() is app.get_session()
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,32 @@
+# test_benchmark_api.py
+from asyncio import run
+from httpx import AsyncClient, MockTransport, Response
+from pytest import raises
+from benchmark_api import wait_until_ready
+
+
+def serve_ready(states):
+    def handler(request):
+        state = states.pop(0)
+        if state == 'ready':
+            return Response(200, json={'status': 'ready'})
+        return Response(503, json={'status': state, 'error': 'bad artifacts' if state == 'failed' else None})
+    return MockTransport(handler)
+
+
+async def wait(states, timeout=5):
+    async with AsyncClient(transport=serve_ready(states), base_url='http://test') as client:
+        await wait_until_ready(client, timeout)
+
+
+def test_waiting_polls_until_the_service_is_ready():
+    states = ['loading', 'loading', 'ready']
+    run(wait(states))
+    assert states == []
+
+
+def test_waiting_stops_as_soon_as_the_model_failed_to_load():
+    states = ['loading', 'failed', 'loading']
+    with raises(RuntimeError, match='bad artifacts'):
+        run(wait(states))
+    assert states == ['loading']
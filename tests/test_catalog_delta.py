@@ -0,0 +1,47 @@
+# test_catalog_delta.py
+from pandas import DataFrame
+from src.catalog_delta import CatalogSnapshot
+
+COLUMNS = ['total_mass', 'object_type', 'status']
+CATALOG = DataFrame({
+    'object_id': ['2019-029A', '2019-029B', '2019-029B', '2020-001A'],
+    'total_mass': [260.0, 0.1, 0.2, 1500.5],
+    'object_type': ['PAY', 'DEB', 'DEB', 'PAY'],
+    'status': ['O', 'D', 'D', 'O'],
+})
+
+
+def test_an_unchanged_catalog_has_no_delta():
+    delta, counts = CatalogSnapshot.from_data(CATALOG, COLUMNS).diff(CATALOG.copy())
+    assert not delta.any()
+    assert counts == {'new': 0, 'changed': 0, 'removed': 0}
+
+
+def test_new_changed_and_removed_rows_are_found():
+    refreshed = CATALOG.copy()
+    refreshed.loc[1, 'status'] = 'R'
+    refreshed = refreshed.drop(index=3)
+    refreshed.loc[4] = ['2024-100C', 5.0, 'R/B', 'O']
+
+    delta, counts = CatalogSnapshot.from_data(CATALOG, COLUMNS).diff(refreshed)
+
+    assert delta.tolist() == [False, True, False, True]
+    assert counts == {'new': 1, 'changed': 1, 'removed': 1}
+
+
+def test_float32_noise_is_not_a_change():
+    refreshed = CATALOG.copy()
+    refreshed['total_mass'] += 1e-9
+    delta, _ = CatalogSnapshot.from_data(CATALOG, COLUMNS).diff(refreshed)
+    assert not delta.any()
+
+
+def test_excluded_rows_stay_in_the_next_delta(tmp_path):
+    CatalogSnapshot.from_data(CATALOG, COLUMNS, increments=2, exclude=[0, 2]).save(tmp_path / 'snapshot.joblib')
+    snapshot = CatalogSnapshot.load(tmp_path / 'snapshot.joblib')
+
+    delta, counts = snapshot.diff(CATALOG)
+
+    assert snapshot.increments == 2
+    assert delta.tolist() == [True, False, True, False]
+    assert counts == {'new': 2, 'changed': 0, 'removed': 0}
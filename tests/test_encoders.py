@@ -0,0 +1,39 @@
+# test_encoders.py
+from concurrent.futures import ThreadPoolExecutor
+from os import path
+from joblib import load
+from pytest import raises
+from sklearn.preprocessing import LabelEncoder
+from src.encoders import CategoricalEncoder
+from src.preprocessing import FeaturePreprocessor
+
+
+def test_codes_match_the_label_encoder_it_replaces():
+    label_encoder = LabelEncoder().fit(['PAY', 'DEB', 'R/B', 'Unknown', 'DEB'])
+    encoder = CategoricalEncoder(label_encoder.classes_)
+    values = ['R/B', 'PAY', 'Unknown', 'DEB']
+    assert encoder.encode_array(values).tolist() == label_encoder.transform(values).tolist()
+    assert [encoder.encode(value) for value in values] == label_encoder.transform(values).tolist()
+
+
+def test_unseen_categories_get_the_unknown_code_without_changing_the_encoder():
+    encoder = CategoricalEncoder(['PAY', 'DEB', 'R/B'])
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        codes = list(pool.map(encoder.encode, ['TBA', 'PAY', 'ZZZ', 'DEB'] * 50))
+    assert set(codes[::4] + codes[2::4]) == {encoder.unknown_code} and encoder.unknown_code == 3
+    assert encoder.encode_array(['AAA', 'DEB', 'ZZZ']).tolist() == [3, 1, 3]
+    assert encoder.classes == ('PAY', 'DEB', 'R/B')
+    with raises(TypeError):
+        encoder._codes['TBA'] = 3
+
+
+def test_an_empty_encoder_maps_everything_to_the_unknown_code():
+    assert CategoricalEncoder([]).encode_array(['PAY', 'DEB']).tolist() == [0, 0]
+
+
+def test_the_shipped_label_encoder_converts_into_a_preprocessor():
+    label_encoder = load(path.join(path.dirname(__file__), '..', 'artifacts', 'object_type_label_encoder.joblib'))
+    preprocessor = FeaturePreprocessor.from_label_encoders({'object_type': label_encoder})
+    encoder = preprocessor.encoders['object_type']
+    assert encoder.classes == tuple(label_encoder.classes_)
+    assert encoder.encode('PAY') == label_encoder.transform(['PAY'])[0]
@@ -0,0 +1,60 @@
+# test_feature_store.py
+from os import utime
+from numpy import array_equal, memmap
+from numpy.random import default_rng
+from pandas import DataFrame
+from src.feature_store import FeatureStore, feature_key
+from src.preprocessing import CATEGORICAL_FEATURES, NUMERIC_FEATURES, FeaturePreprocessor
+
+
+def make_entry(seed):
+    rng = default_rng(seed)
+    data = DataFrame(rng.normal(size=(50, len(NUMERIC_FEATURES))), columns=NUMERIC_FEATURES)
+    data['object_type'] = rng.choice(['PAY', 'DEB', 'R/B'], size=len(data))
+    preprocessor = FeaturePreprocessor(NUMERIC_FEATURES, CATEGORICAL_FEATURES)
+    X = preprocessor.fit_transform(data)
+    return X, rng.integers(0, 3, size=len(data)), preprocessor, {'O': 0, 'D': 1, 'R': 2}
+
+
+def test_a_stored_entry_is_loaded_memory_mapped(tmp_path):
+    store = FeatureStore(tmp_path / 'store')
+    X, y, preprocessor, status_mapping = make_entry(0)
+    assert store.get('missing') is None
+
+    store.put('key', X, y, preprocessor, status_mapping)
+    cached_X, cached_y, cached_preprocessor, cached_mapping = store.get('key')
+
+    assert isinstance(cached_X, memmap)
+    assert array_equal(cached_X, X) and array_equal(cached_y, y)
+    assert cached_preprocessor.to_dict() == preprocessor.to_dict()
+    assert cached_mapping == status_mapping
+
+
+def test_the_key_changes_with_the_data_and_the_spec(tmp_path):
+    csv_path = tmp_path / 'data.csv'
+    csv_path.write_text('status,total_mass\nO,1\n')
+    key = feature_key(csv_path, NUMERIC_FEATURES, CATEGORICAL_FEATURES, 'status')
+
+    assert feature_key(csv_path, NUMERIC_FEATURES, CATEGORICAL_FEATURES, 'status') == key
+    assert feature_key(csv_path, NUMERIC_FEATURES[:-1], CATEGORICAL_FEATURES, 'status') != key
+    assert feature_key(csv_path, NUMERIC_FEATURES, [], 'status') != key
+    assert feature_key(csv_path, NUMERIC_FEATURES, CATEGORICAL_FEATURES, 'object_type') != key
+    csv_path.write_text('status,total_mass\nO,2\n')
+    assert feature_key(csv_path, NUMERIC_FEATURES, CATEGORICAL_FEATURES, 'status') != key
+
+
+def test_only_the_most_recently_used_entries_are_kept(tmp_path):
+    store = FeatureStore(tmp_path / 'store', max_entries=3)
+    for age, key in enumerate(['c', 'b', 'a']):
+        store.put(key, *make_entry(age))
+        utime(store.entry_path(key), (1000 - age, 1000 - age))
+    assert store.keys() == ['c', 'b', 'a']
+
+    store.max_entries = 2
+    assert store.prune() == ['a']
+
+    store.get('b')
+    store.put('d', *make_entry(3))
+
+    assert store.keys() == ['d', 'b']
+    assert store.get('c') is None
@@ -0,0 +1,69 @@
+# test_figure_cache.py
+from collections import OrderedDict
+from os import listdir
+from joblib import dump
+from plotly.graph_objects import Bar, Figure
+from pytest import fixture
+import src.figure_cache as figure_cache
+from src.figure_cache import figure_cache_key, get_figure_json, precompute_figures
+
+
+def plot_counts(display_data):
+    return Figure(Bar(x=list(display_data), y=list(display_data.values())))
+
+
+@fixture
+def artifact_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(figure_cache, '_figures', OrderedDict())
+    monkeypatch.setattr(figure_cache, '_artifact_hashes', OrderedDict())
+    monkeypatch.setattr(figure_cache, '_code_fingerprints', OrderedDict())
+    filepath = str(tmp_path / 'counts.joblib')
+    dump({'PAY': 3, 'DEB': 5}, filepath)
+    return filepath
+
+
+def test_key_changes_with_the_plotting_code(artifact_path, monkeypatch):
+    key = figure_cache_key(artifact_path, plot_counts)
+    assert figure_cache_key(artifact_path, plot_counts) == key
+    monkeypatch.setattr(figure_cache, '_code_fingerprints', OrderedDict())
+    monkeypatch.setattr(figure_cache, 'getsource', lambda obj: 'edited')
+    assert figure_cache_key(artifact_path, plot_counts) != key
+
+
+def test_key_changes_with_the_plotly_version(artifact_path, monkeypatch):
+    key = figure_cache_key(artifact_path, plot_counts)
+    monkeypatch.setattr(figure_cache, 'plotly_version', '0.0.0')
+    assert figure_cache_key(artifact_path, plot_counts) != key
+
+
+def test_cached_figure_is_written_whole_and_read_back(artifact_path, tmp_path):
+    cache_path = tmp_path / 'figures'
+    fig_json = get_figure_json(artifact_path, plot_counts, cache_path=str(cache_path))
+    key = figure_cache_key(artifact_path, plot_counts)
+    assert listdir(cache_path) == [f'{key}.json']
+    assert (cache_path / f'{key}.json').read_text() == fig_json
+    figure_cache._figures.clear()
+    assert get_figure_json(artifact_path, plot_counts, cache_path=str(cache_path)) == fig_json
+
+
+def test_memory_keeps_only_the_most_recently_used_figures(artifact_path, tmp_path, monkeypatch):
+    monkeypatch.setattr(figure_cache, 'MAX_FIGURES', 2)
+    cache_path = str(tmp_path / 'figures')
+    for counts in [{'PAY': 1}, {'PAY': 2}, {'PAY': 3}]:
+        dump(counts, artifact_path)
+        get_figure_json(artifact_path, plot_counts, cache_path=cache_path)
+    assert len(figure_cache._figures) == 2
+    assert len(figure_cache._artifact_hashes) == 1
+    assert len(listdir(cache_path)) == 3
+
+
+def test_precomputing_deletes_superseded_figures(artifact_path, tmp_path, monkeypatch):
+    monkeypatch.setattr(figure_cache, 'FIGURE_FUNCTIONS', {'counts': plot_counts})
+    cache_path = tmp_path / 'figures'
+    assert precompute_figures(str(tmp_path), str(cache_path)) == []
+    old_file = listdir(cache_path)[0]
+
+    dump({'PAY': 4}, artifact_path)
+
+    assert precompute_figures(str(tmp_path), str(cache_path)) == [old_file]
+    assert listdir(cache_path) == [f'{figure_cache_key(artifact_path, plot_counts)}.json']
@@ -0,0 +1,88 @@
+# test_flat_forest.py
+from numpy import float32, inf, nan
+from numpy.random import default_rng
+from numpy.testing import assert_array_equal
+from pytest import fixture, raises
+from sklearn.ensemble import RandomForestClassifier
+from src.flat_forest import FlatForest
+
+
+def make_data(n_rows, missing_fraction, seed):
+    rng = default_rng(seed)
+    X = rng.normal(size=(n_rows, 4)).astype(float32)
+    y = (X[:, 0] > 0).astype(int) + (X[:, 1] + X[:, 2] > 0.5).astype(int) * 2
+    X[rng.random(X.shape) < missing_fraction] = nan
+    return X, y
+
+
+@fixture(scope='module', params=[0.0, 0.2], ids=['trained_without_nan', 'trained_with_nan'])
+def model(request):
+    X, y = make_data(2000, request.param, seed=0)
+    return RandomForestClassifier(n_estimators=25, max_depth=12, random_state=0).fit(X, y)
+
+
+@fixture(scope='module')
+def rows():
+    X, _ = make_data(500, 0.3, seed=1)
+    # Rows with every feature missing and with single missing features at the front
+    X[:10] = nan
+    X[10:20, 0] = nan
+    return X
+
+
+def test_predict_proba_matches_sklearn_on_finite_rows(model):
+    X, _ = make_data(500, 0.0, seed=2)
+    assert_array_equal(FlatForest.from_model(model).predict_proba(X), model.predict_proba(X))
+
+
+def test_predict_proba_matches_sklearn_on_missing_values(model, rows):
+    flat = FlatForest.from_model(model)
+    assert_array_equal(flat.predict_proba(rows), model.predict_proba(rows))
+    assert_array_equal(flat.predict(rows), model.predict(rows))
+
+
+def test_single_rows_match_sklearn(model, rows):
+    flat = FlatForest.from_model(model)
+    for row in rows[:30]:
+        assert_array_equal(flat.predict_proba(row[None, :]), model.predict_proba(row[None, :]))
+
+
+def test_infinite_values_are_rejected_like_sklearn(model):
+    X, _ = make_data(5, 0.0, seed=3)
+    flat = FlatForest.from_model(model)
+    for value in (inf, -inf, 1e39):
+        bad = X.astype(float)
+        bad[2, 1] = value
+        with raises(ValueError):
+            model.predict_proba(bad)
+        with raises(ValueError, match='infinity'):
+            flat.predict_proba(bad)
+
+
+def test_saved_forest_routes_missing_values(model, rows, tmp_path):
+    FlatForest.from_model(model).save(tmp_path)
+    loaded = FlatForest.load(tmp_path, mmap_mode='r')
+    assert_array_equal(loaded.predict_proba(rows), model.predict_proba(rows))
+
+
+def test_saving_over_a_mapped_forest_leaves_the_mapped_one_intact(model, rows, tmp_path):
+    dirpath = tmp_path / 'ran_for_model_flat'
+    FlatForest.from_model(model).save(dirpath)
+    served = FlatForest.load(dirpath, mmap_mode='r')
+    expected = served.predict_proba(rows)
+
+    X, y = make_data(300, 0.0, seed=4)
+    other = RandomForestClassifier(n_estimators=3, random_state=1).fit(X, y)
+    FlatForest.from_model(other).save(dirpath)
+
+    assert_array_equal(served.predict_proba(rows), expected)
+    assert_array_equal(FlatForest.load(dirpath).predict_proba(rows), other.predict_proba(rows))
+    assert [p.name for p in tmp_path.iterdir()] == ['ran_for_model_flat']
+
+
+def test_forest_saved_without_missing_value_routing_is_rejected(model, tmp_path):
+    dirpath = tmp_path / 'forest'
+    FlatForest.from_model(model).save(dirpath)
+    (dirpath / 'missing_left.npy').unlink()
+    with raises(ValueError, match='has no missing_left'):
+        FlatForest.load(dirpath)
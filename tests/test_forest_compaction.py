@@ -0,0 +1,59 @@
+# test_forest_compaction.py
+from numpy import array_equal
+from numpy.random import default_rng
+from sklearn.ensemble import RandomForestClassifier
+import src.forest_compaction
+from src.forest_compaction import compact_forest, compaction_configs, first_trees
+
+
+def make_data(seed=0):
+    rng = default_rng(seed)
+    X = rng.normal(size=(600, 4))
+    return X, (X[:, 0] + rng.normal(scale=0.3, size=len(X)) > 0).astype(int)
+
+
+def test_the_first_trees_are_the_forest_grown_with_fewer_estimators():
+    X, y = make_data()
+    forest = RandomForestClassifier(n_estimators=20, random_state=3).fit(X, y)
+    smaller = first_trees(forest, 5)
+    assert len(forest.estimators_) == 20 and smaller.n_estimators == 5
+    grown = RandomForestClassifier(n_estimators=5, random_state=3).fit(X, y)
+    assert array_equal(smaller.predict_proba(X), grown.predict_proba(X))
+
+
+def test_configs_only_tighten_the_chosen_parameters():
+    assert compaction_configs({'max_depth': 10, 'min_samples_leaf': 5}, [20, 12, 8], [5, 20]) == [
+        {'max_depth': 10, 'min_samples_leaf': 5}, {'max_depth': 10, 'min_samples_leaf': 20},
+        {'max_depth': 8, 'min_samples_leaf': 5}, {'max_depth': 8, 'min_samples_leaf': 20}]
+
+
+def test_the_pick_is_the_smallest_forest_within_the_tolerance():
+    X, y = make_data()
+    picked, candidates = compact_forest({'n_estimators': 40}, X, y, f1_tolerance=0.02, depth_caps=[4],
+                                        leaf_sizes=[20])
+    reference = candidates[0]
+    assert (reference['n_trees'], reference['max_depth'], reference['min_samples_leaf']) == (40, None, 1)
+    eligible = [c for c in candidates if c['macro_f1'] >= reference['macro_f1'] - 0.02]
+    assert [c['eligible'] for c in candidates] == [c in eligible for c in candidates]
+    chosen = next(c for c in candidates if c['picked'])
+    assert chosen['size_bytes'] == min(c['size_bytes'] for c in eligible)
+    assert picked == {'n_estimators': chosen['n_trees'], 'max_depth': chosen['max_depth'],
+                      'min_samples_leaf': chosen['min_samples_leaf']}
+    assert chosen['size_bytes'] < reference['size_bytes']
+
+
+def test_compaction_fits_with_the_given_parallelism(monkeypatch):
+    X, y = make_data()
+    fitted = []
+
+    class RecordingForest(RandomForestClassifier):
+        def fit(self, X, y):
+            fitted.append(self.n_jobs)
+            return super().fit(X, y)
+
+    monkeypatch.setattr(src.forest_compaction, 'RandomForestClassifier', RecordingForest)
+    picked, candidates = compact_forest({'n_estimators': 20}, X, y, depth_caps=[4], leaf_sizes=[5], n_jobs=1)
+
+    assert fitted == [1] * 4
+    assert sum(c['picked'] for c in candidates) == 1
+    assert picked['n_estimators'] <= 20
@@ -0,0 +1,57 @@
+# test_helpers.py
+from os import listdir
+from numpy import arange, sin
+from pandas import DataFrame
+from plotly.graph_objects import Figure
+from pytest import raises
+import src.helpers as helpers
+from src.helpers import get_bar_plot, get_line_plot, write_pngs
+
+
+def line_plot(n_points, **kwargs):
+    data = DataFrame({'day': arange(n_points), 'count': sin(arange(n_points) / 50)})
+    return get_line_plot(data, 'day', 'count', {}, ['#fff'], 'Counts', **kwargs)
+
+
+def test_large_series_are_downsampled_and_drawn_with_svg():
+    fig = line_plot(6000, max_points=1000)
+    assert fig.data[0].type == 'scatter'
+    assert len(fig.data[0].x) == 1000
+
+
+def test_lines_left_large_after_downsampling_are_drawn_with_webgl():
+    fig = line_plot(6000, max_points=None)
+    assert fig.data[0].type == 'scattergl'
+    assert len(fig.data[0].x) == 6000
+
+
+def test_small_series_are_drawn_with_svg():
+    fig = line_plot(500)
+    assert fig.data[0].type == 'scatter'
+    assert len(fig.data[0].x) == 500
+
+
+def test_bars_are_not_downsampled():
+    data = DataFrame({'launch_year': arange(1500) % 75 + 1950, 'launch_count': arange(1500) % 7,
+                      'object_type': 'PAY'})
+    fig = get_bar_plot(data, 'object_type', 'Launches')
+    assert len(fig.data[0].x) == 1500
+
+
+def test_a_failed_png_batch_leaves_the_previous_images_whole(tmp_path, monkeypatch):
+    png_paths = [str(tmp_path / 'a.png'), str(tmp_path / 'b.png')]
+    for png_path in png_paths:
+        with open(png_path, 'wb') as f:
+            f.write(b'old')
+
+    def write_images(figs, files, **kwargs):
+        with open(files[0], 'wb') as f:
+            f.write(b'new')
+        raise RuntimeError('Kaleido crashed')
+
+    monkeypatch.setattr(helpers.pio, 'write_images', write_images)
+    with raises(RuntimeError):
+        write_pngs([Figure(), Figure()], png_paths)
+
+    assert sorted(listdir(tmp_path)) == ['a.png', 'b.png']
+    assert (tmp_path / 'a.png').read_bytes() == b'old'
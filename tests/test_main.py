@@ -0,0 +1,56 @@
+# test_main.py
+from collections import OrderedDict
+from json import loads
+from os import listdir
+from joblib import dump
+from plotly.graph_objects import Bar, Figure
+from pytest import fixture
+import src.figure_cache as figure_cache
+import src.main as main
+from src.main import export_report
+
+
+def plot_counts(display_data):
+    return Figure(Bar(x=list(display_data), y=list(display_data.values())))
+
+
+@fixture
+def artifacts(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(figure_cache, '_figures', OrderedDict())
+    monkeypatch.setattr(main, 'ARTIFACTS_PATH', f'{tmp_path}/artifacts/')
+    monkeypatch.setattr(main, 'FIGURE_FUNCTIONS', {'payloads': plot_counts, 'debris': plot_counts})
+    monkeypatch.setattr(main, 'EXPORT_NAMES', {'payloads': 'payloads', 'debris': 'debris'})
+    (tmp_path / 'artifacts').mkdir()
+    (tmp_path / 'img').mkdir()
+    dump({'2020': 3, '2021': 5}, tmp_path / 'artifacts' / 'payloads.joblib')
+    dump({'2020': 7}, tmp_path / 'artifacts' / 'debris.joblib')
+    rendered = []
+
+    def write_pngs(figs, png_paths):
+        rendered.extend(png_paths)
+        for png_path in png_paths:
+            with open(png_path, 'wb') as f:
+                f.write(b'png')
+
+    monkeypatch.setattr(main, 'write_pngs', write_pngs)
+    return tmp_path, rendered
+
+
+def test_only_changed_figures_are_rendered_again(artifacts):
+    tmp_path, rendered = artifacts
+    img_path = str(tmp_path / 'img')
+    assert export_report(['payloads', 'debris'], img_path) == [f'{img_path}/payloads.png', f'{img_path}/debris.png']
+    assert sorted(listdir(img_path)) == ['debris.png', 'export_manifest.json', 'payloads.png', 'report.html']
+    report = (tmp_path / 'img' / 'report.html').read_text()
+    assert report.count('cdn.plot.ly') == 1 and report.count('class="plotly-graph-div"') == 2
+
+    assert export_report(['payloads', 'debris'], img_path) == []
+
+    dump({'2020': 8}, tmp_path / 'artifacts' / 'debris.joblib')
+    assert export_report(['payloads', 'debris'], img_path) == [f'{img_path}/debris.png']
+    assert export_report(['payloads', 'debris'], img_path, force=True) == [f'{img_path}/payloads.png',
+                                                                           f'{img_path}/debris.png']
+    manifest = loads((tmp_path / 'img' / 'export_manifest.json').read_text())
+    assert list(manifest) == ['debris', 'payloads']
+    assert len(rendered) == 5
@@ -0,0 +1,89 @@
+# test_micro_batching.py
+from asyncio import CancelledError, gather, run, sleep, wait_for
+from pytest import raises
+from src.micro_batching import MicroBatcher
+
+
+def double(items, group=None):
+    if any(item < 0 for item in items):
+        raise ValueError('negative item')
+    return [item * 2 for item in items]
+
+
+def test_a_bad_item_only_fails_its_own_request():
+    async def scenario():
+        batcher = MicroBatcher(double, max_batch_size=8, max_wait_ms=50)
+        return batcher, await gather(*(batcher.submit(item) for item in [1, 2, -1, 4]), return_exceptions=True)
+
+    batcher, results = run(scenario())
+    assert results[:2] == [2, 4] and results[3] == 8
+    assert isinstance(results[2], ValueError)
+    stats = batcher.stats()
+    assert stats['batches'] == 1 and stats['errors'] == 1 and stats['failed_requests'] == 1
+
+
+def test_requests_queued_when_the_worker_dies_are_still_answered():
+    async def scenario():
+        batcher = MicroBatcher(double, max_batch_size=2, max_wait_ms=50)
+        score = batcher._score
+        crashed = []
+
+        async def crash_once(loop, batch):
+            if not crashed:
+                crashed.append(batch)
+                raise RuntimeError('worker bug')
+            await score(loop, batch)
+
+        batcher._score = crash_once
+        return await wait_for(gather(*(batcher.submit(item) for item in range(6)), return_exceptions=True), 2)
+
+    results = run(scenario())
+    # The batch the worker held when it died fails; everything still queued is scored by the restarted worker
+    assert sum(isinstance(result, RuntimeError) for result in results) == 2
+    assert [result for result in results if not isinstance(result, Exception)] == [4, 6, 8, 10]
+
+
+def test_cancelling_the_worker_cancels_waiting_requests():
+    async def scenario():
+        batcher = MicroBatcher(double, max_batch_size=2, max_wait_ms=50)
+        pending = [batcher.submit(item) for item in range(4)]
+        tasks = gather(*pending, return_exceptions=True)
+        await sleep(0)
+        batcher.worker.cancel()
+        return await wait_for(tasks, 2)
+
+    results = run(scenario())
+    assert all(isinstance(result, CancelledError) for result in results)
+
+
+def test_single_failing_request_is_not_scored_twice():
+    calls = []
+
+    def score(items, group):
+        calls.append(list(items))
+        raise ValueError('bad')
+
+    async def scenario():
+        return await MicroBatcher(score, max_batch_size=4, max_wait_ms=1).submit(1)
+
+    with raises(ValueError):
+        run(scenario())
+    assert calls == [[1]]
+
+
+def test_items_are_only_batched_with_their_own_group():
+    calls = []
+
+    def score(items, group):
+        calls.append((group, list(items)))
+        return [f'{group}:{item}' for item in items]
+
+    async def scenario():
+        batcher = MicroBatcher(score, max_batch_size=8, max_wait_ms=50)
+        return batcher, await gather(*(batcher.submit(item, group) for item, group in
+                                       [(1, 'v1'), (2, 'v2'), (3, 'v1'), (4, 'v2')]))
+
+    batcher, results = run(scenario())
+    assert results == ['v1:1', 'v2:2', 'v1:3', 'v2:4']
+    assert calls == [('v1', [1, 3]), ('v2', [2, 4])]
+    assert batcher.stats()['batches'] == 2 and batcher.stats()['full_flushes'] == 0
@@ -0,0 +1,29 @@
+# test_model_bundle.py
+from pathlib import Path
+from shutil import copy2
+from joblib import dump
+from numpy.random import default_rng
+from sklearn.ensemble import RandomForestClassifier
+from src.model_bundle import MODEL_FILE, SCALER_FILE, STATUS_MAPPING_FILE, ModelBundle
+from src.preprocessing import CATEGORICAL_FEATURES, NUMERIC_FEATURES
+
+ARTIFACTS_PATH = Path(__file__).parents[1] / 'artifacts'
+SHIPPED_FILES = [SCALER_FILE, STATUS_MAPPING_FILE, 'object_type_label_encoder.joblib']
+
+
+def test_shipped_artifacts_load_with_their_label_encoder(tmp_path):
+    for name in SHIPPED_FILES:
+        copy2(ARTIFACTS_PATH / name, tmp_path / name)
+    rng = default_rng(0)
+    X = rng.normal(size=(200, 7))
+    dump(RandomForestClassifier(n_estimators=3, random_state=0).fit(X, rng.integers(0, 8, size=len(X))),
+         tmp_path / MODEL_FILE)
+
+    model_bundle = ModelBundle.load(str(tmp_path), flat_only=True)
+
+    preprocessor = model_bundle.preprocessor
+    assert preprocessor.features == NUMERIC_FEATURES + CATEGORICAL_FEATURES
+    assert preprocessor.encoders['object_type'].classes == ('DEB', 'PAY', 'R/B', 'Unknown')
+    assert preprocessor.modes == {'object_type': 'DEB'}
+    assert set(model_bundle.pipeline.labels) == {'R', 'O', 'N', 'ERR', 'L', 'D', 'E', 'DK'}
+    assert model_bundle.model is None and model_bundle.flat_model is not None
@@ -0,0 +1,101 @@
+# test_model_creation.py
+from os import path
+from joblib import dump
+from numpy.random import default_rng
+from pandas import DataFrame, concat
+from pytest import mark
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import ParameterGrid
+from sklearn.preprocessing import StandardScaler
+import model_creation
+from model_creation import halving_candidates, halving_schedule, make_search, train_and_evaluate_model, \
+    train_incrementally
+from src.catalog_delta import SNAPSHOT_FILE, CatalogSnapshot
+from src.preprocessing import CATEGORICAL_FEATURES, NUMERIC_FEATURES, PREPROCESSOR_FILE, FeaturePreprocessor
+
+PARAM_GRID = {'n_estimators': [5, 10], 'max_depth': [2, 4, 8], 'min_samples_leaf': [1, 5, 20]}
+
+
+@mark.parametrize('search_mode', ['halving_grid', 'halving_random'])
+@mark.parametrize('time_limit', [None, 60.0])
+def test_budget_schedule_matches_the_fitted_search(search_mode, time_limit):
+    rng = default_rng(0)
+    X = rng.normal(size=(900, 4))
+    y = (X[:, 0] + rng.normal(scale=0.5, size=len(X)) > 0).astype(int) + (X[:, 1] > 1)
+    search = make_search(RandomForestClassifier(random_state=0), PARAM_GRID, X, y, search_mode, 'n_samples', 3,
+                         time_limit, 1, 'f1_macro')
+    assert isinstance(search.min_resources, int) and isinstance(search.max_resources, int)
+    search.fit(X, y)
+
+    n_candidates = halving_candidates(search_mode, len(ParameterGrid(PARAM_GRID)), search.min_resources,
+                                      search.max_resources)
+    schedule = halving_schedule(n_candidates, search.min_resources, search.max_resources, 3)
+    assert [budget for _, budget in schedule] == search.n_resources_
+    assert [candidates for candidates, _ in schedule] == search.n_candidates_
+
+
+def test_a_memory_budget_caps_the_search_and_the_compaction(tmp_path, monkeypatch):
+    rng = default_rng(0)
+    X = rng.normal(size=(300, 4))
+    y = (X[:, 0] > 0).astype(int)
+    compaction_jobs = []
+
+    def compact_forest(*args, n_jobs, **kwargs):
+        compaction_jobs.append(n_jobs)
+        return {'n_estimators': 5, 'max_depth': None, 'min_samples_leaf': 1}, []
+
+    monkeypatch.setattr(model_creation, 'ARTIFACTS_PATH', str(tmp_path))
+    monkeypatch.setattr(model_creation, 'cpu_count', lambda: 4)
+    monkeypatch.setattr(model_creation, 'estimate_fit_bytes', lambda *args: 1024 ** 2)
+    monkeypatch.setattr(model_creation, 'compact_forest', compact_forest)
+    *_, search_info = train_and_evaluate_model(X, y, {'n_estimators': [5]}, memory_budget_mb=2, compact=True)
+
+    assert search_info['n_jobs'] == 2
+    assert compaction_jobs == [2]
+    assert search_info['worker_peak_rss_mb'] > 0
+    assert 'fold_peak_rss_mb' not in search_info
+
+
+def make_catalog(rng, n, first_id=0):
+    data = DataFrame(rng.normal(size=(n, len(NUMERIC_FEATURES))), columns=NUMERIC_FEATURES)
+    data['object_type'] = rng.choice(['PAY', 'DEB', 'R/B'], size=n)
+    data['status'] = ['O' if x > 0 else 'D' for x in data[NUMERIC_FEATURES[0]]]
+    data['object_id'] = [f'OBJ-{i}' for i in range(first_id, first_id + n)]
+    return data
+
+
+def test_an_incremental_update_trains_on_the_delta_and_keeps_held_out_rows_for_the_next(tmp_path, monkeypatch):
+    rng = default_rng(0)
+    features = NUMERIC_FEATURES + CATEGORICAL_FEATURES
+    catalog = make_catalog(rng, 200)
+    preprocessor = FeaturePreprocessor(NUMERIC_FEATURES, CATEGORICAL_FEATURES)
+    X = preprocessor.fit_transform(catalog)
+    scaler = StandardScaler().fit(X)
+    status_mapping = {'O': 0, 'D': 1}
+    model = RandomForestClassifier(n_estimators=10, random_state=0).fit(
+        scaler.transform(X), catalog['status'].map(status_mapping))
+    dump(model, tmp_path / 'ran_for_model.joblib')
+    dump(scaler, tmp_path / 'scaler.joblib')
+    dump(status_mapping, tmp_path / 'status_mapping.joblib')
+    preprocessor.save(tmp_path / PREPROCESSOR_FILE)
+    CatalogSnapshot.from_data(catalog, features + ['status']).save(tmp_path / SNAPSHOT_FILE)
+
+    refreshed = concat([catalog, make_catalog(rng, 40, first_id=200)], ignore_index=True)
+    refreshed.loc[:9, 'span'] += 10
+    refreshed.to_csv(tmp_path / 'catalog.csv', index=False)
+    published = []
+    monkeypatch.setattr(model_creation, 'ARTIFACTS_PATH', str(tmp_path))
+    monkeypatch.setattr(model_creation, 'save_and_publish',
+                        lambda model, *args: published.append((model, args[-1])) or 'v2')
+
+    assert train_incrementally(str(tmp_path / 'catalog.csv'), features, 'status', new_trees=5) == 'v2'
+
+    updated, metadata = published[0]
+    assert len(updated.estimators_) == 15
+    assert metadata['incremental']['new'] == 40 and metadata['incremental']['changed'] == 10
+    held_out = 50 // 5
+    assert metadata['incremental']['fit_rows'] == 2 * (50 - held_out)
+    snapshot = CatalogSnapshot.load(path.join(tmp_path, SNAPSHOT_FILE))
+    _, counts = snapshot.diff(refreshed)
+    assert snapshot.increments == 1
+    assert counts == {'new': held_out, 'changed': 0, 'removed': 0}
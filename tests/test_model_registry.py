@@ -0,0 +1,177 @@
+# test_model_registry.py
+from asyncio import create_task, run, sleep
+from json import dump as json_dump, loads
+from os import remove
+from joblib import dump
+from fastapi.testclient import TestClient
+from numpy import array_equal
+from numpy.random import default_rng
+from pandas import DataFrame
+from pytest import fixture, raises
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+import api
+from src.model_bundle import BUNDLE_FILES, MODEL_FILE
+from src.micro_batching import MicroBatcher
+from src.model_registry import CURRENT_FILE, ModelWatcher, current_version, publish_version, verify_manifest
+from src.pipeline import PIPELINE_FILE, InferencePipeline
+from src.preprocessing import CATEGORICAL_FEATURES, NUMERIC_FEATURES, FeaturePreprocessor
+
+
+def write_artifacts(dirpath, seed):
+    rng = default_rng(seed)
+    data = DataFrame(rng.uniform(1, 1000, size=(300, len(NUMERIC_FEATURES))), columns=NUMERIC_FEATURES)
+    data['object_type'] = rng.choice(['PAY', 'DEB', 'R/B'], size=len(data))
+    preprocessor = FeaturePreprocessor(NUMERIC_FEATURES, CATEGORICAL_FEATURES)
+    X = preprocessor.fit_transform(data)
+    scaler = StandardScaler().fit(X)
+    model = RandomForestClassifier(n_estimators=5, random_state=seed).fit(scaler.transform(X),
+                                                                         rng.integers(0, 3, size=len(data)))
+    dirpath.mkdir(exist_ok=True)
+    dump(model, dirpath / MODEL_FILE)
+    InferencePipeline.from_artifacts(preprocessor, scaler, model, {'O': 0, 'D': 1, 'R': 2}).save(dirpath / PIPELINE_FILE)
+
+
+def publish(tmp_path, version, seed):
+    source = tmp_path / f'source_{version}'
+    write_artifacts(source, seed)
+    return publish_version(str(source), BUNDLE_FILES, str(tmp_path / 'models'), version)
+
+
+@fixture
+def serving(monkeypatch, tmp_path):
+    monkeypatch.setattr(api, 'bundle', None)
+    publish(tmp_path, 'v1', 0)
+    models_path = str(tmp_path / 'models')
+    api.reload_bundle(str(tmp_path / 'models' / 'v1'))
+    return ModelWatcher(models_path, api.reload_bundle, 'v1', interval=0)
+
+
+def test_publish_writes_a_verified_version_and_points_current_at_it(tmp_path):
+    version = publish(tmp_path, 'v1', 0)
+    models_path = tmp_path / 'models'
+    assert current_version(str(models_path)) == version == 'v1'
+    assert set(verify_manifest(str(models_path / 'v1'))['files']) == set(BUNDLE_FILES)
+    with raises(ValueError, match='already exists'):
+        publish(tmp_path, 'v1', 1)
+
+
+def test_watcher_swaps_in_a_newly_published_version(serving, tmp_path):
+    assert not serving.check()
+    publish(tmp_path, 'v2', 1)
+    assert serving.check()
+    assert api.bundle.version == 'v2'
+    assert serving.stats()['reloads'] == 1 and serving.stats()['version'] == 'v2'
+
+
+def test_watcher_rejects_a_corrupt_version_once_and_keeps_serving(serving, tmp_path):
+    publish(tmp_path, 'v2', 1)
+    with open(tmp_path / 'models' / 'v2' / PIPELINE_FILE, 'r+b') as f:
+        f.truncate(100)
+    with raises(ValueError, match='does not match its manifest digest'):
+        serving.check()
+    assert api.bundle.version == 'v1'
+    assert serving.stats()['failures'] == 1 and serving.stats()['last_error'].startswith('v2: ')
+    assert not serving.check()
+
+
+def test_watcher_rejects_a_version_with_missing_files(serving, tmp_path):
+    publish(tmp_path, 'v2', 1)
+    remove(tmp_path / 'models' / 'v2' / MODEL_FILE)
+    with raises(ValueError, match='missing'):
+        serving.check()
+    assert api.bundle.version == 'v1'
+
+
+def test_watcher_rejects_a_version_without_a_manifest(serving, tmp_path):
+    write_artifacts(tmp_path / 'models' / 'v2', 1)
+    with open(tmp_path / 'models' / CURRENT_FILE, 'w') as f:
+        json_dump({'version': 'v2'}, f)
+    with raises(ValueError, match='No manifest.json'):
+        serving.check()
+    assert api.bundle.version == 'v1'
+
+
+def test_in_flight_requests_finish_on_the_bundle_they_started_with(serving, tmp_path):
+    in_flight = api.current_bundle()
+    item = api.probe_items(in_flight)[0]
+    before = api.predict_one(item, in_flight)
+    threshold = in_flight.flat_model.threshold.copy()
+
+    publish(tmp_path, 'v2', 1)
+    assert serving.check()
+
+    assert api.current_bundle() is not in_flight and in_flight.version == 'v1'
+    assert array_equal(in_flight.flat_model.threshold, threshold)
+    assert api.predict_one(item, in_flight) == before
+
+
+def test_a_version_published_after_a_failed_startup_makes_the_service_ready(monkeypatch, tmp_path):
+    for name in ['bundle', 'watcher']:
+        monkeypatch.setattr(api, name, None)
+    monkeypatch.setattr(api, 'startup', {'state': 'loading', 'error': None, 'seconds_to_ready': None,
+                                         'seconds_to_first_fast_request': None, 'indexes': 'loading',
+                                         'indexes_error': None})
+    monkeypatch.setattr(api, 'ARTIFACTS_PATH', str(tmp_path / 'empty'))
+    monkeypatch.setattr(api, 'MODELS_PATH', str(tmp_path / 'models'))
+    monkeypatch.setattr(api, 'CATALOG_PATH', str(tmp_path / 'missing_catalog.joblib'))
+    monkeypatch.setattr(api, 'MODEL_WATCH_INTERVAL_SECONDS', 0)
+    api.start_up()
+    client = TestClient(api.app)
+    assert client.get('/ready').status_code == 503
+    assert api.startup['state'] == 'failed'
+
+    publish(tmp_path, 'v1', 0)
+    assert api.watcher.check()
+
+    ready = client.get('/ready')
+    assert ready.status_code == 200
+    assert ready.json()['version'] == 'v1'
+    assert api.startup['error'] is None
+
+
+def test_a_queued_request_is_scored_with_the_bundle_it_arrived_under(serving, tmp_path, monkeypatch):
+    scored_with = []
+    score_items = api.score_items
+
+    def recording_score_items(items, source='micro_batch', model_bundle=None):
+        if source == 'micro_batch':
+            scored_with.append(model_bundle.version)
+        return score_items(items, source, model_bundle)
+
+    monkeypatch.setattr(api, 'score_items', recording_score_items)
+    monkeypatch.setattr(api, 'batcher', MicroBatcher(api.score_micro_batch, max_batch_size=8, max_wait_ms=100))
+    monkeypatch.setattr(api, 'prediction_cache', api.PredictionCache(NUMERIC_FEATURES, CATEGORICAL_FEATURES))
+    item = api.probe_items(api.current_bundle())[0]
+    expected = api.predict_one(item, api.current_bundle())[0]
+    publish(tmp_path, 'v2', 1)
+
+    async def scenario():
+        request = create_task(api.predict(item))
+        await sleep(0)
+        assert serving.check()
+        return await request
+
+    response = run(scenario())
+    assert scored_with == ['v1']
+    assert loads(response.body)['prediction'] == expected
+    assert api.prediction_cache.stats()['size'] == 0
+
+
+def test_swapping_in_a_version_drops_the_cached_predictions(serving, tmp_path, monkeypatch):
+    monkeypatch.setattr(api, 'batcher', None)
+    monkeypatch.setattr(api, 'prediction_cache', api.PredictionCache(NUMERIC_FEATURES, CATEGORICAL_FEATURES))
+    client = TestClient(api.app)
+    item = api.probe_items(api.current_bundle())[0]
+    payload = item.model_dump()
+    assert client.post('/predict', json=payload).status_code == 200
+    assert client.post('/predict', json=payload).status_code == 200
+    assert api.prediction_cache.stats()['hits'] == 1
+
+    publish(tmp_path, 'v2', 1)
+    assert serving.check()
+    response = client.post('/predict', json=payload)
+
+    stats = api.prediction_cache.stats()
+    assert stats['version'] == 'v2' and stats['hits'] == 1 and stats['size'] == 1
+    assert response.json()['prediction'] == api.predict_one(item, api.current_bundle())[0]
@@ -0,0 +1,34 @@
+# test_name_index.py
+from pandas import DataFrame
+from src.name_index import NameIndex
+
+CATALOG = DataFrame({
+    'object_id': ['2019-029A', '2019-029B', '2019-029C', '2019-029D', '2019-029E'],
+    'object_name': ['SAT A', 'SAT B', 'SAT C', 'SAT D', 'SAT E'],
+    'alternate_names': ['TINTIN LONG FORMER NAME', 'TINTINA RELAY', 'TINTIN B', 'TINTINB', 'TINTIN'],
+})
+
+
+def test_token_candidates_are_ranked_before_they_are_cut():
+    hits = NameIndex(CATALOG, max_candidates=2).search('tintin', limit=5)
+    assert [hit['matched_key'] for hit in hits] == ['TINTIN', 'TINTIN B']
+
+
+def test_token_matches_rank_exact_tokens_then_shorter_names():
+    hits = NameIndex(CATALOG).search('tintin', limit=5)
+    assert [hit['object_name'] for hit in hits] == ['SAT E', 'SAT C', 'SAT A', 'SAT D', 'SAT B']
+
+
+def test_primary_keys_rank_before_alternate_names():
+    hits = NameIndex(CATALOG).search('2019-029e', limit=2)
+    assert hits[0]['matched_field'] == 'object_id' and hits[0]['object_name'] == 'SAT E'
+
+
+def test_primary_key_candidates_are_ranked_before_they_are_cut():
+    catalog = DataFrame({
+        'object_id': ['2019-029AA', '2019-029AB', '2019-029AC', '2019-029B', '2019-029C'],
+        'object_name': ['DEB AA', 'DEB AB', 'DEB AC', 'SAT B', 'SAT C'],
+        'alternate_names': [None] * 5,
+    })
+    hits = NameIndex(catalog, max_candidates=2).search('2019-029', limit=5)
+    assert [hit['matched_key'] for hit in hits] == ['2019-029B', '2019-029C']
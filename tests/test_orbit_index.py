@@ -0,0 +1,32 @@
+# test_orbit_index.py
+from pandas import DataFrame
+from src.orbit_index import OrbitIndex
+
+# A LEO shell next to the query, LEO objects at the same inclination but hundreds of kilometers lower, and the GEO
+# and HEO objects that stretch the catalog-wide altitude spread
+CATALOG = DataFrame([
+    ('starlink', 545.0, 555.0, 53.8, 95.6),
+    ('low_303', 303.0, 303.0, 53.0, 90.5),
+    ('low_346', 346.0, 346.0, 53.0, 91.4),
+    ('leo_97', 550.0, 550.0, 97.5, 95.6),
+    ('geo_1', 35780.0, 35790.0, 0.1, 1436.0),
+    ('geo_2', 35770.0, 35800.0, 0.05, 1436.1),
+    ('molniya', 500.0, 39800.0, 63.4, 718.0),
+], columns=['object_name', 'perigee_km', 'apogee_km', 'inclination', 'period_mins']).assign(
+    object_id=lambda df: range(len(df)))
+
+
+def test_nearest_orbit_weighs_altitude_against_inclination():
+    neighbors = OrbitIndex(CATALOG).nearest(550, 550, 53, k=3)
+    assert list(neighbors['object_name']) == ['starlink', 'low_346', 'low_303']
+    assert neighbors['distance'].iloc[0] < 20
+
+
+def test_inclination_weight_is_configurable():
+    neighbors = OrbitIndex(CATALOG, km_per_degree=1.0).nearest(550, 550, 53, k=2)
+    assert list(neighbors['object_name']) == ['starlink', 'leo_97']
+
+
+def test_band_query_is_sliced_by_inclination():
+    matches = OrbitIndex(CATALOG).band_query(500, 600, inclination_min=50, inclination_max=70)
+    assert list(matches['object_name']) == ['starlink', 'molniya']
@@ -0,0 +1,48 @@
+# test_pipeline.py
+from os import listdir, stat
+from joblib import dump, load
+from numpy import array_equal
+from numpy.random import default_rng
+from pandas import DataFrame
+from pytest import raises
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+from src.pipeline import InferencePipeline
+from src.preprocessing import CATEGORICAL_FEATURES, NUMERIC_FEATURES, FeaturePreprocessor
+
+
+def make_pipeline(seed):
+    rng = default_rng(seed)
+    data = DataFrame(rng.normal(size=(300, len(NUMERIC_FEATURES))), columns=NUMERIC_FEATURES)
+    data['object_type'] = rng.choice(['PAY', 'DEB', 'R/B'], size=len(data))
+    preprocessor = FeaturePreprocessor(NUMERIC_FEATURES, CATEGORICAL_FEATURES)
+    X = preprocessor.fit_transform(data)
+    scaler = StandardScaler().fit(X)
+    y = rng.integers(0, 3, size=len(data))
+    forest = RandomForestClassifier(n_estimators=5, random_state=seed).fit(scaler.transform(X), y)
+    return InferencePipeline.from_artifacts(preprocessor, scaler, forest, {'O': 0, 'D': 1, 'R': 2})
+
+
+def test_saving_over_a_mapped_pipeline_leaves_the_mapped_one_intact(tmp_path):
+    filepath = tmp_path / 'inference_pipeline.joblib'
+    make_pipeline(0).save(filepath)
+    served = InferencePipeline.load(filepath, mmap_mode='r')
+    threshold = served.forest.threshold.copy()
+    inode = stat(filepath).st_ino
+
+    make_pipeline(1).save(filepath)
+
+    assert stat(filepath).st_ino != inode
+    assert array_equal(served.forest.threshold, threshold)
+    assert not array_equal(InferencePipeline.load(filepath).forest.threshold[:len(threshold)], threshold)
+    assert listdir(tmp_path) == ['inference_pipeline.joblib']
+
+
+def test_pipeline_saved_without_missing_value_routing_is_rejected(tmp_path):
+    filepath = tmp_path / 'inference_pipeline.joblib'
+    make_pipeline(0).save(filepath)
+    state = load(filepath)
+    del state['forest']['missing_left']
+    dump(state, filepath)
+    with raises(ValueError, match='has no missing_left'):
+        InferencePipeline.load(filepath)
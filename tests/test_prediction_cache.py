@@ -0,0 +1,51 @@
+# test_prediction_cache.py
+from types import SimpleNamespace
+from src.prediction_cache import MISSING, PredictionCache
+
+
+def request(mass, object_type='PAY'):
+    return SimpleNamespace(total_mass=mass, span=-0.0, object_type=object_type)
+
+
+def make_cache(**kwargs):
+    return PredictionCache(['total_mass', 'span'], ['object_type'], **kwargs)
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = make_cache(max_size=2)
+    for mass in [1.0, 2.0]:
+        cache.put(cache.key(request(mass)), mass)
+    assert cache.get(cache.key(request(1.0))) == 1.0
+    cache.put(cache.key(request(3.0)), 3.0)
+    assert cache.get(cache.key(request(2.0))) is MISSING
+    assert cache.get(cache.key(request(1.0))) == 1.0
+    assert cache.stats()['evictions'] == 1 and cache.stats()['size'] == 2
+
+
+def test_rounded_keys_share_an_entry():
+    cache = make_cache(decimals=1)
+    assert cache.key(request(1.04)) == cache.key(request(1.01)) == (1.0, 0.0, 'PAY')
+    assert cache.key(request(1.04)) != cache.key(request(1.04, 'DEB'))
+    assert make_cache().key(request(1.04)) != make_cache().key(request(1.01))
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr('src.prediction_cache.monotonic', lambda: now[0])
+    cache = make_cache(ttl_seconds=10)
+    cache.put(cache.key(request(1.0)), 'O')
+    now[0] = 109.0
+    assert cache.get(cache.key(request(1.0))) == 'O'
+    now[0] = 111.0
+    assert cache.get(cache.key(request(1.0))) is MISSING
+    assert cache.stats()['expirations'] == 1
+
+
+def test_a_new_model_version_drops_every_entry():
+    cache = make_cache(version='v1')
+    cache.put(cache.key(request(1.0)), 'O')
+    cache.validate('v1')
+    assert cache.get(cache.key(request(1.0))) == 'O'
+    cache.validate('v2')
+    assert cache.get(cache.key(request(1.0))) is MISSING
+    assert cache.stats()['invalidations'] == 1 and cache.stats()['version'] == 'v2'
@@ -0,0 +1,55 @@
+# test_profiling.py
+from json import loads
+from os import listdir
+from pstats import Stats
+from tracemalloc import is_tracing
+from pytest import raises
+from src.profiling import StageProfiler
+
+
+def test_the_report_holds_every_stage_in_order(tmp_path):
+    profiler = StageProfiler()
+    with profiler.stage('read_csv', source='catalog.csv') as record:
+        record['rows'] = 3
+    with raises(ValueError):
+        with profiler.stage('fit'):
+            raise ValueError('bad fit')
+
+    profiler.write_report(tmp_path / 'training_report.json', version='v1')
+    report = loads((tmp_path / 'training_report.json').read_text())
+
+    assert [stage['name'] for stage in report['stages']] == ['read_csv', 'fit']
+    assert report['stages'][0]['source'] == 'catalog.csv' and report['stages'][0]['rows'] == 3
+    for stage in report['stages']:
+        assert stage['wall_seconds'] >= 0 and stage['cpu_seconds'] >= 0 and stage['max_rss_mb'] > 0
+        assert 'peak_traced_mb' not in stage
+    assert report['version'] == 'v1'
+    assert set(report['environment']) == {'python', 'numpy', 'scikit-learn', 'platform', 'cpu_count'}
+    assert report['total_wall_seconds'] >= sum(stage['wall_seconds'] for stage in report['stages'])
+    assert profiler.summary() == {stage['name']: stage['wall_seconds'] for stage in report['stages']}
+    assert listdir(tmp_path) == ['training_report.json']
+
+
+def test_traced_memory_counts_allocations_of_the_stage_only(tmp_path):
+    profiler = StageProfiler(trace_memory=True)
+    kept = bytearray(8 * 1024 ** 2)
+    with profiler.stage('allocate'):
+        allocated = bytearray(16 * 1024 ** 2)
+    del allocated
+    with profiler.stage('idle'):
+        pass
+    profiler.write_report(tmp_path / 'training_report.json')
+
+    allocate, idle = profiler.stages
+    assert 16 <= allocate['peak_traced_mb'] < 24
+    assert idle['peak_traced_mb'] < 1
+    assert not is_tracing()
+    del kept
+
+
+def test_stages_are_dumped_for_pstats(tmp_path):
+    profiler = StageProfiler(profile_dir=str(tmp_path / 'profiles'))
+    with profiler.stage('sort'):
+        sorted(range(1000), key=lambda value: -value)
+    assert listdir(tmp_path / 'profiles') == ['sort.prof']
+    assert Stats(str(tmp_path / 'profiles' / 'sort.prof')).total_calls > 0